@@ -0,0 +1,254 @@
+# almacen_velas.py
+# Almacén local de velas en SQLite con descarga incremental (since=)
+
+import contextlib
+import sqlite3
+import threading
+import time
+import remuestreo
+import vuelo_unico
+from descarga_async import ohlcv_a_dataframe
+
+ALMACEN_FILE = "velas.db"
+
+DURACION_TIMEFRAME_MS = {
+    '1h': 3600000,
+    '4h': 14400000,
+    '12h': 43200000,
+    '1d': 86400000,
+    '3d': 259200000,
+    '1w': 604800000,
+    '1M': 2592000000
+}
+
+
+class AlmacenVelas:
+    """Velas por (symbol, timeframe, timestamp); una fila por vela, la vela abierta se sobrescribe."""
+
+    def __init__(self, ruta=ALMACEN_FILE):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS velas (
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (symbol, timeframe, timestamp)
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS indicadores (
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    ema50 REAL, ema200 REAL, macd REAL, macd_signal REAL, rsi REAL,
+                    PRIMARY KEY (symbol, timeframe, timestamp)
+                ) WITHOUT ROWID
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS estado_indicadores (
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    estado TEXT NOT NULL,
+                    PRIMARY KEY (symbol, timeframe)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS relleno (
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    completo INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, timeframe)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS huecos_vacios (
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    desde INTEGER NOT NULL,
+                    hasta INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, timeframe, desde)
+                )
+            """)
+            self._conn.commit()
+
+    def ultimo_timestamp(self, symbol, timeframe):
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT MAX(timestamp) FROM velas WHERE symbol = ? AND timeframe = ?",
+                (symbol, timeframe)
+            ).fetchone()
+        return fila[0]
+
+    def guardar(self, symbol, timeframe, ohlcv):
+        """Inserta velas en formato ccxt ([ms, o, h, l, c, v]); las repetidas se reemplazan."""
+        if not ohlcv:
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO velas VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(symbol, timeframe, int(v[0]), *v[1:6]) for v in ohlcv]
+            )
+            self._conn.commit()
+        return len(ohlcv)
+
+    def leer_ohlcv(self, symbol, timeframe, limit=250):
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT timestamp, open, high, low, close, volume FROM velas "
+                "WHERE symbol = ? AND timeframe = ? ORDER BY timestamp DESC LIMIT ?",
+                (symbol, timeframe, limit)
+            ).fetchall()
+        return filas[::-1]
+
+    def leer(self, symbol, timeframe, limit=250):
+        return ohlcv_a_dataframe(self.leer_ohlcv(symbol, timeframe, limit))
+
+    def leer_remuestreado(self, symbol, timeframe, base, limit=250):
+        """Últimas `limit` velas de `timeframe` construidas a partir de las velas guardadas en `base`."""
+        ohlcv = self.leer_ohlcv(symbol, base, remuestreo.velas_base_necesarias(timeframe, base, limit))
+        return remuestreo.remuestrear(ohlcv, timeframe)[-limit:]
+
+    def simbolos(self, timeframe):
+        """Pares con velas guardadas en `timeframe`."""
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT DISTINCT symbol FROM velas WHERE timeframe = ? ORDER BY symbol", (timeframe,)
+            ).fetchall()
+        return [fila[0] for fila in filas]
+
+    # === RELLENO HISTÓRICO ===
+    def primer_timestamp(self, symbol, timeframe):
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT MIN(timestamp) FROM velas WHERE symbol = ? AND timeframe = ?",
+                (symbol, timeframe)
+            ).fetchone()
+        return fila[0]
+
+    def historia_completa(self, symbol, timeframe):
+        """True si el exchange ya no devolvió velas anteriores a la primera guardada."""
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT completo FROM relleno WHERE symbol = ? AND timeframe = ?", (symbol, timeframe)
+            ).fetchone()
+        return bool(fila and fila[0])
+
+    def marcar_historia_completa(self, symbol, timeframe):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO relleno VALUES (?, ?, 1)", (symbol, timeframe))
+            self._conn.commit()
+
+    def huecos(self, symbol, timeframe, separacion_minima):
+        """[(última vela antes del hueco, primera después)] con más de `separacion_minima` ms entre ambas.
+
+        No incluye los huecos en los que el exchange ya confirmó que no hay velas.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT anterior, timestamp FROM ("
+                "  SELECT timestamp, LAG(timestamp) OVER (ORDER BY timestamp) AS anterior FROM velas"
+                "  WHERE symbol = ? AND timeframe = ?"
+                ") WHERE timestamp - anterior > ? AND NOT EXISTS ("
+                "  SELECT 1 FROM huecos_vacios h WHERE h.symbol = ? AND h.timeframe = ? AND h.desde = anterior"
+                ") ORDER BY anterior",
+                (symbol, timeframe, separacion_minima, symbol, timeframe)
+            ).fetchall()
+
+    def marcar_hueco_vacio(self, symbol, timeframe, desde, hasta):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO huecos_vacios VALUES (?, ?, ?, ?)", (symbol, timeframe, int(desde), int(hasta))
+            )
+            self._conn.commit()
+
+    # === INDICADORES PERSISTIDOS ===
+    def leer_estado_indicadores(self, symbol, timeframe):
+        """Devuelve (timestamp de la última vela incorporada, estado en JSON) o None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT timestamp, estado FROM estado_indicadores WHERE symbol = ? AND timeframe = ?",
+                (symbol, timeframe)
+            ).fetchone()
+
+    def guardar_indicadores(self, symbol, timeframe, timestamp_estado, estado, filas):
+        """Guarda el estado recursivo y los valores de las velas cerradas en una sola transacción."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO indicadores VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(symbol, timeframe, int(f[0]), *f[1:6]) for f in filas]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO estado_indicadores VALUES (?, ?, ?, ?)",
+                (symbol, timeframe, int(timestamp_estado), estado)
+            )
+            self._conn.commit()
+
+    def leer_indicadores(self, symbol, timeframe, desde, hasta):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT timestamp, ema50, ema200, macd, macd_signal, rsi FROM indicadores "
+                "WHERE symbol = ? AND timeframe = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp",
+                (symbol, timeframe, int(desde), int(hasta))
+            ).fetchall()
+
+    def calcular_since(self, symbol, timeframe, limit=250):
+        """Desde dónde pedir velas: la última guardada (puede seguir abierta) o None para una descarga completa.
+
+        Si el hueco desde la última vela guardada no cabe en `limit` velas se pide
+        la ventana más reciente completa, para no quedarnos con datos viejos.
+        """
+        ultimo = self.ultimo_timestamp(symbol, timeframe)
+        if ultimo is None:
+            return None
+        duracion = DURACION_TIMEFRAME_MS.get(timeframe)
+        if duracion and (time.time() * 1000 - ultimo) / duracion >= limit:
+            return None
+        return ultimo
+
+
+# === DESCARGA INCREMENTAL ===
+def descargar_nuevas(exchange, almacen, symbol, timeframe, limit=250):
+    """Pide al exchange solo las velas posteriores a la última guardada y las fusiona en el almacén."""
+    since = almacen.calcular_since(symbol, timeframe, limit)
+    if since is None:
+        ohlcv = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+    else:
+        ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+    almacen.guardar(symbol, timeframe, ohlcv)
+
+def actualizar_velas(exchange, almacen, symbol, timeframe, limit=250, config_remuestreo=None, turno=contextlib.nullcontext,
+                     lectura=None):
+    """Descarga solo las velas nuevas, las fusiona en el almacén y devuelve las últimas `lectura` (por defecto `limit`).
+
+    Si `config_remuestreo` da una serie base para `timeframe`, se actualiza esa
+    serie y las velas se construyen en local; solo cuando aún no hay historia
+    base suficiente se pide el timeframe nativo. Cada llamada al exchange va
+    dentro de `turno()`. Con el historial rellenado (relleno_historico),
+    `lectura` puede pasar de `limit` sin más peticiones.
+
+    Cada descarga pasa por el vuelo único del proceso con la clave de lo que se
+    pide, (symbol, timeframe descargado, límite), la misma que usa
+    descarga_async: un escaneo de 1w y otro de 1M sobre el mismo par, o el
+    dashboard y un escaneo masivo, comparten la petición de la serie base.
+    """
+    def descargar(tf, limite):
+        def pedir():
+            with turno():
+                descargar_nuevas(exchange, almacen, symbol, tf, limite)
+        vuelo_unico.descargas.ejecutar((symbol, tf, limite), pedir)
+
+    lectura = lectura or limit
+    base = remuestreo.base_de(timeframe, config_remuestreo)
+    if base is not None:
+        descargar(base, remuestreo.LIMITE_BASE)
+        ohlcv = almacen.leer_remuestreado(symbol, timeframe, base, lectura)
+        if remuestreo.suficientes(len(ohlcv), limit, config_remuestreo) or not remuestreo.admite_nativo(exchange, timeframe):
+            return ohlcv_a_dataframe(ohlcv)
+    descargar(timeframe, limit)
+    return almacen.leer(symbol, timeframe, lectura)
@@ -0,0 +1,647 @@
+# analisis.py
+# Núcleo de cálculo de las mejoras: indicadores, patrones, suelos, divergencias y puntaje.
+# Sin Streamlit ni Plotly, para poder usarlo desde el worker y el scheduler.
+
+import pandas as pd
+import pandas_ta as ta
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import patrones_vela
+import metricas
+import json
+import os
+
+# Configuración avanzada
+CONFIG_AVANZADA_FILE = "config_avanzada.json"
+
+# Valores por defecto de las secciones "filtros" y "puntaje" (los ajusta barrido.py)
+VENTANA_SUELOS = 20
+UMBRAL_PUNTAJE = 50
+MULTIPLICADOR_VOLUMEN = 1.5
+PESOS_PUNTAJE = {
+    'doble': 30,
+    'triple': 40,
+    'divergencia_rsi': 15,
+    'divergencia_macd': 10,
+    'volumen': 10,
+    'patron_vela': 5
+}
+
+# Cargar configuración avanzada o crear por defecto
+def cargar_config_avanzada():
+    if os.path.exists(CONFIG_AVANZADA_FILE):
+        with open(CONFIG_AVANZADA_FILE, "r") as f:
+            return json.load(f)
+    else:
+        # Configuración por defecto
+        config_default = {
+            "filtros": {
+                "volumen_minimo": 0,
+                "confirmacion_patrones": True,
+                "tolerancia_patrones": 0.03,
+                "min_velas_patron": 3,
+                "ventana_suelos": VENTANA_SUELOS
+            },
+            "indicadores": {
+                "usar_bollinger": False,
+                "usar_fibonacci": False,
+                "usar_ichimoku": False,
+                "usar_atr": False
+            },
+            "alertas": {
+                "nivel_fiabilidad": "medio",  # bajo, medio, alto
+                "mostrar_probabilidad": True
+            },
+            "patrones_vela": {
+                "doji": True,
+                "morning_star": True,
+                "evening_star": True,
+                "harami": True,
+                "shooting_star": True
+            },
+            "rendimiento": {
+                "analisis_paralelo": False,
+                "max_pares_simultaneos": 10,
+                "max_descargas_simultaneas": 20,
+                "velas_patrones": 5,
+                "modo_analisis": "hilos",  # hilos o procesos
+                "procesos": 0  # 0 = todos los núcleos
+            },
+            "puntaje": {
+                "umbral": UMBRAL_PUNTAJE,
+                "multiplicador_volumen": MULTIPLICADOR_VOLUMEN,
+                "pesos": dict(PESOS_PUNTAJE)
+            },
+            "metricas": {
+                "activas": False,
+                "exportar_http": True,
+                "puerto": 9108
+            },
+            "programacion": {
+                "modo": "intervalo",  # intervalo o cierre_vela
+                "retraso_segundos": 60
+            },
+            "filtro_liquidez": {
+                "activo": True,
+                "volumen_24h_minimo": 50000,
+                "spread_maximo": 0.02,
+                "precio_minimo": 0.00000001,
+                "horas_cache_negativa": 24
+            },
+            "remuestreo": {
+                "activo": True,
+                "bases": {"12h": "4h", "3d": "1d", "1w": "1d", "1M": "1d", "1y": "1d"},
+                "velas_minimas": 200
+            },
+            "relleno_historico": {
+                "activo": True,
+                "timeframes": ["4h", "1d"],
+                "dias_historia": 4000,
+                "paginas_en_paralelo": 4,
+                "velas_analisis": 500,
+                "todos_los_pares": False
+            }
+        }
+        with open(CONFIG_AVANZADA_FILE, "w") as f:
+            json.dump(config_default, f, indent=2)
+        return config_default
+
+# Guardar configuración avanzada
+def guardar_config_avanzada(config):
+    with open(CONFIG_AVANZADA_FILE, "w") as f:
+        json.dump(config, f, indent=2)
+
+# Parámetros del puntaje y de los suelos, con los valores por defecto si el JSON es anterior
+def pesos_puntaje(config):
+    return {**PESOS_PUNTAJE, **config.get("puntaje", {}).get("pesos", {})}
+
+def umbral_puntaje(config):
+    return config.get("puntaje", {}).get("umbral", UMBRAL_PUNTAJE)
+
+def multiplicador_volumen(config):
+    return config.get("puntaje", {}).get("multiplicador_volumen", MULTIPLICADOR_VOLUMEN)
+
+def ventana_suelos(config):
+    return config["filtros"].get("ventana_suelos", VENTANA_SUELOS)
+
+# Configuración guardada en memoria; solo se relee cuando cambia el archivo
+_config_en_memoria = {'mtime': None, 'config': None}
+
+def config_avanzada_actual():
+    """Configuración avanzada guardada, sin leer el disco en cada análisis. No modificar el dict devuelto."""
+    mtime = os.path.getmtime(CONFIG_AVANZADA_FILE) if os.path.exists(CONFIG_AVANZADA_FILE) else None
+    if _config_en_memoria['config'] is None or mtime != _config_en_memoria['mtime']:
+        _config_en_memoria['config'] = cargar_config_avanzada()
+        _config_en_memoria['mtime'] = os.path.getmtime(CONFIG_AVANZADA_FILE)
+    return _config_en_memoria['config']
+
+# Función para calcular indicadores adicionales
+def calcular_indicadores_adicionales(df, config):
+    # Bandas de Bollinger
+    if config["indicadores"]["usar_bollinger"]:
+        bollinger = ta.bbands(df['close'], length=20, std=2)
+        df['bb_upper'] = bollinger['BBU_20_2.0']
+        df['bb_middle'] = bollinger['BBM_20_2.0']
+        df['bb_lower'] = bollinger['BBL_20_2.0']
+
+    # ATR (Average True Range)
+    if config["indicadores"]["usar_atr"]:
+        df['atr'] = ta.atr(df['high'], df['low'], df['close'], length=14)
+
+    # Ichimoku Cloud
+    if config["indicadores"]["usar_ichimoku"]:
+        ichimoku = ta.ichimoku(df['high'], df['low'], df['close'])
+        df['tenkan'] = ichimoku['ITS_9']
+        df['kijun'] = ichimoku['IKS_26']
+        df['senkou_a'] = ichimoku['ISA_9_26']
+        df['senkou_b'] = ichimoku['ISB_9_26']
+
+    # Fibonacci no se calcula como columna, se usa en el análisis
+
+    return df
+
+# Patrones alcistas que confirman un suelo en la fiabilidad y el puntaje
+PATRONES_CONFIRMACION = ['hammer', 'morning_star', 'harami']
+
+# Función para detectar patrones de vela adicionales
+def detectar_patrones_vela(df, config, ultimas=None):
+    # Martillo y envolvente siempre se calculan porque analizar_simbolo los usa
+    opcionales = patrones_vela.patrones_habilitados(config)
+    valores = patrones_vela.calcular_patrones(
+        df['open'].values, df['high'].values, df['low'].values, df['close'].values,
+        patrones=['hammer', 'engulfing'] + opcionales,
+        ultimas=ultimas
+    )
+
+    patrones_detectados = {}
+    for patron, serie in valores.items():
+        df[patron] = serie
+        if patron in opcionales:
+            patrones_detectados[patron] = serie[-1] != 0
+
+    return df, patrones_detectados
+
+# === DETECCIÓN VECTORIZADA DE SUELOS ===
+
+def mascara_minimos_locales(precios, min_velas):
+    """Marca los mínimos locales: precios que no superan a ninguno de sus `min_velas` vecinos a cada lado.
+
+    Acepta un array 1-D o uno 2-D con una fila por símbolo y compara cada vela
+    con su ventana mediante una vista deslizante, sin bucles en Python.
+    """
+    precios = np.asarray(precios, dtype=float)
+    n = precios.shape[-1]
+    mascara = np.zeros(precios.shape, dtype=bool)
+    if n < 2 * min_velas + 1:
+        return mascara
+    ventanas = sliding_window_view(precios, 2 * min_velas + 1, axis=-1)
+    centro = ventanas[..., min_velas:min_velas + 1]
+    # Huecos (pares que aún no cotizaban) nunca son suelos ni cuentan como vecinos
+    completa = ~np.isnan(ventanas).any(axis=-1)
+    mascara[..., min_velas:n - min_velas] = ~(centro > ventanas).any(axis=-1) & completa
+    return mascara
+
+def detectar_suelos_lote(precios, tolerancia, min_velas, volumenes=None, volumen_minimo=0):
+    """Busca doble y triple suelo en todas las filas de `precios` a la vez.
+
+    Empareja suelos consecutivos de la misma fila igual que el algoritmo
+    original: se queda con el primer triple suelo o, si no lo hay, con el
+    último doble suelo. Devuelve arrays con una posición por fila; los
+    índices son posiciones dentro de la fila (-1 si no hay patrón).
+    """
+    precios = np.atleast_2d(np.asarray(precios, dtype=float))
+    n_filas = precios.shape[0]
+    minimos = mascara_minimos_locales(precios, min_velas)
+    if volumenes is not None and volumen_minimo > 0:
+        minimos &= ~(np.atleast_2d(np.asarray(volumenes, dtype=float)) < volumen_minimo)
+
+    filas, cols = np.nonzero(minimos)
+    p = precios[filas, cols]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # d[k]: diferencia entre el suelo k y el k+1; d13[k]: entre el k y el k+2
+        d = np.abs(p[:-1] - p[1:]) / p[:-1]
+        d13 = np.abs(p[:-2] - p[2:]) / p[:-2]
+    es_doble = (filas[1:] == filas[:-1]) & (d < tolerancia)
+    es_triple = (filas[2:] == filas[:-2]) & es_doble[:-1] & (d13 < tolerancia) & (d[1:] < tolerancia)
+
+    k_triple = np.full(n_filas, len(p), dtype=np.int64)
+    k = np.nonzero(es_triple)[0]
+    np.minimum.at(k_triple, filas[k], k)
+    k_doble = np.full(n_filas, -1, dtype=np.int64)
+    k = np.nonzero(es_doble)[0]
+    np.maximum.at(k_doble, filas[k], k)
+
+    triple = k_triple < len(p)
+    k_doble = np.where(triple, k_triple, k_doble)
+    doble = k_doble >= 0
+
+    kd = np.where(doble, k_doble, 0)
+    kt = np.where(triple, k_triple, 0)
+    fiabilidad_doble = np.zeros(n_filas)
+    fiabilidad_triple = np.zeros(n_filas)
+    idx_doble = np.full((n_filas, 2), -1, dtype=np.int64)
+    idx_triple = np.full((n_filas, 3), -1, dtype=np.int64)
+    if doble.any():
+        fiabilidad_doble[doble] = 1.0 - (d[kd[doble]] / tolerancia)
+        idx_doble[doble] = np.stack([cols[kd[doble]], cols[kd[doble] + 1]], axis=1)
+    if triple.any():
+        kt = kt[triple]
+        fiabilidad_triple[triple] = 1.0 - ((d13[kt] + d[kt + 1] + d[kt]) / (3 * tolerancia))
+        idx_triple[triple] = np.stack([cols[kt], cols[kt + 1], cols[kt + 2]], axis=1)
+
+    return {
+        'minimos': minimos,
+        'doble': doble,
+        'triple': triple,
+        'idx_doble': idx_doble,
+        'idx_triple': idx_triple,
+        'fiabilidad_doble': fiabilidad_doble,
+        'fiabilidad_triple': fiabilidad_triple
+    }
+
+# Función mejorada para detectar doble/triple suelo con mayor tolerancia
+def detectar_doble_triple_suelo_mejorado(df, config, ventana=None):
+    if ventana is None:
+        ventana = ventana_suelos(config)
+    tolerancia = config["filtros"]["tolerancia_patrones"]
+    min_velas = config["filtros"]["min_velas_patron"]
+
+    precios = df['close'].tail(ventana).values
+    idxs = df['close'].tail(ventana).index
+    fechas = df['timestamp'].tail(ventana).values
+    volumenes = df['volume'].tail(ventana).values if 'volume' in df.columns else None
+
+    lote = detectar_suelos_lote(precios, tolerancia, min_velas, volumenes, config["filtros"]["volumen_minimo"])
+
+    suelos = [(idxs[i], precios[i], fechas[i]) for i in np.nonzero(lote['minimos'][0])[0]]
+    doble = bool(lote['doble'][0])
+    triple = bool(lote['triple'][0])
+    pos_doble = lote['idx_doble'][0]
+    pos_triple = lote['idx_triple'][0]
+
+    return {
+        'doble': doble,
+        'triple': triple,
+        'idx_doble': tuple(idxs[i] for i in pos_doble) if doble else None,
+        'idx_triple': tuple(idxs[i] for i in pos_triple) if triple else None,
+        'fechas_doble': tuple(fechas[i] for i in pos_doble) if doble else None,
+        'fechas_triple': tuple(fechas[i] for i in pos_triple) if triple else None,
+        'suelos': suelos,
+        'fiabilidad_doble': lote['fiabilidad_doble'][0] if doble else 0,
+        'fiabilidad_triple': lote['fiabilidad_triple'][0] if triple else 0
+    }
+
+# Función para calcular niveles de Fibonacci
+def calcular_fibonacci(df, tendencia='alcista'):
+    if tendencia == 'alcista':
+        # Para tendencia alcista, calculamos desde mínimo a máximo
+        precio_min = df['low'].min()
+        precio_max = df['high'].max()
+    else:
+        # Para tendencia bajista, calculamos desde máximo a mínimo
+        precio_min = df['high'].max()
+        precio_max = df['low'].min()
+
+    # Niveles de Fibonacci estándar
+    rango = abs(precio_max - precio_min)
+    niveles = {
+        '0.0': precio_min,
+        '0.236': precio_min + 0.236 * rango,
+        '0.382': precio_min + 0.382 * rango,
+        '0.5': precio_min + 0.5 * rango,
+        '0.618': precio_min + 0.618 * rango,
+        '0.786': precio_min + 0.786 * rango,
+        '1.0': precio_max
+    }
+
+    return niveles
+
+# Función para evaluar la fiabilidad de una señal
+def evaluar_fiabilidad_senal(df, tipo_senal, patrones_vela, config):
+    fiabilidad = 0.5  # Fiabilidad base
+
+    # Factores que aumentan la fiabilidad
+    if tipo_senal == 'doble_suelo' or tipo_senal == 'triple_suelo':
+        # Mayor fiabilidad para triple suelo que para doble
+        fiabilidad = 0.6 if tipo_senal == 'doble_suelo' else 0.7
+
+        # Verificar confirmación con volumen
+        if 'volume' in df.columns:
+            ultimo_volumen = df['volume'].iloc[-1]
+            promedio_volumen = df['volume'].tail(10).mean()
+            if ultimo_volumen > promedio_volumen * 1.5:
+                fiabilidad += 0.1
+
+        # Verificar RSI en zona de sobreventa
+        if 'rsi' in df.columns and df['rsi'].iloc[-1] < 30:
+            fiabilidad += 0.1
+
+        # Verificar si hay patrones de vela confirmatorios
+        for patron in PATRONES_CONFIRMACION:
+            if patron in patrones_vela and patrones_vela[patron]:
+                fiabilidad += 0.05
+
+    elif tipo_senal == 'divergencia_alcista':
+        # Verificar fuerza de la divergencia
+        if 'rsi' in df.columns:
+            rsi_actual = df['rsi'].iloc[-1]
+            if rsi_actual < 30:
+                fiabilidad += 0.15
+            elif rsi_actual < 40:
+                fiabilidad += 0.1
+
+        # Verificar si hay patrones de vela confirmatorios
+        if any(patrones_vela.values()):
+            fiabilidad += 0.1
+
+    # Limitar la fiabilidad entre 0 y 1
+    fiabilidad = min(max(fiabilidad, 0), 1)
+    return nivel_fiabilidad(fiabilidad)
+
+def nivel_fiabilidad(fiabilidad):
+    """Convierte una fiabilidad entre 0 y 1 en el dict {'valor', 'nivel', 'porcentaje'}."""
+    if fiabilidad >= 0.7:
+        nivel = "alto"
+    elif fiabilidad >= 0.5:
+        nivel = "medio"
+    else:
+        nivel = "bajo"
+
+    return {
+        'valor': fiabilidad,
+        'nivel': nivel,
+        'porcentaje': int(fiabilidad * 100)
+    }
+# Función para generar mensaje de alerta con nivel de fiabilidad
+def generar_mensaje_alerta(symbol, tipo, precio, fiabilidad, timeframe, patrones_vela):
+    # Emojis según nivel de fiabilidad
+    emoji_fiabilidad = "⚠️" if fiabilidad['nivel'] == "bajo" else "✅" if fiabilidad['nivel'] == "alto" else "ℹ️"
+
+    # Emojis según tipo de señal
+    emoji_tipo = {
+        "DOBLE SUELO": "🔵",
+        "TRIPLE SUELO": "🟣",
+        "DIVERGENCIA ALCISTA": "📈",
+        "DIVERGENCIA BAJISTA": "📉",
+        "CAMBIO DE TENDENCIA ALCISTA": "🚀"
+    }.get(tipo, "🔍")
+
+    mensaje = (
+        f"{emoji_tipo} {tipo} DETECTADO\n"
+        f"Par: {symbol}\n"
+        f"Temporalidad: {timeframe}\n"
+        f"Precio actual: {precio:.8f}\n"
+        f"{emoji_fiabilidad} Fiabilidad: {fiabilidad['porcentaje']}% ({fiabilidad['nivel']})\n"
+    )
+
+    # Añadir patrones de vela confirmatorios si existen
+    patrones_presentes = [k for k, v in patrones_vela.items() if v]
+    if patrones_presentes:
+        mensaje += f"Patrones confirmatorios: {', '.join(patrones_presentes)}\n"
+
+    return mensaje
+
+# === DETECCIÓN DE DIVERGENCIAS ALCISTAS/BAJISTAS ===
+
+# Velas de confirmación a cada lado de un pivote y separación admitida entre dos pivotes emparejados
+VELAS_PIVOTE = 2
+DISTANCIA_MINIMA_PIVOTES = 3
+DISTANCIA_MAXIMA_PIVOTES = 60
+
+def _extremo_cercano(valores, lado, minimo=True):
+    """Mínimo (o máximo) del oscilador en las `lado` velas a cada lado de cada posición.
+
+    Así el pivote del oscilador puede caer una o dos velas antes o después del
+    pivote del precio. Los bordes sin ventana completa quedan en NaN.
+    """
+    n = valores.shape[-1]
+    extremo = np.full(valores.shape, np.nan)
+    if n < 2 * lado + 1:
+        return extremo
+    ventanas = sliding_window_view(valores, 2 * lado + 1, axis=-1)
+    # fmin/fmax ignoran los NaN sueltos sin avisos
+    reducir = np.fmin if minimo else np.fmax
+    extremo[..., lado:n - lado] = reducir.reduce(ventanas, axis=-1)
+    return extremo
+
+def _emparejar_pivotes(pivotes, min_distancia, max_distancia):
+    """Pares de pivotes consecutivos de la misma fila: (fila, inicio, fin)."""
+    filas, cols = np.nonzero(pivotes)
+    valido = (filas[1:] == filas[:-1]) & (cols[1:] - cols[:-1] >= min_distancia) & (cols[1:] - cols[:-1] <= max_distancia)
+    k = np.nonzero(valido)[0]
+    return filas[k], cols[k], cols[k + 1]
+
+def detectar_divergencias_lote(precios, oscilador, lado=VELAS_PIVOTE, reciente=30,
+                               min_distancia=DISTANCIA_MINIMA_PIVOTES, max_distancia=DISTANCIA_MAXIMA_PIVOTES):
+    """Divergencias regulares y ocultas entre precio y oscilador en todas las filas a la vez.
+
+    Acepta arrays 1-D o 2-D (una fila por símbolo, tiempo en el último eje).
+    Empareja mínimos consecutivos del precio (divergencias alcistas) y máximos
+    consecutivos (bajistas) y compara el oscilador en esos mismos puntos:
+
+      regular alcista: precio hace mínimo más bajo y el oscilador uno más alto
+      oculta alcista:  precio hace mínimo más alto y el oscilador uno más bajo
+      regular bajista: precio hace máximo más alto y el oscilador uno más bajo
+      oculta bajista:  precio hace máximo más bajo y el oscilador uno más alto
+
+    Devuelve un dict de arrays con un elemento por evento (fila, inicio, fin,
+    alcista, oculta, precios y valores del oscilador en ambos pivotes) y
+    'actual': por fila, 1/-1 si la divergencia regular más reciente termina en
+    las últimas `reciente` velas y es alcista/bajista, 0 si no hay.
+    """
+    precios = np.atleast_2d(np.asarray(precios, dtype=float))
+    oscilador = np.atleast_2d(np.asarray(oscilador, dtype=float))
+    n_filas, n = precios.shape
+
+    partes = []
+    for alcista in (True, False):
+        # Un máximo del precio es un mínimo de -precio
+        pivotes = mascara_minimos_locales(precios if alcista else -precios, lado)
+        filas, inicio, fin = _emparejar_pivotes(pivotes, min_distancia, max_distancia)
+        extremo = _extremo_cercano(oscilador, lado, minimo=alcista)
+        p1, p2 = precios[filas, inicio], precios[filas, fin]
+        o1, o2 = extremo[filas, inicio], extremo[filas, fin]
+        with np.errstate(invalid='ignore'):
+            if alcista:
+                regular = (p2 < p1) & (o2 > o1)
+                oculta = (p2 > p1) & (o2 < o1)
+            else:
+                regular = (p2 > p1) & (o2 < o1)
+                oculta = (p2 < p1) & (o2 > o1)
+        k = regular | oculta
+        partes.append({
+            'fila': filas[k],
+            'inicio': inicio[k],
+            'fin': fin[k],
+            'alcista': np.full(k.sum(), alcista),
+            'oculta': oculta[k],
+            'precio_inicio': p1[k],
+            'precio_fin': p2[k],
+            'valor_inicio': o1[k],
+            'valor_fin': o2[k]
+        })
+    eventos = {clave: np.concatenate([parte[clave] for parte in partes]) for clave in partes[0]}
+
+    # Orden cronológico dentro de cada fila
+    orden = np.lexsort((eventos['fin'], eventos['fila']))
+    eventos = {clave: valores[orden] for clave, valores in eventos.items()}
+
+    # Divergencia regular más reciente de cada fila
+    actual = np.zeros(n_filas, dtype=np.int64)
+    ultimo_fin = np.full(n_filas, -1, dtype=np.int64)
+    regulares = np.nonzero(~eventos['oculta'] & (eventos['fin'] >= n - reciente))[0]
+    np.maximum.at(ultimo_fin, eventos['fila'][regulares], eventos['fin'][regulares])
+    elegidos = regulares[eventos['fin'][regulares] == ultimo_fin[eventos['fila'][regulares]]]
+    # Si un mínimo y un máximo cierran en la misma vela, se anulan
+    np.add.at(actual, eventos['fila'][elegidos], np.where(eventos['alcista'][elegidos], 1, -1))
+    eventos['actual'] = np.sign(actual)
+    return eventos
+
+def detectar_divergencias(df, ventana=30):
+    """Detecta divergencias RSI y MACD frente al precio.
+
+    'rsi' y 'macd' valen 'alcista'/'bajista' si la divergencia regular más
+    reciente termina en las últimas `ventana` velas. 'eventos' lista todas las
+    divergencias del DataFrame (regulares y ocultas) para el gráfico o el backtest.
+    """
+    divergencias = {'rsi': None, 'macd': None, 'eventos': []}
+    if len(df) < 2 * VELAS_PIVOTE + DISTANCIA_MINIMA_PIVOTES + 1:
+        return divergencias
+
+    precios = df['close'].values
+    tiempos = df['timestamp'] if 'timestamp' in df.columns else df.index.to_series()
+    for indicador in ('rsi', 'macd'):
+        if indicador not in df.columns:
+            continue
+        resultado = detectar_divergencias_lote(precios, df[indicador].values, reciente=ventana)
+        if resultado['actual'][0]:
+            divergencias[indicador] = 'alcista' if resultado['actual'][0] > 0 else 'bajista'
+        for k in range(len(resultado['fin'])):
+            divergencias['eventos'].append({
+                'indicador': indicador,
+                'tipo': 'alcista' if resultado['alcista'][k] else 'bajista',
+                'clase': 'oculta' if resultado['oculta'][k] else 'regular',
+                'inicio': tiempos.iloc[resultado['inicio'][k]],
+                'fin': tiempos.iloc[resultado['fin'][k]],
+                'precio_inicio': float(resultado['precio_inicio'][k]),
+                'precio_fin': float(resultado['precio_fin'][k]),
+                'valor_inicio': float(resultado['valor_inicio'][k]),
+                'valor_fin': float(resultado['valor_fin'][k])
+            })
+
+    divergencias['eventos'].sort(key=lambda evento: evento['fin'])
+    return divergencias
+
+# === VALIDACIÓN AVANZADA POR VOLUMEN ===
+
+def validar_con_volumen(df, config, multiplicador=None):
+    """Valida si el volumen actual supera el promedio reciente."""
+    if 'volume' not in df.columns or len(df) < 10:
+        return False
+    if multiplicador is None:
+        multiplicador = multiplicador_volumen(config)
+
+    vol_actual = df['volume'].iloc[-1]
+    vol_promedio = df['volume'].tail(10).mean()
+
+    # Se considera válido si supera el promedio por X multiplicador
+    return vol_actual >= vol_promedio * multiplicador
+
+# === CÁLCULO DE PUNTAJE COMPUESTO DE SEÑALES ===
+
+def calcular_puntaje_senal(df, patrones_suelo, patrones_vela, divergencias, config):
+    """Evalúa señales múltiples y asigna un puntaje compuesto (0 a 100)."""
+    puntaje = 0
+    razones = []
+    pesos = pesos_puntaje(config)
+
+    # Base por tipo de suelo
+    if patrones_suelo.get('doble'):
+        puntaje += pesos['doble']
+        razones.append("🔵 Doble suelo")
+    if patrones_suelo.get('triple'):
+        puntaje += pesos['triple']
+        razones.append("🟣 Triple suelo")
+
+    # Divergencias
+    if divergencias['rsi'] == 'alcista':
+        puntaje += pesos['divergencia_rsi']
+        razones.append("📈 Divergencia RSI alcista")
+    if divergencias['macd'] == 'alcista':
+        puntaje += pesos['divergencia_macd']
+        razones.append("📈 Divergencia MACD alcista")
+
+    # Volumen
+    if validar_con_volumen(df, config):
+        puntaje += pesos['volumen']
+        razones.append("💥 Volumen elevado")
+
+    # Patrones de vela confirmatorios
+    cantidad = sum(1 for p in PATRONES_CONFIRMACION if patrones_vela.get(p))
+    puntaje += cantidad * pesos['patron_vela']
+    if cantidad > 0:
+        razones.append(f"🕯️ {cantidad} patrón(es) de vela")
+
+    # Límite de 100
+    puntaje = min(puntaje, 100)
+
+    return {
+        'puntaje': puntaje,
+        'razones': razones
+    }
+
+# === CÁLCULO COMPLETO DE MEJORAS ===
+
+def calcular_mejoras(df, config_avanzada):
+    """Calcula todas las mejoras sobre `df` sin tocar disco ni interfaz.
+
+    La configuración llega como argumento (config_avanzada_actual() fuera del
+    dashboard) y el dibujado queda para newstuff.renderizar_mejoras.
+    """
+    if df is None:
+        return None
+
+    # Calcular indicadores adicionales
+    with metricas.medir('indicadores_adicionales'):
+        df = calcular_indicadores_adicionales(df, config_avanzada)
+
+    # Detectar patrones de vela (una sola pasada, solo las últimas velas si así se configura)
+    with metricas.medir('patrones_vela'):
+        df, patrones_vela = detectar_patrones_vela(
+            df, config_avanzada, ultimas=config_avanzada.get("rendimiento", {}).get("velas_patrones")
+        )
+
+    # Detectar patrones de suelo
+    with metricas.medir('suelos'):
+        patrones_suelo = detectar_doble_triple_suelo_mejorado(df, config_avanzada)
+
+    # Detectar divergencias RSI/MACD
+    with metricas.medir('divergencias'):
+        divergencias = detectar_divergencias(df)
+
+    # Evaluar fiabilidad individual
+    with metricas.medir('fiabilidad'):
+        fiabilidad_doble_suelo = evaluar_fiabilidad_senal(df, 'doble_suelo', patrones_vela, config_avanzada)
+        fiabilidad_triple_suelo = evaluar_fiabilidad_senal(df, 'triple_suelo', patrones_vela, config_avanzada)
+
+    # Evaluar puntaje compuesto
+    with metricas.medir('puntaje'):
+        puntaje_total = calcular_puntaje_senal(
+            df,
+            patrones_suelo,
+            patrones_vela,
+            divergencias,
+            config_avanzada
+        )
+
+    return {
+        'df': df,
+        'patrones_suelo': patrones_suelo,
+        'patrones_vela': patrones_vela,
+        'fiabilidad_doble_suelo': fiabilidad_doble_suelo,
+        'fiabilidad_triple_suelo': fiabilidad_triple_suelo,
+        'divergencias': divergencias,
+        'puntaje_total': puntaje_total,
+        'config_avanzada': config_avanzada
+    }
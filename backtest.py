@@ -0,0 +1,272 @@
+# backtest.py
+# Backtest vectorizado de las señales de analizar_simbolo sobre las velas guardadas en el almacén.
+# Cada vela histórica se evalúa como si fuera la última, pero sin recortar DataFrames vela a vela:
+# los detectores se aplican a todo el histórico (y a todos los pares de un bloque) de una vez.
+# Uso: python backtest.py [--timeframe 1d] [--procesos N] [--pares BTC/USDT ETH/USDT]
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+import analisis
+import almacen_velas
+import indicadores
+import panel
+import patrones_vela
+
+HORIZONTES = (1, 5, 10, 20)  # velas tras la señal a las que se mide la rentabilidad
+TIPOS_SENAL = ['doble_suelo', 'triple_suelo', 'cambio_tendencia', 'puntaje']
+VENTANA_DIVERGENCIAS = 30  # `ventana` por defecto de detectar_divergencias
+
+
+# === SEÑALES POR VELA ===
+def _divergencia_por_vela(eventos, forma, lado=analisis.VELAS_PIVOTE, reciente=VENTANA_DIVERGENCIAS):
+    """Valor de detectar_divergencias en cada vela: 1/-1 si la divergencia regular más
+    reciente ya confirmada termina en las últimas `reciente` velas, 0 si no."""
+    n_filas, n = forma
+    regulares = ~eventos['oculta'] & (eventos['fin'] + lado < n)
+    filas = eventos['fila'][regulares]
+    # El segundo pivote se confirma `lado` velas después
+    visible = eventos['fin'][regulares] + lado
+    signo = np.zeros(forma)
+    hay = np.zeros(forma, dtype=bool)
+    np.add.at(signo, (filas, visible), np.where(eventos['alcista'][regulares], 1.0, -1.0))
+    hay[filas, visible] = True
+
+    ultimo = np.where(hay, np.arange(n)[None, :], -1)
+    ultimo = np.maximum.accumulate(ultimo, axis=1)
+    vigente = (ultimo >= 0) & (ultimo - lado >= np.arange(n)[None, :] - reciente + 1)
+    return np.where(vigente, np.sign(np.take_along_axis(signo, np.maximum(ultimo, 0), axis=1)), 0).astype(np.int64)
+
+def preparar_base(datos, valido, config):
+    """Todo lo que no depende de tolerancias, ventana, multiplicador ni pesos.
+
+    Indicadores, patrones, divergencias y media de volumen se calculan una sola
+    vez y barrido.py los reutiliza para todas las combinaciones de parámetros.
+    """
+    apertura, alto, bajo, cierre, volumen = (datos[:, :, k] for k in range(len(panel.CAMPOS)))
+    n_filas, n = cierre.shape
+
+    valores = indicadores.calcular_indicadores_lote(cierre)
+    opcionales = patrones_vela.patrones_habilitados(config)
+    patrones = patrones_vela.calcular_patrones(
+        apertura, alto, bajo, cierre, patrones=['hammer', 'engulfing'] + opcionales
+    )
+
+    with np.errstate(invalid='ignore'):
+        ema50, ema200 = valores['ema50'], valores['ema200']
+        cruce_ema = np.zeros((n_filas, n), dtype=bool)
+        cruce_ema[:, 1:] = (ema50[:, :-1] < ema200[:, :-1]) & (ema50[:, 1:] > ema200[:, 1:])
+        macd_alcista = valores['macd'] > valores['macd_signal']
+        patron_reversion = (patrones['hammer'] != 0) | (patrones['engulfing'] == 100)
+
+    # Media de las últimas 10 velas de volumen (validar_con_volumen)
+    acumulado = np.concatenate([np.zeros((n_filas, 1)), np.cumsum(np.nan_to_num(volumen), axis=1)], axis=1)
+    vol_promedio = np.full((n_filas, n), np.nan)
+    vol_promedio[:, 9:] = (acumulado[:, 10:] - acumulado[:, :-10]) / 10
+
+    return {
+        'cierre': cierre,
+        'volumen': volumen,
+        'listo': valido & (np.cumsum(valido, axis=1) >= panel.MIN_VELAS),
+        'cambio_tendencia': cruce_ema & macd_alcista & patron_reversion,
+        'divergencia_rsi': _divergencia_por_vela(analisis.detectar_divergencias_lote(cierre, valores['rsi']), cierre.shape),
+        'divergencia_macd': _divergencia_por_vela(analisis.detectar_divergencias_lote(cierre, valores['macd']), cierre.shape),
+        'vol_promedio': vol_promedio,
+        'confirmaciones': sum(
+            (patrones[p] != 0).astype(int) for p in analisis.PATRONES_CONFIRMACION if p in opcionales
+        )
+    }
+
+def detectar_suelos_por_vela(cierre, volumen, tolerancia, min_velas, ventana, volumen_minimo=0):
+    """Doble y triple suelo de la ventana de `ventana` velas que termina en cada vela.
+
+    Cada ventana es una fila más para detectar_suelos_lote. Devuelve (doble, triple).
+    """
+    n_filas, n = cierre.shape
+    doble = np.zeros((n_filas, n), dtype=bool)
+    triple = np.zeros((n_filas, n), dtype=bool)
+    if n >= ventana:
+        ventanas = sliding_window_view(cierre, ventana, axis=1).reshape(-1, ventana)
+        ventanas_vol = sliding_window_view(volumen, ventana, axis=1).reshape(-1, ventana)
+        suelos = analisis.detectar_suelos_lote(ventanas, tolerancia, min_velas, ventanas_vol, volumen_minimo)
+        doble[:, ventana - 1:] = suelos['doble'].reshape(n_filas, -1)
+        triple[:, ventana - 1:] = suelos['triple'].reshape(n_filas, -1)
+    return doble, triple
+
+def senales_desde_base(base, config, suelos=None):
+    """Señales y puntaje a partir de preparar_base() con los parámetros de `config`.
+
+    `suelos` permite pasar un (doble, triple) ya calculado con los mismos filtros.
+    """
+    filtros = config["filtros"]
+    if suelos is None:
+        suelos = detectar_suelos_por_vela(
+            base['cierre'], base['volumen'], filtros["tolerancia_patrones"], filtros["min_velas_patron"],
+            analisis.ventana_suelos(config), filtros["volumen_minimo"]
+        )
+    doble, triple = suelos
+    with np.errstate(invalid='ignore'):
+        volumen_elevado = base['volumen'] >= base['vol_promedio'] * analisis.multiplicador_volumen(config)
+
+    pesos = analisis.pesos_puntaje(config)
+    puntaje = np.minimum(
+        doble * pesos['doble']
+        + triple * pesos['triple']
+        + (base['divergencia_rsi'] == 1) * pesos['divergencia_rsi']
+        + (base['divergencia_macd'] == 1) * pesos['divergencia_macd']
+        + volumen_elevado * pesos['volumen']
+        + base['confirmaciones'] * pesos['patron_vela'],
+        100
+    )
+
+    listo = base['listo']
+    senales = {
+        'doble_suelo': doble & listo,
+        'triple_suelo': triple & listo,
+        'cambio_tendencia': base['cambio_tendencia'] & listo,
+        'puntaje': (puntaje >= analisis.umbral_puntaje(config)) & listo
+    }
+    return senales, puntaje
+
+def calcular_senales(datos, valido, config):
+    """Señales de analizar_simbolo en cada vela de un panel alineado a la derecha.
+
+    Devuelve ({tipo: máscara (par, vela)}, puntaje (par, vela)). Una vela solo
+    cuenta cuando el par ya tiene las 20 velas que exige analizar_simbolo.
+    """
+    return senales_desde_base(preparar_base(datos, valido, config), config)
+
+def solo_nuevas(activa):
+    """Deja solo la primera vela de cada racha de una señal activa."""
+    anterior = np.zeros_like(activa)
+    anterior[:, 1:] = activa[:, :-1]
+    return activa & ~anterior
+
+def retornos_futuros(cierre, bajo, horizontes=HORIZONTES):
+    """Rentabilidad a cada horizonte y peor caída (mínimo de `bajo`) hasta el horizonte mayor."""
+    n_filas, n = cierre.shape
+    retornos = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for h in horizontes:
+            futuro = np.full((n_filas, n), np.nan)
+            futuro[:, :n - h] = cierre[:, h:]
+            retornos[h] = futuro / cierre - 1
+
+        h_max = max(horizontes)
+        bajos = np.concatenate([bajo[:, 1:], np.full((n_filas, h_max), np.nan)], axis=1)
+        minimo = np.fmin.reduce(sliding_window_view(bajos, h_max, axis=1)[:, :n], axis=-1)
+        drawdown = np.minimum(minimo / cierre - 1, 0)
+    return retornos, drawdown
+
+
+# === BACKTEST ===
+def backtest_panel(mercado, config, horizontes=HORIZONTES, nuevas=True):
+    """Señales históricas de un PanelMercado como DataFrame (una fila por señal).
+
+    Con `nuevas` una señal que sigue activa varias velas seguidas (un doble
+    suelo sigue en la ventana de 20 velas) solo se registra en la primera.
+    """
+    datos, valido = mercado.alinear_derecha()
+    if datos.shape[1] == 0:
+        return pd.DataFrame()
+    tiempos = mercado.tiempos_alineados()
+    cierre, bajo = datos[:, :, 3], datos[:, :, 2]
+
+    senales, puntaje = calcular_senales(datos, valido, config)
+    retornos, drawdown = retornos_futuros(cierre, bajo, horizontes)
+
+    partes = []
+    for tipo, activa in senales.items():
+        if nuevas:
+            activa = solo_nuevas(activa)
+        filas, velas = np.nonzero(activa)
+        parte = pd.DataFrame({
+            'symbol': np.array(mercado.symbols, dtype=object)[filas],
+            'timestamp': pd.to_datetime(tiempos[filas, velas], unit='ms'),
+            'tipo': tipo,
+            'precio': cierre[filas, velas],
+            'puntaje': puntaje[filas, velas]
+        })
+        for h in horizontes:
+            parte[f'retorno_{h}'] = retornos[h][filas, velas]
+        parte['drawdown'] = drawdown[filas, velas]
+        partes.append(parte)
+    return pd.concat(partes, ignore_index=True)
+
+def resumir(senales, horizontes=HORIZONTES):
+    """Por tipo de señal: número de señales, rentabilidad media y acierto (% > 0) a cada horizonte y caídas."""
+    filas = {}
+    for tipo in TIPOS_SENAL:
+        grupo = senales[senales['tipo'] == tipo] if len(senales) else senales
+        fila = {'senales': len(grupo)}
+        for h in horizontes:
+            retorno = grupo[f'retorno_{h}'].dropna() if len(grupo) else pd.Series(dtype=float)
+            fila[f'retorno_medio_{h}'] = retorno.mean() if len(retorno) else np.nan
+            fila[f'acierto_{h}'] = (retorno > 0).mean() if len(retorno) else np.nan
+        fila['drawdown_medio'] = grupo['drawdown'].mean() if len(grupo) else np.nan
+        fila['drawdown_maximo'] = grupo['drawdown'].min() if len(grupo) else np.nan
+        filas[tipo] = fila
+    return pd.DataFrame.from_dict(filas, orient='index')
+
+def cargar_panel(ruta, timeframe, symbols):
+    """PanelMercado con todo el histórico guardado de `symbols`."""
+    almacen = almacen_velas.AlmacenVelas(ruta)
+    dataframes = {symbol: almacen.leer(symbol, timeframe, limit=-1) for symbol in symbols}
+    return panel.PanelMercado.desde_dataframes(dataframes, timeframe)
+
+def _backtest_bloque(ruta, timeframe, symbols, config, horizontes, nuevas):
+    """Tarea de un proceso: lee un bloque de pares del almacén y lo evalúa como un panel."""
+    mercado = cargar_panel(ruta, timeframe, symbols)
+    if not len(mercado):
+        return pd.DataFrame()
+    return backtest_panel(mercado, config, horizontes, nuevas)
+
+def ejecutar_backtest(symbols=None, timeframe="1d", config=None, ruta=almacen_velas.ALMACEN_FILE, procesos=None,
+                      pares_por_bloque=50, horizontes=HORIZONTES, nuevas=True):
+    """Backtest de todos los pares guardados (o de `symbols`) repartido en bloques entre procesos.
+
+    Devuelve (señales, resumen). Con procesos=1, o si no se puede crear el
+    pool de procesos, los bloques se evalúan en este mismo proceso.
+    """
+    if config is None:
+        config = analisis.cargar_config_avanzada()
+    if symbols is None:
+        symbols = almacen_velas.AlmacenVelas(ruta).simbolos(timeframe)
+    bloques = [symbols[i:i + pares_por_bloque] for i in range(0, len(symbols), pares_por_bloque)]
+    argumentos = (config, horizontes, nuevas)
+
+    procesos = procesos or os.cpu_count() or 1
+    resultados = None
+    if procesos > 1 and len(bloques) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(procesos, len(bloques))) as pool:
+                futuros = [pool.submit(_backtest_bloque, ruta, timeframe, bloque, *argumentos) for bloque in bloques]
+                resultados = [futuro.result() for futuro in futuros]
+        except (OSError, NotImplementedError) as e:
+            print(f"Pool de procesos no disponible ({e}), backtest en un solo proceso")
+    if resultados is None:
+        resultados = [_backtest_bloque(ruta, timeframe, bloque, *argumentos) for bloque in bloques]
+
+    resultados = [r for r in resultados if len(r)]
+    senales = pd.concat(resultados, ignore_index=True) if resultados else pd.DataFrame(
+        columns=['symbol', 'timestamp', 'tipo', 'precio', 'puntaje'] + [f'retorno_{h}' for h in horizontes] + ['drawdown']
+    )
+    return senales, resumir(senales, horizontes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest de las señales sobre las velas guardadas")
+    parser.add_argument("--timeframe", default="1d")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--pares", nargs="*", default=None)
+    parser.add_argument("--almacen", default=almacen_velas.ALMACEN_FILE)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    senales, resumen = ejecutar_backtest(args.pares, args.timeframe, ruta=args.almacen, procesos=args.procesos)
+    print(resumen.to_string())
+    print(f"{len(senales)} señales en {time.perf_counter() - inicio:.1f}s")
@@ -0,0 +1,207 @@
+# barrido.py
+# Barrido de parámetros (rejilla o aleatorio) sobre el histórico guardado: tolerancias de suelos,
+# ventana, multiplicador de volumen, pesos y umbral del puntaje. Cada proceso calcula una vez
+# indicadores, patrones y divergencias de su bloque de pares y los reutiliza en todas las combinaciones.
+# Uso: python barrido.py [--timeframe 1d] [--aleatorias 200] [--procesos N] [--guardar]
+
+import argparse
+import copy
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import analisis
+import almacen_velas
+import backtest
+
+ESPACIO_POR_DEFECTO = {
+    'tolerancia_patrones': [0.01, 0.02, 0.03, 0.05],
+    'min_velas_patron': [2, 3, 4, 5],
+    'ventana_suelos': [15, 20, 30],
+    'multiplicador_volumen': [1.2, 1.5, 2.0],
+    'umbral': [40, 50, 60],
+    'peso_doble': [20, 30, 40],
+    'peso_triple': [30, 40, 50],
+    'peso_divergencia_rsi': [10, 15, 20],
+    'peso_divergencia_macd': [5, 10, 15],
+    'peso_volumen': [5, 10, 15],
+    'peso_patron_vela': [5, 10]
+}
+PARAMETROS_FILTROS = ('tolerancia_patrones', 'min_velas_patron', 'ventana_suelos')
+PARAMETROS_PUNTAJE = ('umbral', 'multiplicador_volumen')
+OBJETIVO = 'retorno_medio_10'  # columna de resumir() con la que se ordena el ranking
+MIN_SENALES = 30  # combinaciones con menos señales del tipo objetivo quedan al final
+
+
+# === COMBINACIONES ===
+def generar_combinaciones(espacio=ESPACIO_POR_DEFECTO, aleatorias=None, semilla=0):
+    """Todas las combinaciones del espacio o, con `aleatorias`, una muestra sin repetir."""
+    claves = list(espacio)
+    if aleatorias is None:
+        return [dict(zip(claves, valores)) for valores in itertools.product(*(espacio[c] for c in claves))]
+    azar = random.Random(semilla)
+    total = int(np.prod([len(espacio[c]) for c in claves]))
+    vistas = set()
+    while len(vistas) < min(aleatorias, total):
+        vistas.add(tuple(azar.choice(espacio[c]) for c in claves))
+    return [dict(zip(claves, valores)) for valores in sorted(vistas)]
+
+def aplicar_combinacion(config, combinacion):
+    """Copia de `config` con los valores de la combinación en su sitio del JSON."""
+    config = copy.deepcopy(config)
+    puntaje = config.setdefault("puntaje", {})
+    pesos = puntaje.setdefault("pesos", dict(analisis.PESOS_PUNTAJE))
+    for clave, valor in combinacion.items():
+        if clave in PARAMETROS_FILTROS:
+            config["filtros"][clave] = valor
+        elif clave in PARAMETROS_PUNTAJE:
+            puntaje[clave] = valor
+        elif clave.startswith('peso_'):
+            pesos[clave[len('peso_'):]] = valor
+        else:
+            raise ValueError(f"Parámetro desconocido en el barrido: {clave}")
+    return config
+
+
+# === EVALUACIÓN ===
+def _acumular(activa, retornos, drawdown, horizontes):
+    """Sumas parciales de un tipo de señal, para poder juntar los bloques después."""
+    fila = {'senales': int(activa.sum())}
+    for h in horizontes:
+        valores = retornos[h][activa]
+        valores = valores[~np.isnan(valores)]
+        fila[f'suma_{h}'] = float(valores.sum())
+        fila[f'n_{h}'] = len(valores)
+        fila[f'positivos_{h}'] = int((valores > 0).sum())
+    caidas = drawdown[activa]
+    caidas = caidas[~np.isnan(caidas)]
+    fila['suma_drawdown'] = float(caidas.sum())
+    fila['n_drawdown'] = len(caidas)
+    fila['peor_drawdown'] = float(caidas.min()) if len(caidas) else 0.0
+    return fila
+
+def _evaluar_bloque(ruta, timeframe, symbols, config, combinaciones, horizontes):
+    """Tarea de un proceso: todas las combinaciones sobre un bloque de pares."""
+    mercado = backtest.cargar_panel(ruta, timeframe, symbols)
+    if not len(mercado):
+        return []
+    datos, valido = mercado.alinear_derecha()
+    base = backtest.preparar_base(datos, valido, config)
+    retornos, drawdown = backtest.retornos_futuros(base['cierre'], datos[:, :, 2], horizontes)
+
+    # Los suelos solo dependen de tolerancia, mínimo de velas y ventana
+    suelos_calculados = {}
+    resultados = []
+    for combinacion in combinaciones:
+        config_comb = aplicar_combinacion(config, combinacion)
+        filtros = config_comb["filtros"]
+        clave = (filtros["tolerancia_patrones"], filtros["min_velas_patron"], analisis.ventana_suelos(config_comb))
+        if clave not in suelos_calculados:
+            suelos_calculados[clave] = backtest.detectar_suelos_por_vela(
+                base['cierre'], base['volumen'], *clave, filtros["volumen_minimo"]
+            )
+        senales, _ = backtest.senales_desde_base(base, config_comb, suelos_calculados[clave])
+        resultados.append({
+            tipo: _acumular(backtest.solo_nuevas(activa), retornos, drawdown, horizontes)
+            for tipo, activa in senales.items()
+        })
+    return resultados
+
+def _combinar(parciales, combinaciones, horizontes):
+    """Junta las sumas de todos los bloques en una tabla con una fila por combinación."""
+    filas = []
+    for i, combinacion in enumerate(combinaciones):
+        fila = dict(combinacion)
+        for tipo in backtest.TIPOS_SENAL:
+            bloques = [parcial[i][tipo] for parcial in parciales if parcial]
+
+            def total(campo):
+                return sum(b[campo] for b in bloques)
+
+            fila[f'{tipo}_senales'] = total('senales')
+            for h in horizontes:
+                n = total(f'n_{h}')
+                fila[f'{tipo}_retorno_medio_{h}'] = total(f'suma_{h}') / n if n else np.nan
+                fila[f'{tipo}_acierto_{h}'] = total(f'positivos_{h}') / n if n else np.nan
+            n = total('n_drawdown')
+            fila[f'{tipo}_drawdown_medio'] = total('suma_drawdown') / n if n else np.nan
+            fila[f'{tipo}_drawdown_maximo'] = min((b['peor_drawdown'] for b in bloques), default=np.nan)
+        filas.append(fila)
+    return pd.DataFrame(filas)
+
+def clasificar(tabla, objetivo=OBJETIVO, tipo='puntaje', min_senales=MIN_SENALES):
+    """Ordena la tabla por `tipo`_`objetivo`; las combinaciones con pocas señales van al final."""
+    suficientes = tabla[f'{tipo}_senales'] >= min_senales
+    return pd.concat([
+        tabla[suficientes].sort_values(f'{tipo}_{objetivo}', ascending=False),
+        tabla[~suficientes].sort_values(f'{tipo}_{objetivo}', ascending=False)
+    ]).reset_index(drop=True)
+
+def barrer(combinaciones, symbols=None, timeframe="1d", config=None, ruta=almacen_velas.ALMACEN_FILE, procesos=None,
+           pares_por_bloque=50, horizontes=backtest.HORIZONTES):
+    """Evalúa todas las `combinaciones` sobre el histórico y devuelve la tabla sin ordenar.
+
+    Los bloques de pares se reparten entre procesos; con procesos=1, o si no se
+    puede crear el pool, se evalúan en este mismo proceso.
+    """
+    if config is None:
+        config = analisis.cargar_config_avanzada()
+    if symbols is None:
+        symbols = almacen_velas.AlmacenVelas(ruta).simbolos(timeframe)
+    bloques = [symbols[i:i + pares_por_bloque] for i in range(0, len(symbols), pares_por_bloque)]
+    argumentos = (config, combinaciones, horizontes)
+
+    procesos = procesos or os.cpu_count() or 1
+    parciales = None
+    if procesos > 1 and len(bloques) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=min(procesos, len(bloques))) as pool:
+                futuros = [pool.submit(_evaluar_bloque, ruta, timeframe, bloque, *argumentos) for bloque in bloques]
+                parciales = [futuro.result() for futuro in futuros]
+        except (OSError, NotImplementedError) as e:
+            print(f"Pool de procesos no disponible ({e}), barrido en un solo proceso")
+    if parciales is None:
+        parciales = [_evaluar_bloque(ruta, timeframe, bloque, *argumentos) for bloque in bloques]
+
+    return _combinar(parciales, combinaciones, horizontes)
+
+def guardar_ganadora(tabla, config=None):
+    """Escribe la primera combinación de la tabla en config_avanzada.json y devuelve la config."""
+    if config is None:
+        config = analisis.cargar_config_avanzada()
+    # Columna a columna para conservar los enteros; .item() los pasa a tipos de Python para json.dump
+    ganadora = {
+        c: tabla[c].iloc[0].item()
+        for c in tabla.columns if c in PARAMETROS_FILTROS or c in PARAMETROS_PUNTAJE or c.startswith('peso_')
+    }
+    config = aplicar_combinacion(config, ganadora)
+    analisis.guardar_config_avanzada(config)
+    return config
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barrido de parámetros de suelos y puntaje sobre el histórico")
+    parser.add_argument("--timeframe", default="1d")
+    parser.add_argument("--aleatorias", type=int, default=200, help="0 para recorrer la rejilla completa")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--objetivo", default=OBJETIVO)
+    parser.add_argument("--min-senales", type=int, default=MIN_SENALES)
+    parser.add_argument("--almacen", default=almacen_velas.ALMACEN_FILE)
+    parser.add_argument("--guardar", action="store_true", help="escribir la mejor combinación en config_avanzada.json")
+    args = parser.parse_args()
+
+    combinaciones = generar_combinaciones(aleatorias=args.aleatorias or None, semilla=args.semilla)
+    inicio = time.perf_counter()
+    tabla = clasificar(
+        barrer(combinaciones, timeframe=args.timeframe, ruta=args.almacen, procesos=args.procesos),
+        objetivo=args.objetivo, min_senales=args.min_senales
+    )
+    print(tabla.head(20).to_string())
+    print(f"{len(combinaciones)} combinaciones en {time.perf_counter() - inicio:.1f}s")
+    if args.guardar:
+        guardar_ganadora(tabla)
+        print(f"Mejor combinación guardada en {analisis.CONFIG_AVANZADA_FILE}")
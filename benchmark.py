@@ -0,0 +1,305 @@
+# benchmark.py
+# Mediciones reproducibles contra un Poloniex falso en memoria: sin red, sin Telegram y con un
+# almacén de velas temporal. Guarda los tiempos por etapa en JSON y, con --base, falla si alguna
+# etapa es más lenta que la medición de referencia por encima del margen.
+# Con --escalado mide cómo escala el análisis masivo (hilos, procesos y backtest) con el número de núcleos.
+# Uso: python benchmark.py [--simbolos 500] [--latencia 0.05] [--errores 0.01] [--salida bench.json]
+#                          [--base bench_base.json] [--margen 0.25] [--escalado 1,2,4,8]
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+import ccxt
+import ccxt.async_support
+import numpy as np
+import pandas as pd
+import exchange_falso
+
+ETAPAS = [
+    'get_ohlcv_data',
+    'analizar_simbolo',
+    'detectar_doble_triple_suelo_mejorado',
+    'detectar_divergencias',
+    'calcular_puntaje_senal',
+    'analisis_masivo_diario'
+]
+MARGEN_REGRESION = 0.25  # una etapa es regresión si su p50 supera el de la base en más de este porcentaje
+MUESTRA_POR_DEFECTO = 50  # pares con los que se miden las etapas por par
+
+
+# === EXCHANGE FALSO ===
+def instalar_exchange_falso(symbols, latencia=0.0, tasa_errores=0.0, semilla=0, velas=300):
+    """Sustituye ccxt.poloniex (síncrono y asíncrono) por el exchange falso.
+
+    Tiene que llamarse antes de importar nucleo, que crea su exchange al
+    importarse. Las velas terminan en la última vela diaria cerrada para que
+    el almacén haga descargas incrementales como en producción.
+    """
+    fin_ms = (int(time.time() * 1000) // 86400000 - 1) * 86400000
+
+    def fabrica(clase):
+        def crear(config=None):
+            return clase(symbols, latencia=latencia, velas=velas, tasa_errores=tasa_errores, semilla=semilla, fin_ms=fin_ms)
+        return crear
+
+    ccxt.poloniex = fabrica(exchange_falso.ExchangeFalso)
+    ccxt.async_support.poloniex = fabrica(exchange_falso.ExchangeFalsoAsync)
+
+def preparar_nucleo(symbols, ruta_almacen):
+    """Importa nucleo ya con el exchange falso y le quita los efectos externos."""
+    import almacen_velas
+    import nucleo
+
+    nucleo.exchange = ccxt.poloniex()
+    nucleo.limitador = nucleo.crear_limitador()
+    nucleo.almacen = almacen_velas.AlmacenVelas(ruta_almacen)
+    nucleo.symbols = list(symbols)
+    nucleo.enviar_resumen_telegram = lambda *args, **kwargs: None
+    nucleo.resultados_cacheados.limpiar()
+    return nucleo
+
+
+# === MEDICIÓN ===
+def resumir_tiempos(tiempos, fallidas=0):
+    import escaner
+    return {
+        'llamadas': len(tiempos),
+        'fallidas': fallidas,
+        'total_s': float(sum(tiempos)),
+        'media_ms': float(np.mean(tiempos) * 1000) if tiempos else 0.0,
+        'p50_ms': escaner.percentil(tiempos, 50) * 1000,
+        'p95_ms': escaner.percentil(tiempos, 95) * 1000
+    }
+
+def medir(funcion, argumentos):
+    """Llama a `funcion(*args)` para cada tupla de `argumentos`; devuelve (resultados, resumen)."""
+    tiempos = []
+    resultados = []
+    fallidas = 0
+    for args in argumentos:
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        tiempos.append(time.perf_counter() - inicio)
+        resultados.append(resultado)
+        if resultado is None:
+            fallidas += 1
+    return resultados, resumir_tiempos(tiempos, fallidas)
+
+def ejecutar(simbolos=500, latencia=0.0, tasa_errores=0.0, muestra=MUESTRA_POR_DEFECTO, repeticiones=3, semilla=0):
+    """Mide todas las etapas y devuelve el informe listo para guardar en JSON."""
+    symbols = exchange_falso.simbolos_sinteticos(simbolos)
+    instalar_exchange_falso(symbols, latencia=latencia, tasa_errores=tasa_errores, semilla=semilla)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        nucleo = preparar_nucleo(symbols, os.path.join(carpeta, "velas.db"))
+        import analisis
+        config = analisis.cargar_config_avanzada()
+        elegidos = symbols[:muestra]
+        etapas = {}
+
+        # Descarga: la primera vuelta llena el almacén, las siguientes son incrementales
+        dfs = {}
+        tiempos = []
+        fallidas = 0
+        for _ in range(repeticiones):
+            for symbol in elegidos:
+                inicio = time.perf_counter()
+                df = nucleo.get_ohlcv_data(symbol, "1d")
+                tiempos.append(time.perf_counter() - inicio)
+                if df is None:
+                    fallidas += 1
+                else:
+                    dfs[symbol] = df
+        etapas['get_ohlcv_data'] = resumir_tiempos(tiempos, fallidas)
+
+        argumentos = [(s, "1d", {}, dfs[s], config) for s in elegidos if s in dfs]
+        analizados, etapas['analizar_simbolo'] = medir(nucleo.analizar_simbolo, argumentos * repeticiones)
+
+        # Las etapas de analisis se miden sobre los DataFrames ya enriquecidos por analizar_simbolo
+        mejoras = [r['mejoras'] for r in analizados[:len(argumentos)] if r and r.get('mejoras')]
+        _, etapas['detectar_doble_triple_suelo_mejorado'] = medir(
+            analisis.detectar_doble_triple_suelo_mejorado, [(m['df'], config) for m in mejoras] * repeticiones
+        )
+        _, etapas['detectar_divergencias'] = medir(
+            analisis.detectar_divergencias, [(m['df'],) for m in mejoras] * repeticiones
+        )
+        _, etapas['calcular_puntaje_senal'] = medir(
+            analisis.calcular_puntaje_senal,
+            [(m['df'], m['patrones_suelo'], m['patrones_vela'], m['divergencias'], config) for m in mejoras] * repeticiones
+        )
+
+        # Análisis masivo completo sobre todos los pares (descarga asíncrona + panel)
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            nucleo.analisis_masivo_diario()
+            tiempos.append(time.perf_counter() - inicio)
+        etapas['analisis_masivo_diario'] = resumir_tiempos(tiempos)
+
+    return {
+        'fecha': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+        'parametros': {
+            'simbolos': simbolos, 'latencia': latencia, 'tasa_errores': tasa_errores,
+            'muestra': muestra, 'repeticiones': repeticiones, 'semilla': semilla
+        },
+        'entorno': entorno(),
+        'etapas': etapas
+    }
+
+def entorno():
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'ccxt': ccxt.__version__
+    }
+
+
+# === ESCALADO POR NÚCLEOS ===
+def escalado(simbolos=500, procesos=(1, 2, 4), repeticiones=3, semilla=0):
+    """Tiempo del análisis masivo por par con hilos y con procesos, y del backtest, para cada número de núcleos.
+
+    Las velas se descargan una sola vez y solo se mide el análisis. Los hilos
+    tampoco persisten indicadores, para comparar el mismo trabajo. La primera
+    pasada de cada medida no cuenta (arranque del pool de procesos).
+    """
+    symbols = exchange_falso.simbolos_sinteticos(simbolos)
+    instalar_exchange_falso(symbols, semilla=semilla)
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "velas.db")
+        nucleo = preparar_nucleo(symbols, ruta)
+        import analisis
+        import backtest
+        import descarga_async
+        import escaner
+        import escaner_procesos
+        config = analisis.cargar_config_avanzada()
+        datos = descarga_async.descargar_ohlcv_masivo(
+            [(symbol, "1d") for symbol in symbols], almacen=nucleo.almacen, limitador=nucleo.limitador
+        )
+        dataframes = {symbol: datos[(symbol, "1d")] for symbol in symbols}
+
+        def con_hilos(n):
+            # analizar_simbolo añade columnas al DataFrame: cada pasada parte de una copia limpia
+            escaner.escanear_pares(
+                symbols, "1d",
+                lambda symbol, tf, alertas: nucleo.analizar_simbolo(
+                    symbol, tf, alertas, df=dataframes[symbol].copy(), config_avanzada=config, persistir=False
+                ),
+                max_hilos=n
+            )
+
+        modos = {
+            'hilos': con_hilos,
+            'procesos': lambda n: escaner_procesos.escanear_en_procesos(dataframes, "1d", config, n),
+            'backtest': lambda n: backtest.ejecutar_backtest(symbols, "1d", config=config, ruta=ruta, procesos=n)
+        }
+        medidas = []
+        try:
+            for modo, funcion in modos.items():
+                for n in procesos:
+                    tiempos = []
+                    for _ in range(repeticiones + 1):
+                        inicio = time.perf_counter()
+                        funcion(n)
+                        tiempos.append(time.perf_counter() - inicio)
+                    medidas.append({'modo': modo, 'procesos': n, 'p50_s': escaner.percentil(tiempos[1:], 50)})
+        finally:
+            escaner_procesos.cerrar_pool()
+
+    for medida in medidas:
+        referencia = next(m['p50_s'] for m in medidas if m['modo'] == medida['modo'])
+        medida['aceleracion'] = referencia / medida['p50_s'] if medida['p50_s'] else 0.0
+        medida['eficiencia'] = medida['aceleracion'] * procesos[0] / medida['procesos']
+    return {
+        'fecha': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+        'parametros': {'simbolos': simbolos, 'procesos': list(procesos), 'repeticiones': repeticiones, 'semilla': semilla},
+        'entorno': entorno(),
+        'escalado': medidas
+    }
+
+def formatear_escalado(informe):
+    return "\n".join(
+        f"{m['modo']:<10} {m['procesos']:>3} núcleos | p50 {m['p50_s']:>8.2f} s | "
+        f"aceleración {m['aceleracion']:>5.2f}x | eficiencia {m['eficiencia']:>4.0%}"
+        for m in informe['escalado']
+    )
+
+
+# === REGRESIONES ===
+def comparar(actual, base, margen=MARGEN_REGRESION):
+    """Etapas cuyo p50 empeora más de `margen` respecto a la base: [(etapa, p50 base, p50 actual)]."""
+    if actual.get('parametros') != base.get('parametros'):
+        print("Aviso: la base se midió con otros parámetros, la comparación puede no ser justa")
+    regresiones = []
+    for etapa, medida in actual['etapas'].items():
+        referencia = base.get('etapas', {}).get(etapa)
+        if not referencia or not referencia.get('p50_ms'):
+            continue
+        if medida['p50_ms'] > referencia['p50_ms'] * (1 + margen):
+            regresiones.append((etapa, referencia['p50_ms'], medida['p50_ms']))
+    return regresiones
+
+def formatear_informe(informe):
+    lineas = []
+    for etapa in ETAPAS:
+        medida = informe['etapas'].get(etapa)
+        if medida:
+            lineas.append(
+                f"{etapa:<38} {medida['llamadas']:>6} llamadas | p50 {medida['p50_ms']:>9.2f} ms | "
+                f"p95 {medida['p95_ms']:>9.2f} ms | fallidas {medida['fallidas']}"
+            )
+    return "\n".join(lineas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del bot contra un Poloniex falso")
+    parser.add_argument("--simbolos", type=int, default=500, help="pares sintéticos (10 a 5000)")
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por petición al exchange")
+    parser.add_argument("--errores", type=float, default=0.0, help="fracción de peticiones que fallan con NetworkError")
+    parser.add_argument("--muestra", type=int, default=MUESTRA_POR_DEFECTO)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--salida", default="bench.json")
+    parser.add_argument("--base", default=None, help="JSON de una medición anterior con el que comparar")
+    parser.add_argument("--margen", type=float, default=MARGEN_REGRESION)
+    parser.add_argument("--escalado", default=None, help="núcleos a comparar, p. ej. 1,2,4,8")
+    args = parser.parse_args()
+
+    if args.escalado:
+        informe = escalado(
+            simbolos=max(10, min(5000, args.simbolos)), procesos=[int(n) for n in args.escalado.split(",")],
+            repeticiones=args.repeticiones, semilla=args.semilla
+        )
+        print(formatear_escalado(informe))
+        with open(args.salida, "w") as f:
+            json.dump(informe, f, indent=2)
+        print(f"Resultados guardados en {args.salida}")
+        sys.exit(0)
+
+    informe = ejecutar(
+        simbolos=max(10, min(5000, args.simbolos)), latencia=args.latencia, tasa_errores=args.errores,
+        muestra=args.muestra, repeticiones=args.repeticiones, semilla=args.semilla
+    )
+    print(formatear_informe(informe))
+    with open(args.salida, "w") as f:
+        json.dump(informe, f, indent=2)
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.base:
+        with open(args.base, "r") as f:
+            base = json.load(f)
+        regresiones = comparar(informe, base, args.margen)
+        for etapa, antes, ahora in regresiones:
+            print(f"❌ Regresión en {etapa}: p50 {antes:.2f} ms -> {ahora:.2f} ms (margen {args.margen:.0%})")
+        if regresiones:
+            sys.exit(1)
+        print(f"✅ Sin regresiones respecto a {args.base}")
@@ -0,0 +1,59 @@
+# cache_analisis.py
+# Memoización de resultados de análisis: si la última vela cerrada, el número de velas y la
+# configuración no han cambiado, el resultado es el mismo y no hace falta recalcularlo.
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+
+def huella_config(*configs):
+    """Hash estable de una o varias configuraciones (dicts serializables a JSON)."""
+    texto = json.dumps(configs, sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+def huella_velas(df):
+    """(timestamp de la última vela cerrada, número de velas); la última fila es la vela abierta."""
+    if df is None or len(df) < 2:
+        return None
+    return df['timestamp'].iloc[-2], len(df)
+
+
+class CacheResultados:
+    """Caché LRU con contadores de aciertos, fallos y expulsiones, segura entre hilos."""
+
+    def __init__(self, capacidad=256):
+        self.capacidad = capacidad
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.metricas = {'aciertos': 0, 'fallos': 0, 'expulsiones': 0}
+
+    def obtener(self, clave):
+        """Valor guardado para `clave` o None; cuenta el acierto o el fallo."""
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.metricas['aciertos'] += 1
+                return self._datos[clave]
+            self.metricas['fallos'] += 1
+            return None
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+                self.metricas['expulsiones'] += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def tasa_aciertos(self):
+        total = self.metricas['aciertos'] + self.metricas['fallos']
+        return self.metricas['aciertos'] / total if total else 0.0
@@ -0,0 +1,56 @@
+# cierres_vela.py
+# Fronteras de vela en UTC y un trigger de APScheduler que dispara poco después de cada cierre,
+# para analizar la vela en cuanto es definitiva en lugar de a intervalos fijos desde el arranque.
+
+from datetime import datetime, timedelta, timezone
+from apscheduler.triggers.base import BaseTrigger
+
+TIMEFRAMES_ALINEADOS = ('12h', '1d', '3d', '1w', '1M')
+RETRASO_POR_DEFECTO = 60  # segundos tras el cierre, para que el exchange haya consolidado la vela
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_PRIMER_LUNES = datetime(1970, 1, 5, tzinfo=timezone.utc)  # las velas semanales abren el lunes
+_DURACIONES = {
+    '12h': timedelta(hours=12),
+    '1d': timedelta(days=1),
+    '3d': timedelta(days=3),
+    '1w': timedelta(weeks=1)
+}
+
+
+def inicio_vela(timeframe, momento):
+    """Apertura (UTC) de la vela de `timeframe` que contiene `momento`."""
+    momento = momento.astimezone(timezone.utc)
+    if timeframe == '1M':
+        return momento.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    origen = _PRIMER_LUNES if timeframe == '1w' else _EPOCA
+    duracion = _DURACIONES[timeframe]
+    return origen + ((momento - origen) // duracion) * duracion
+
+def proximo_cierre(timeframe, momento):
+    """Primer cierre de vela estrictamente posterior a `momento`."""
+    inicio = inicio_vela(timeframe, momento)
+    if timeframe == '1M':
+        return (inicio + timedelta(days=32)).replace(day=1)
+    return inicio + _DURACIONES[timeframe]
+
+
+class DisparadorCierreVela(BaseTrigger):
+    """Dispara `retraso` segundos después de cada cierre de vela de `timeframe`."""
+
+    def __init__(self, timeframe, retraso=RETRASO_POR_DEFECTO):
+        if timeframe not in TIMEFRAMES_ALINEADOS:
+            raise ValueError(f"Timeframe sin fronteras conocidas: {timeframe}")
+        self.timeframe = timeframe
+        self.retraso = timedelta(seconds=retraso)
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        # Tras un disparo, el siguiente cierre; al arrancar, el primero que aún no ha pasado
+        referencia = previous_fire_time if previous_fire_time is not None else now - timedelta(microseconds=1)
+        return proximo_cierre(self.timeframe, referencia - self.retraso) + self.retraso
+
+    def __str__(self):
+        return f"cierre de vela {self.timeframe} +{int(self.retraso.total_seconds())}s"
+
+    def __repr__(self):
+        return f"<DisparadorCierreVela (timeframe='{self.timeframe}', retraso={int(self.retraso.total_seconds())})>"
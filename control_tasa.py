@@ -0,0 +1,198 @@
+# control_tasa.py
+# Limitador global y adaptativo para todas las llamadas al exchange: cubo de fichas compartido por
+# hilos y corrutinas, cola por prioridad (el dashboard antes que los escaneos de fondo) y ajuste
+# AIMD de la tasa y de la concurrencia según la latencia observada y los 429/DDoSProtection.
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+import ccxt
+
+INTERACTIVA = 0  # el usuario espera en el dashboard
+PROGRAMADA = 1   # tareas del scheduler por par
+FONDO = 2        # escaneos masivos
+NOMBRES_PRIORIDAD = {INTERACTIVA: 'interactiva', PROGRAMADA: 'programada', FONDO: 'fondo'}
+
+TASA_SIN_LIMITE = 1e6  # para exchanges sin rateLimit (el falso de las pruebas)
+SONDEO_ASYNC = 0.01    # segundos entre comprobaciones de una corrutina que espera turno
+ENFRIAMIENTO_RECORTE = 1.0  # los 429 de peticiones que ya estaban en vuelo no vuelven a recortar
+
+
+def es_limitacion(error):
+    """El exchange pide que bajemos el ritmo (429, DDoSProtection)."""
+    return isinstance(error, (ccxt.DDoSProtection, ccxt.RateLimitExceeded))
+
+
+class LimitadorAdaptativo:
+    """Reparte turnos entre todas las llamadas al exchange del proceso.
+
+    Cada turno consume una ficha (se recargan a `tasa` por segundo, hasta
+    `rafaga`) y ocupa una plaza de concurrencia hasta que la llamada termina.
+    Cada `aumentar_cada` respuestas correctas la tasa sube un 1 % de la
+    máxima y la concurrencia sube o baja en uno según la latencia media
+    comparada con `latencia_objetivo`. Un 429 o DDoSProtection parte tasa y
+    concurrencia por la mitad y vacía el cubo, como mucho una vez por
+    ENFRIAMIENTO_RECORTE segundos. Entre los que esperan pasa
+    primero la prioridad más baja (INTERACTIVA) y, a igual prioridad, el más antiguo.
+    """
+
+    def __init__(self, tasa_maxima, tasa_inicial=None, tasa_minima=0.5, concurrencia_maxima=20,
+                 concurrencia_inicial=None, latencia_objetivo=1.0, aumentar_cada=20, rafaga=5):
+        self.tasa_maxima = tasa_maxima
+        self.tasa_minima = min(tasa_minima, tasa_maxima)
+        self.tasa = tasa_inicial or tasa_maxima / 2
+        self.concurrencia_maxima = max(1, int(concurrencia_maxima))
+        self.concurrencia = concurrencia_inicial or max(1, self.concurrencia_maxima // 2)
+        self.latencia_objetivo = latencia_objetivo
+        self.aumentar_cada = aumentar_cada
+        self.rafaga = rafaga
+
+        self._cond = threading.Condition()
+        self._cola = []  # heap de [prioridad, orden]
+        self._orden = itertools.count()
+        self._fichas = float(rafaga)
+        self._ultima_recarga = time.monotonic()
+        self._en_vuelo = 0
+        self._correctas = 0
+        self._latencia_media = None
+        self._ultimo_recorte = 0.0
+        self.metricas = {'concedidos': 0, 'limitados_429': 0, 'errores': 0, 'segundos_esperando': 0.0}
+
+    # === COLA Y FICHAS (siempre con self._cond tomado) ===
+    def _recargar(self, ahora):
+        self._fichas = min(self.rafaga, self._fichas + (ahora - self._ultima_recarga) * self.tasa)
+        self._ultima_recarga = ahora
+
+    def _intentar(self, entrada):
+        """True si `entrada` obtiene su turno; si no, segundos a esperar (None: hasta el próximo aviso)."""
+        self._recargar(time.monotonic())
+        if self._cola[0] is not entrada or self._en_vuelo >= self.concurrencia:
+            return None
+        if self._fichas < 1:
+            return (1 - self._fichas) / self.tasa
+        heapq.heappop(self._cola)
+        self._fichas -= 1
+        self._en_vuelo += 1
+        self.metricas['concedidos'] += 1
+        return True
+
+    def _abandonar(self, entrada):
+        self._cola.remove(entrada)
+        heapq.heapify(self._cola)
+        self._cond.notify_all()
+
+    def _liberar(self, latencia, error):
+        with self._cond:
+            self._en_vuelo -= 1
+            if error is not None and es_limitacion(error):
+                self.metricas['limitados_429'] += 1
+                ahora = time.monotonic()
+                if ahora - self._ultimo_recorte >= ENFRIAMIENTO_RECORTE:
+                    self._ultimo_recorte = ahora
+                    self.tasa = max(self.tasa_minima, self.tasa / 2)
+                    self.concurrencia = max(1, self.concurrencia // 2)
+                    self._fichas = min(self._fichas, 0.0)
+                self._correctas = 0
+            elif error is not None:
+                self.metricas['errores'] += 1
+                if isinstance(error, ccxt.RequestTimeout):
+                    self.concurrencia = max(1, self.concurrencia - 1)
+            else:
+                self._latencia_media = latencia if self._latencia_media is None else (
+                    0.8 * self._latencia_media + 0.2 * latencia
+                )
+                self._correctas += 1
+                if self._correctas >= self.aumentar_cada:
+                    self._correctas = 0
+                    self.tasa = min(self.tasa_maxima, self.tasa + self.tasa_maxima * 0.01)
+                    if self._latencia_media > self.latencia_objetivo:
+                        self.concurrencia = max(1, self.concurrencia - 1)
+                    else:
+                        self.concurrencia = min(self.concurrencia_maxima, self.concurrencia + 1)
+            self._cond.notify_all()
+
+    # === ESPERA ===
+    def _esperar(self, prioridad):
+        entrada = [prioridad, next(self._orden)]
+        inicio = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._cola, entrada)
+            try:
+                while True:
+                    espera = self._intentar(entrada)
+                    if espera is True:
+                        break
+                    self._cond.wait(espera)
+            except BaseException:
+                self._abandonar(entrada)
+                raise
+            # El siguiente de la cola puede tener ya su turno
+            self._cond.notify_all()
+            self.metricas['segundos_esperando'] += time.monotonic() - inicio
+
+    async def _esperar_async(self, prioridad):
+        entrada = [prioridad, next(self._orden)]
+        inicio = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._cola, entrada)
+        concedido = False
+        try:
+            while True:
+                with self._cond:
+                    espera = self._intentar(entrada)
+                    if espera is True:
+                        concedido = True
+                        self._cond.notify_all()
+                        self.metricas['segundos_esperando'] += time.monotonic() - inicio
+                        return
+                # Sin bloquear el bucle: se vuelve a comprobar en un rato
+                await asyncio.sleep(min(espera, SONDEO_ASYNC) if espera is not None else SONDEO_ASYNC)
+        finally:
+            if not concedido:
+                with self._cond:
+                    self._abandonar(entrada)
+
+    @contextmanager
+    def turno(self, prioridad=PROGRAMADA):
+        """`with limitador.turno(prioridad): exchange.fetch_...()` desde cualquier hilo."""
+        self._esperar(prioridad)
+        inicio = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self._liberar(time.perf_counter() - inicio, e)
+            raise
+        self._liberar(time.perf_counter() - inicio, None)
+
+    @asynccontextmanager
+    async def turno_async(self, prioridad=FONDO):
+        """Igual que turno() pero para corrutinas; nunca bloquea el bucle de eventos."""
+        await self._esperar_async(prioridad)
+        inicio = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self._liberar(time.perf_counter() - inicio, e)
+            raise
+        self._liberar(time.perf_counter() - inicio, None)
+
+    # === ESTADO ===
+    def estado(self):
+        with self._cond:
+            en_cola = {nombre: 0 for nombre in NOMBRES_PRIORIDAD.values()}
+            for prioridad, _ in self._cola:
+                en_cola[NOMBRES_PRIORIDAD.get(prioridad, str(prioridad))] += 1
+            return dict(
+                self.metricas,
+                tasa=round(self.tasa, 2),
+                tasa_maxima=self.tasa_maxima,
+                concurrencia=self.concurrencia,
+                concurrencia_maxima=self.concurrencia_maxima,
+                en_vuelo=self._en_vuelo,
+                en_cola=len(self._cola),
+                **{f'en_cola_{nombre}': cantidad for nombre, cantidad in en_cola.items()},
+                latencia_media_ms=round((self._latencia_media or 0.0) * 1000, 1)
+            )
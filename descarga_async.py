@@ -0,0 +1,156 @@
+# descarga_async.py
+# Descarga concurrente de velas OHLCV con el cliente asíncrono de ccxt
+
+import asyncio
+import contextlib
+import random
+import ccxt
+import pandas as pd
+import vuelo_unico
+import control_tasa
+import remuestreo
+
+COLUMNAS_OHLCV = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def ohlcv_a_dataframe(ohlcv):
+    """Convierte la respuesta de fetch_ohlcv al DataFrame que usa analizar_simbolo."""
+    if not ohlcv or len(ohlcv) < 2:
+        return None
+    df = pd.DataFrame(ohlcv, columns=COLUMNAS_OHLCV)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df
+
+def crear_exchange_async(limitar=True):
+    """Cliente asíncrono de Poloniex; con limitar=False el ritmo lo marca un LimitadorAdaptativo externo."""
+    import ccxt.async_support as ccxt_async
+    return ccxt_async.poloniex({'enableRateLimit': limitar})
+
+def es_reintentable(error):
+    # Timeouts, DDoSProtection, 429 y caídas del exchange; BadSymbol y similares no
+    return isinstance(error, ccxt.NetworkError)
+
+
+async def pedir_ohlcv(exchange, semaforo, symbol, timeframe, since=None, limit=250, reintentos=3, espera_base=0.5,
+                     limitador=None, prioridad=control_tasa.FONDO):
+    """Una llamada a fetch_ohlcv con su turno y reintentos; tras el último intento fallido relanza el error."""
+    for intento in range(reintentos + 1):
+        async with semaforo:
+            try:
+                turno = limitador.turno_async(prioridad) if limitador is not None else contextlib.nullcontext()
+                async with turno:
+                    if since is None:
+                        return await exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+                    return await exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+            except Exception as e:
+                if not es_reintentable(e) or intento == reintentos:
+                    raise
+        # Backoff exponencial con algo de jitter, fuera del semáforo para no bloquear a otros
+        await asyncio.sleep(espera_base * (2 ** intento) * (1 + random.random() / 4))
+
+async def _actualizar_almacen(exchange, semaforo, almacen, symbol, timeframe, limit, reintentos, espera_base,
+                             limitador=None, prioridad=control_tasa.FONDO):
+    """Pide solo las velas posteriores a la última guardada y las fusiona en el almacén."""
+    since = almacen.calcular_since(symbol, timeframe, limit)
+    ohlcv = await pedir_ohlcv(exchange, semaforo, symbol, timeframe, since, limit, reintentos, espera_base,
+                              limitador, prioridad)
+    almacen.guardar(symbol, timeframe, ohlcv)
+
+async def descargar_ohlcv(pares, exchange=None, max_en_vuelo=20, limit=250, reintentos=3, espera_base=0.5, almacen=None,
+                          limitador=None, prioridad=control_tasa.FONDO, config_remuestreo=None, lectura=None):
+    """Descarga todos los pares (symbol, timeframe) con como mucho `max_en_vuelo` peticiones a la vez.
+
+    Todas las peticiones comparten la misma instancia del exchange y por tanto
+    la misma sesión HTTP. Si no se pasa `exchange` se crea un cliente de
+    Poloniex y se cierra al terminar. Con `almacen` solo se piden las velas
+    nuevas y el DataFrame se lee del almacén. Con `limitador` cada petición
+    espera su turno en el limitador global con la `prioridad` dada, en vez
+    del límite propio de ccxt. Con `almacen` y `config_remuestreo` los
+    timeframes que tienen serie base se construyen en local a partir de ella.
+    Con `almacen` se devuelven las últimas `lectura` velas guardadas (por
+    defecto `limit`), aunque solo se descarguen `limit`.
+    Devuelve {(symbol, timeframe): df o None}.
+    """
+    propio = exchange is None
+    if propio:
+        exchange = crear_exchange_async(limitar=limitador is None)
+    semaforo = asyncio.Semaphore(max(1, int(max_en_vuelo)))
+
+    async def descargar(symbol, timeframe, limite):
+        # Cada petición pasa por el vuelo único del proceso con la clave de lo que se descarga, la misma
+        # que en almacen_velas.actualizar_velas: si el dashboard o el scheduler ya la están
+        # descargando, se espera a esa. Sin almacén la respuesta es el propio resultado y va aparte.
+        try:
+            if almacen is None:
+                ohlcv = await vuelo_unico.descargas.ejecutar_async(
+                    ('sin_almacen', symbol, timeframe, limite),
+                    lambda: pedir_ohlcv(exchange, semaforo, symbol, timeframe, None, limite, reintentos, espera_base,
+                                        limitador, prioridad)
+                )
+                return ohlcv_a_dataframe(ohlcv)
+            await vuelo_unico.descargas.ejecutar_async(
+                (symbol, timeframe, limite),
+                lambda: _actualizar_almacen(exchange, semaforo, almacen, symbol, timeframe, limite, reintentos,
+                                            espera_base, limitador, prioridad)
+            )
+            return True
+        except Exception as e:
+            print(f"Error obteniendo datos para {symbol} {timeframe}: {e}")
+            return None
+
+    async def descargar_todas(peticiones):
+        resultados = await asyncio.gather(*[descargar(*peticion) for peticion in peticiones])
+        return dict(zip(peticiones, resultados))
+
+    def nativo(symbol, timeframe, descargado):
+        if almacen is None or descargado is None:
+            return descargado
+        return almacen.leer(symbol, timeframe, lectura)
+
+    lectura = lectura or limit
+    bases = {
+        par: remuestreo.base_de(par[1], config_remuestreo) if almacen is not None else None
+        for par in pares
+    }
+    try:
+        # Los timeframes remuestreados solo piden su serie base, una vez por par aunque se pidan varios
+        peticiones = list(dict.fromkeys(
+            (symbol, bases[(symbol, timeframe)], remuestreo.LIMITE_BASE) if bases[(symbol, timeframe)] else (symbol, timeframe, limit)
+            for symbol, timeframe in pares
+        ))
+        descargados = await descargar_todas(peticiones)
+
+        resultados = {}
+        nativos = []
+        for symbol, timeframe in pares:
+            base = bases[(symbol, timeframe)]
+            if base is None:
+                resultados[(symbol, timeframe)] = nativo(symbol, timeframe, descargados[(symbol, timeframe, limit)])
+            elif descargados[(symbol, base, remuestreo.LIMITE_BASE)] is None:
+                resultados[(symbol, timeframe)] = None
+            else:
+                ohlcv = almacen.leer_remuestreado(symbol, timeframe, base, lectura)
+                if remuestreo.suficientes(len(ohlcv), limit, config_remuestreo) or not remuestreo.admite_nativo(exchange, timeframe):
+                    resultados[(symbol, timeframe)] = ohlcv_a_dataframe(ohlcv)
+                else:
+                    nativos.append((symbol, timeframe))
+
+        # Pares sin historia base suficiente todavía: se piden en su timeframe nativo
+        if nativos:
+            descargados = await descargar_todas([(symbol, timeframe, limit) for symbol, timeframe in nativos])
+            for symbol, timeframe in nativos:
+                resultados[(symbol, timeframe)] = nativo(symbol, timeframe, descargados[(symbol, timeframe, limit)])
+    finally:
+        if propio:
+            await exchange.close()
+    return {par: resultados[par] for par in pares}
+
+def descargar_ohlcv_masivo(pares, exchange=None, max_en_vuelo=20, limit=250, reintentos=3, espera_base=0.5, almacen=None,
+                           limitador=None, prioridad=control_tasa.FONDO, config_remuestreo=None, lectura=None):
+    """Versión síncrona de descargar_ohlcv para el scheduler y el dashboard."""
+    return asyncio.run(descargar_ohlcv(
+        list(pares), exchange=exchange, max_en_vuelo=max_en_vuelo,
+        limit=limit, reintentos=reintentos, espera_base=espera_base, almacen=almacen,
+        limitador=limitador, prioridad=prioridad, config_remuestreo=config_remuestreo,
+        lectura=lectura
+    ))
@@ -0,0 +1,139 @@
+# envio_telegram.py
+# Cola de envío a Telegram en segundo plano: sesión HTTP persistente, mensajes troceados
+# al límite de 4096 caracteres, reintentos con backoff respetando retry_after y métricas.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import requests
+import metricas
+
+LIMITE_MENSAJE = 4096
+URL_API = "https://api.telegram.org"
+
+
+def dividir_mensaje(texto, limite=LIMITE_MENSAJE):
+    """Parte el texto en trozos de como mucho `limite` caracteres, cortando por líneas cuando se puede."""
+    partes = []
+    actual = ""
+    for linea in texto.splitlines(keepends=True):
+        while len(linea) > limite:
+            if actual:
+                partes.append(actual)
+                actual = ""
+            partes.append(linea[:limite])
+            linea = linea[limite:]
+        if len(actual) + len(linea) > limite:
+            partes.append(actual)
+            actual = ""
+        actual += linea
+    if actual or not partes:
+        partes.append(actual)
+    return partes
+
+
+class ColaTelegram:
+    """Envía mensajes desde un hilo propio para no bloquear nunca el análisis."""
+
+    def __init__(self, token, chat_id, url_base=URL_API, max_reintentos=5, espera_base=1.0, intervalo=1.0, timeout=10):
+        self.url = f"{url_base}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.max_reintentos = max_reintentos
+        self.espera_base = espera_base
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self.sesion = requests.Session()
+        self.cola = queue.Queue()
+        self.metricas = {
+            'encolados': 0,
+            'enviados': 0,
+            'fallidos': 0,
+            'partes': 0,
+            'reintentos': 0,
+            'limitados_429': 0,
+            'segundos_enviando': 0.0
+        }
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._ultimo_envio = 0.0
+
+    def encolar(self, mensaje, al_entregar=None):
+        """Añade un mensaje a la cola. Devuelve un Future que se resuelve a True/False al terminar.
+
+        Un mensaje troceado que falla a medias no se retoma: si se vuelve a
+        encolar, se envía entero. Los resúmenes llevan la hora y precios al día,
+        así que el nuevo texto no coincide parte a parte con el que falló.
+        """
+        futuro = Future()
+        with self._lock:
+            self.metricas['encolados'] += 1
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._trabajar, daemon=True)
+                self._hilo.start()
+        self.cola.put((mensaje, al_entregar, futuro))
+        return futuro
+
+    def pendientes(self):
+        return self.cola.qsize()
+
+    def _trabajar(self):
+        while True:
+            mensaje, al_entregar, futuro = self.cola.get()
+            inicio = time.perf_counter()
+            try:
+                ok = all(self._enviar_parte(parte) for parte in dividir_mensaje(mensaje))
+                if ok and al_entregar:
+                    al_entregar()
+            except Exception as e:
+                print(f"Error al enviar alerta: {e}")
+                ok = False
+            segundos = time.perf_counter() - inicio
+            with self._lock:
+                self.metricas['enviados' if ok else 'fallidos'] += 1
+                self.metricas['segundos_enviando'] += segundos
+            metricas.observar('etapa_segundos', segundos, etapa='telegram_envio')
+            futuro.set_result(ok)
+            self.cola.task_done()
+
+    def _enviar_parte(self, texto):
+        for intento in range(self.max_reintentos + 1):
+            # Telegram admite ~1 mensaje por segundo por chat
+            espera = self._ultimo_envio + self.intervalo - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            self._ultimo_envio = time.monotonic()
+
+            try:
+                response = self.sesion.post(self.url, data={"chat_id": self.chat_id, "text": texto}, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"Error al enviar alerta: {e}")
+                response = None
+
+            if response is not None and response.status_code == 200:
+                with self._lock:
+                    self.metricas['partes'] += 1
+                return True
+
+            if response is not None and response.status_code == 429:
+                with self._lock:
+                    self.metricas['limitados_429'] += 1
+                try:
+                    espera = float(response.json().get("parameters", {}).get("retry_after", 0))
+                except ValueError:
+                    espera = 0
+                espera = max(espera, self.espera_base * (2 ** intento))
+            elif response is None or response.status_code >= 500:
+                espera = self.espera_base * (2 ** intento)
+            else:
+                # 400/401/403: reintentar no arregla nada
+                print(f"Error en Telegram: {response.status_code}")
+                return False
+
+            if intento < self.max_reintentos:
+                with self._lock:
+                    self.metricas['reintentos'] += 1
+                time.sleep(espera)
+
+        print("Error en Telegram: reintentos agotados")
+        return False
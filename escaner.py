@@ -0,0 +1,93 @@
+# escaner.py
+# Motor de escaneo masivo: analiza muchos pares a la vez con un pool de hilos acotado
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+# === CONFIGURACIÓN ===
+def hilos_configurados(config_avanzada):
+    """Número de pares simultáneos según la sección `rendimiento` de la configuración."""
+    rendimiento = config_avanzada.get("rendimiento", {})
+    if not rendimiento.get("analisis_paralelo", False):
+        return 1
+    return max(1, int(rendimiento.get("max_pares_simultaneos", 10)))
+
+def procesos_configurados(config_avanzada):
+    """Procesos del modo por procesos (0 = todos los núcleos), o 0 si el análisis va con hilos."""
+    rendimiento = config_avanzada.get("rendimiento", {})
+    if rendimiento.get("modo_analisis", "hilos") != "procesos":
+        return 0
+    return max(1, int(rendimiento.get("procesos", 0)) or os.cpu_count() or 1)
+
+
+# === ESTADÍSTICAS DE TIEMPO ===
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    inferior = int(k)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (k - inferior)
+
+def formatear_reporte(reporte):
+    paralelismo = f"{reporte['procesos']} procesos" if 'procesos' in reporte else f"{reporte['hilos']} hilos"
+    texto = (
+        f"⏱️ {reporte['pares']} pares en {reporte['duracion']:.1f}s "
+        f"({reporte['pares_por_segundo']:.2f} pares/s, {paralelismo})"
+    )
+    if 'p50' in reporte:
+        texto += f" | p50 {reporte['p50'] * 1000:.0f} ms | p95 {reporte['p95'] * 1000:.0f} ms"
+    if 'calculo' in reporte:
+        # Escaneo por panel: no hay latencia por par, solo descarga y cálculo conjunto
+        texto += f" | descarga {reporte['descarga']:.1f}s | cálculo {reporte['calculo'] * 1000:.0f} ms"
+    return texto
+
+
+# === ESCANEO ===
+def escanear_pares(symbols, timeframe, analizar, max_hilos=1, progreso=None):
+    """Ejecuta `analizar(symbol, timeframe, alertas_resumen)` para cada par.
+
+    Cada tarea escribe en su propio diccionario de alertas y el hilo que llama
+    los fusiona a medida que terminan, así `alertas_resumen` nunca se comparte
+    entre hilos. Devuelve (alertas_resumen, total_analizados, reporte).
+    """
+    alertas_resumen = {}
+    latencias = []
+    total_analizados = 0
+
+    def tarea(symbol):
+        alertas_locales = {}
+        inicio_par = time.perf_counter()
+        try:
+            resultado = analizar(symbol, timeframe, alertas_locales)
+        except Exception as e:
+            print(f"Error analizando {symbol}: {e}")
+            resultado = None
+        return resultado, alertas_locales, time.perf_counter() - inicio_par
+
+    hilos = max(1, int(max_hilos))
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        futuros = [pool.submit(tarea, symbol) for symbol in symbols]
+        for n, futuro in enumerate(as_completed(futuros), 1):
+            resultado, alertas_locales, latencia = futuro.result()
+            latencias.append(latencia)
+            if resultado:
+                total_analizados += 1
+            alertas_resumen.update(alertas_locales)
+            if progreso:
+                progreso(n, len(futuros))
+    duracion = time.perf_counter() - inicio
+
+    reporte = {
+        'pares': len(latencias),
+        'hilos': hilos,
+        'duracion': duracion,
+        'pares_por_segundo': len(latencias) / duracion if duracion > 0 else 0.0,
+        'p50': percentil(latencias, 50),
+        'p95': percentil(latencias, 95)
+    }
+    return alertas_resumen, total_analizados, reporte
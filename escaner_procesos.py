@@ -0,0 +1,135 @@
+# escaner_procesos.py
+# Modo por procesos del escaneo masivo: analizar_simbolo es pandas/Python puro y con hilos choca con
+# el GIL en cuanto la descarga deja de ser el cuello de botella. Las velas viajan en un bloque de
+# memoria compartida (velas_compartidas) y cada proceso devuelve solo un registro compacto por par.
+
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import escaner
+import metricas
+import velas_compartidas
+
+BLOQUES_POR_PROCESO = 4  # bloques pequeños para repartir bien pares con más o menos velas
+
+_pool = None
+_procesos_pool = 0
+_lock_pool = threading.Lock()
+
+
+# === POOL ===
+def _iniciar_proceso():
+    # Cada proceso importa nucleo una sola vez, al arrancar, y no en cada bloque
+    import nucleo  # noqa: F401
+
+def obtener_pool(procesos):
+    """Pool reutilizado entre escaneos: arrancar procesos e importar nucleo en ellos cuesta segundos.
+
+    Con spawn y no fork: nucleo tiene hilos (scheduler, cola de Telegram,
+    servidor de métricas) y un fork podría copiar alguno de sus locks tomado.
+    """
+    global _pool, _procesos_pool
+    with _lock_pool:
+        if _pool is None or _procesos_pool != procesos:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=procesos,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_iniciar_proceso
+            )
+            _procesos_pool = procesos
+        return _pool
+
+def cerrar_pool():
+    global _pool, _procesos_pool
+    with _lock_pool:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _procesos_pool = 0
+
+
+# === TAREA DE CADA PROCESO ===
+def _analizar_bloque(descriptor, timeframe, config_avanzada, medir=False):
+    """Analiza los pares del descriptor leyendo sus velas de la memoria compartida.
+
+    Devuelve (registros, métricas del bloque): con `medir` el proceso cronometra
+    y cuenta igual que el principal y le devuelve lo medido para que lo sume.
+    """
+    import nucleo
+
+    metricas.activar(medir)
+    metricas.limpiar()
+    memoria, matriz = velas_compartidas.abrir(descriptor)
+    registros = []
+    try:
+        for symbol, (inicio, fin) in descriptor[2].items():
+            alertas = {}
+            inicio_par = time.perf_counter()
+            # Sin persistir indicadores: el almacén SQLite es del proceso principal
+            resultado = nucleo.analizar_simbolo(
+                symbol, timeframe, alertas, df=velas_compartidas.dataframe(matriz, inicio, fin),
+                config_avanzada=config_avanzada, persistir=False
+            )
+            registros.append({
+                'symbol': symbol,
+                'analizado': resultado is not None,
+                'alertas': alertas.get(symbol),
+                'puntaje_total': resultado['puntaje_total'] if resultado else None,
+                'segundos': time.perf_counter() - inicio_par
+            })
+    finally:
+        del matriz
+        memoria.close()
+    return registros, metricas.extraer()
+
+
+# === ESCANEO ===
+def escanear_en_procesos(dataframes, timeframe, config_avanzada, procesos, progreso=None):
+    """Analiza {symbol: DataFrame o None} repartido entre `procesos` procesos.
+
+    Devuelve lo mismo que escaner.escanear_pares: (alertas_resumen,
+    total_analizados, reporte), con 'procesos' en el reporte.
+    """
+    alertas_resumen = {}
+    latencias = []
+    total_analizados = 0
+    inicio = time.perf_counter()
+    with velas_compartidas.VelasCompartidas(dataframes) as velas:
+        symbols = list(velas.indice)
+        tamano = max(1, -(-len(symbols) // (procesos * BLOQUES_POR_PROCESO)))
+        bloques = [symbols[i:i + tamano] for i in range(0, len(symbols), tamano)]
+        pool = obtener_pool(procesos)
+        futuros = [
+            pool.submit(_analizar_bloque, velas.descriptor(bloque), timeframe, config_avanzada, metricas.activas())
+            for bloque in bloques
+        ]
+
+        # Los pares sin velas no llegan a los procesos y cuentan como ya hechos
+        hechos = len(dataframes) - len(symbols)
+        for futuro in as_completed(futuros):
+            registros, medidas = futuro.result()
+            metricas.fusionar(medidas)
+            for registro in registros:
+                latencias.append(registro['segundos'])
+                if registro['analizado']:
+                    total_analizados += 1
+                if registro['alertas']:
+                    alertas_resumen[registro['symbol']] = registro['alertas']
+            hechos += len(registros)
+            if progreso:
+                progreso(hechos, len(dataframes))
+    duracion = time.perf_counter() - inicio
+
+    reporte = {
+        'pares': len(dataframes),
+        'hilos': 1,
+        'procesos': procesos,
+        'duracion': duracion,
+        'pares_por_segundo': len(dataframes) / duracion if duracion > 0 else 0.0,
+        'p50': escaner.percentil(latencias, 50),
+        'p95': escaner.percentil(latencias, 95)
+    }
+    return alertas_resumen, total_analizados, reporte
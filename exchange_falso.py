@@ -0,0 +1,140 @@
+# exchange_falso.py
+# Exchange en memoria con la interfaz mínima de ccxt, para pruebas y mediciones sin red
+
+import asyncio
+import random
+import threading
+import time
+import zlib
+import numpy as np
+from almacen_velas import DURACION_TIMEFRAME_MS
+
+
+FIN_POR_DEFECTO_MS = 1735689600000  # 2025-01-01 00:00 UTC
+
+
+def matriz_velas(symbol, timeframe, cantidad, fin_ms=FIN_POR_DEFECTO_MS):
+    """Paseo aleatorio determinista por símbolo: (timestamps int64, matriz OHLCV sin timestamp)."""
+    rng = np.random.default_rng(zlib.crc32(f"{symbol}|{timeframe}".encode()))
+    paso = DURACION_TIMEFRAME_MS.get(timeframe, 86400000)
+    cierres = 100 * np.exp(np.cumsum(rng.normal(0, 0.03, cantidad)))
+    aperturas = np.concatenate([[cierres[0]], cierres[:-1]])
+    altos = np.maximum(aperturas, cierres) * (1 + rng.uniform(0, 0.02, cantidad))
+    bajos = np.minimum(aperturas, cierres) * (1 - rng.uniform(0, 0.02, cantidad))
+    volumenes = rng.lognormal(10, 1, cantidad)
+    tiempos = fin_ms - (cantidad - 1 - np.arange(cantidad, dtype=np.int64)) * paso
+    return tiempos, np.column_stack([aperturas, altos, bajos, cierres, volumenes])
+
+def _a_listas(tiempos, valores):
+    return [[t] + fila for t, fila in zip(tiempos.tolist(), valores.tolist())]
+
+def generar_velas(symbol, timeframe, cantidad, fin_ms=FIN_POR_DEFECTO_MS):
+    """Las mismas velas que matriz_velas, en el formato de fetch_ohlcv."""
+    return _a_listas(*matriz_velas(symbol, timeframe, cantidad, fin_ms))
+
+
+def simbolos_sinteticos(cantidad, cotizacion="USDT"):
+    """Nombres de pares inventados y estables: S0000/USDT, S0001/USDT..."""
+    return [f"S{i:04d}/{cotizacion}" for i in range(cantidad)]
+
+
+class ExchangeFalso:
+    """Imita ccxt.poloniex (síncrono) con datos sintéticos, latencia fija y errores de red simulados."""
+
+    rateLimit = 0
+
+    def __init__(self, symbols=None, latencia=0.0, velas=1000, tasa_errores=0.0, semilla=0, fin_ms=FIN_POR_DEFECTO_MS):
+        self.symbols = symbols or ["BTC/USDT", "ETH/USDT"]
+        self._conocidos = set(self.symbols)
+        self.latencia = latencia
+        self.velas = velas
+        self.fin_ms = fin_ms
+        self.tasa_errores = tasa_errores
+        self.llamadas = 0
+        self.errores = 0
+        self._cache = {}
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+
+    def _velas(self, symbol, timeframe):
+        # Se guardan como arrays: con miles de pares las listas de ccxt ocuparían cientos de MB
+        clave = (symbol, timeframe)
+        if clave not in self._cache:
+            self._cache[clave] = matriz_velas(symbol, timeframe, self.velas, self.fin_ms)
+        return self._cache[clave]
+
+    def _llamada(self):
+        """Cuenta la petición y, con probabilidad `tasa_errores`, la hace fallar como un timeout."""
+        import ccxt
+        with self._lock:
+            self.llamadas += 1
+            fallo = self.tasa_errores and self._azar.random() < self.tasa_errores
+            if fallo:
+                self.errores += 1
+        if fallo:
+            raise ccxt.NetworkError("poloniex GET timed out (error simulado)")
+
+    def _ohlcv(self, symbol, timeframe, since=None, limit=None):
+        import ccxt
+        self._llamada()
+        if symbol not in self._conocidos:
+            raise ccxt.BadSymbol(f"poloniex does not have market symbol {symbol}")
+        tiempos, valores = self._velas(symbol, timeframe)
+        if since is not None:
+            desde = int(np.searchsorted(tiempos, since))
+            hasta = desde + limit if limit else len(tiempos)
+        else:
+            hasta = len(tiempos)
+            desde = max(0, hasta - limit) if limit else 0
+        return _a_listas(tiempos[desde:hasta], valores[desde:hasta])
+
+    def _tickers(self):
+        # Último cierre diario como precio y volumen; el spread sale del nombre, entre 0,05 % y 3 %
+        self._llamada()
+        tickers = {}
+        for symbol in self.symbols:
+            tiempos, valores = self._velas(symbol, '1d')
+            ultimo = float(valores[-1, 3])
+            spread = 0.0005 + (zlib.crc32(symbol.encode()) % 1000) / 1000 * 0.03
+            tickers[symbol] = {
+                'symbol': symbol,
+                'timestamp': int(tiempos[-1]),
+                'last': ultimo,
+                'bid': ultimo * (1 - spread / 2),
+                'ask': ultimo * (1 + spread / 2),
+                'baseVolume': float(valores[-1, 4]),
+                'quoteVolume': float(valores[-1, 4]) * ultimo
+            }
+        return tickers
+
+    def load_markets(self):
+        return {symbol: {'symbol': symbol} for symbol in self.symbols}
+
+    def fetch_tickers(self, symbols=None, params={}):
+        if self.latencia:
+            time.sleep(self.latencia)
+        tickers = self._tickers()
+        return {s: t for s, t in tickers.items() if symbols is None or s in symbols}
+
+    def fetch_ohlcv(self, symbol, timeframe='1d', since=None, limit=None, params={}):
+        if self.latencia:
+            time.sleep(self.latencia)
+        return self._ohlcv(symbol, timeframe, since, limit)
+
+
+class ExchangeFalsoAsync(ExchangeFalso):
+    """Variante asíncrona, compatible con ccxt.async_support."""
+
+    async def fetch_ohlcv(self, symbol, timeframe='1d', since=None, limit=None, params={}):
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        return self._ohlcv(symbol, timeframe, since, limit)
+
+    async def fetch_tickers(self, symbols=None, params={}):
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        tickers = self._tickers()
+        return {s: t for s, t in tickers.items() if symbols is None or s in symbols}
+
+    async def close(self):
+        pass
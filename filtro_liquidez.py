@@ -0,0 +1,126 @@
+# filtro_liquidez.py
+# Preselección de pares antes del escaneo masivo: una sola llamada a fetch_tickers descarta los
+# pares sin volumen, con spread excesivo o precio despreciable, y una caché negativa con caducidad
+# salta los que fallaron o devolvieron pocas velas hace poco.
+
+import threading
+import time
+
+MONEDA_REFERENCIA = "USDT"
+
+FILTRO_POR_DEFECTO = {
+    "activo": True,
+    "volumen_24h_minimo": 50000,  # en USDT, también para los pares cotizados en BTC, ETH, TRX...
+    "spread_maximo": 0.02,        # (ask - bid) / ask
+    "precio_minimo": 0.00000001,
+    "horas_cache_negativa": 24
+}
+
+
+def config_filtro(config_avanzada):
+    return {**FILTRO_POR_DEFECTO, **config_avanzada.get("filtro_liquidez", {})}
+
+
+# === CACHÉ NEGATIVA ===
+class CacheNegativa:
+    """Pares que fallaron o no tenían velas suficientes, ignorados hasta que caduque la entrada."""
+
+    def __init__(self, segundos=24 * 3600):
+        self.segundos = segundos
+        self._lock = threading.Lock()
+        self._entradas = {}  # (symbol, timeframe) -> (caduca_en, motivo)
+        self.metricas = {'marcados': 0, 'saltados': 0}
+
+    def marcar(self, symbol, timeframe, motivo):
+        with self._lock:
+            self._entradas[(symbol, timeframe)] = (time.time() + self.segundos, motivo)
+            self.metricas['marcados'] += 1
+
+    def motivo(self, symbol, timeframe):
+        """Motivo por el que el par sigue bloqueado, o None si no lo está (o ya caducó)."""
+        with self._lock:
+            entrada = self._entradas.get((symbol, timeframe))
+            if entrada is None:
+                return None
+            caduca_en, motivo = entrada
+            if caduca_en <= time.time():
+                del self._entradas[(symbol, timeframe)]
+                return None
+            self.metricas['saltados'] += 1
+            return motivo
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+# === FILTRO POR TICKERS ===
+def volumen_cotizado(ticker):
+    """Volumen 24h en la moneda de cotización; si el exchange no lo da, base × último precio."""
+    if ticker.get('quoteVolume') is not None:
+        return ticker['quoteVolume']
+    if ticker.get('baseVolume') is not None and ticker.get('last') is not None:
+        return ticker['baseVolume'] * ticker['last']
+    return None
+
+def moneda_cotizacion(symbol):
+    return symbol.split("/")[-1].split(":")[0]
+
+def cambios_a_referencia(tickers):
+    """{moneda de cotización: precio en USDT} sacado de los pares X/USDT (o USDT/X) de los mismos tickers."""
+    cambios = {MONEDA_REFERENCIA: 1.0}
+    for symbol, ticker in tickers.items():
+        precio = ticker.get('last')
+        if not precio or "/" not in symbol:
+            continue
+        base, cotizacion = symbol.split("/")[0], moneda_cotizacion(symbol)
+        if cotizacion == MONEDA_REFERENCIA:
+            cambios.setdefault(base, precio)
+        elif base == MONEDA_REFERENCIA:
+            cambios.setdefault(cotizacion, 1 / precio)
+    return cambios
+
+def motivo_descarte(ticker, config, cambio=1.0):
+    """Por qué el ticker no pasa el filtro, o None si pasa. Los campos que faltan no descartan.
+
+    `cambio` pasa el volumen de la moneda de cotización a USDT; sin él
+    (None) el volumen no se comprueba.
+    """
+    if ticker is None:
+        return "sin_ticker"
+    volumen = volumen_cotizado(ticker)
+    if volumen is not None and cambio is not None and volumen * cambio < config["volumen_24h_minimo"]:
+        return "volumen"
+    bid, ask = ticker.get('bid'), ticker.get('ask')
+    if bid and ask and (ask - bid) / ask > config["spread_maximo"]:
+        return "spread"
+    precio = ticker.get('last')
+    if precio is not None and precio < config["precio_minimo"]:
+        return "precio"
+    return None
+
+def preseleccionar(symbols, timeframe, tickers, cache_negativa, config):
+    """Filtra `symbols` con los tickers y la caché negativa.
+
+    Devuelve (supervivientes, descartes) con descartes = {motivo: número de pares}.
+    Con tickers=None (falló fetch_tickers) solo se aplica la caché negativa.
+    """
+    supervivientes = []
+    descartes = {}
+    cambios = cambios_a_referencia(tickers) if tickers is not None else {}
+    for symbol in symbols:
+        motivo = cache_negativa.motivo(symbol, timeframe)
+        if motivo is None and tickers is not None:
+            motivo = motivo_descarte(tickers.get(symbol), config, cambios.get(moneda_cotizacion(symbol)))
+        if motivo is None:
+            supervivientes.append(symbol)
+        else:
+            descartes[motivo] = descartes.get(motivo, 0) + 1
+    return supervivientes, descartes
+
+def formatear_descartes(total, supervivientes, descartes):
+    detalle = ", ".join(f"{motivo}: {n}" for motivo, n in sorted(descartes.items()))
+    return f"🧹 {len(supervivientes)} de {total} pares pasan el filtro de liquidez" + (f" ({detalle})" if detalle else "")
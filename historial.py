@@ -0,0 +1,80 @@
+# historial.py
+# Historial de alertas enviadas en SQLite: escrituras O(1), consulta por clave indexada y caducidad.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+HISTORIAL_DB = "historial_alertas.db"
+HISTORIAL_JSON = "historial_alertas.json"
+
+
+class HistorialAlertas:
+    """Claves de alertas ya enviadas. La primera vez importa el historial_alertas.json existente."""
+
+    def __init__(self, ruta=HISTORIAL_DB, ruta_json=HISTORIAL_JSON):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS alertas (
+                    clave TEXT PRIMARY KEY,
+                    fecha TEXT NOT NULL,
+                    creado REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS alertas_creado ON alertas (creado)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT)")
+            self._conn.commit()
+        self._migrar_json(ruta_json)
+
+    def _migrar_json(self, ruta_json):
+        with self._lock:
+            migrado = self._conn.execute("SELECT valor FROM meta WHERE clave = 'migrado_json'").fetchone()
+        if migrado or not os.path.exists(ruta_json):
+            return
+        try:
+            with open(ruta_json, "r") as f:
+                anteriores = json.load(f)
+        except Exception as e:
+            print(f"Error leyendo {ruta_json}: {e}")
+            return
+        filas = []
+        for clave, fecha in anteriores.items():
+            try:
+                creado = datetime.fromisoformat(str(fecha)).timestamp()
+            except ValueError:
+                creado = time.time()
+            filas.append((clave, str(fecha), creado))
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO alertas VALUES (?, ?, ?)", filas)
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('migrado_json', ?)", (str(datetime.now()),))
+            self._conn.commit()
+        print(f"Historial migrado desde {ruta_json}: {len(filas)} alertas")
+
+    def __contains__(self, clave):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM alertas WHERE clave = ?", (clave,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM alertas").fetchone()[0]
+
+    def registrar(self, clave):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO alertas VALUES (?, ?, ?)",
+                (clave, str(datetime.now()), time.time())
+            )
+            self._conn.commit()
+
+    def compactar(self, dias=180):
+        """Borra las alertas más antiguas que `dias` y devuelve cuántas se eliminaron."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM alertas WHERE creado < ?", (time.time() - dias * 86400,))
+            self._conn.commit()
+        return cursor.rowcount
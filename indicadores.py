@@ -0,0 +1,213 @@
+# indicadores.py
+# EMA50/EMA200/MACD/RSI incrementales: el estado recursivo se guarda junto a las velas
+# y cada vela nueva cuesta O(1) en lugar de recalcular todo el DataFrame.
+#
+# Las fórmulas reproducen las de pandas_ta sin TA-Lib:
+#   ema  -> semilla SMA de las primeras `length` velas y luego ewm(adjust=False)
+#   macd -> ema12 - ema26, señal = ema9 (con semilla SMA) desde el primer MACD válido
+#   rsi  -> rma = ewm(alpha=1/14, adjust=True, min_periods=14) de subidas y bajadas
+
+import json
+import math
+import numpy as np
+
+NAN = float('nan')
+COLUMNAS_INDICADORES = ['ema50', 'ema200', 'macd', 'macd_signal', 'rsi']
+
+
+class EstadoEMA:
+    def __init__(self, length, velas=0, suma=0.0, valor=NAN):
+        self.length = length
+        self.alpha = 2 / (length + 1)
+        self.velas = velas
+        self.suma = suma
+        self.valor = valor
+
+    def actualizar(self, x):
+        self.velas += 1
+        if self.velas < self.length:
+            self.suma += x
+            return NAN
+        if self.velas == self.length:
+            self.valor = (self.suma + x) / self.length
+        else:
+            self.valor = (1 - self.alpha) * self.valor + self.alpha * x
+        return self.valor
+
+    def a_dict(self):
+        return {'length': self.length, 'velas': self.velas, 'suma': self.suma, 'valor': self.valor}
+
+
+class EstadoIndicadores:
+    """Estado de todos los indicadores tras la última vela cerrada de un (symbol, timeframe)."""
+
+    LONGITUD_RSI = 14
+
+    def __init__(self, datos=None):
+        datos = datos or {}
+        self.emas = {
+            int(k): EstadoEMA(**v) for k, v in datos.get('emas', {}).items()
+        } or {length: EstadoEMA(length) for length in (50, 200, 12, 26)}
+        self.senal = EstadoEMA(**datos['senal']) if 'senal' in datos else EstadoEMA(9)
+        self.ultimo_cierre = datos.get('ultimo_cierre')
+        # rma ajustada: numeradores y denominador comunes de la media exponencial
+        self.num_subidas = datos.get('num_subidas', 0.0)
+        self.num_bajadas = datos.get('num_bajadas', 0.0)
+        self.denominador = datos.get('denominador', 0.0)
+        self.observaciones_rsi = datos.get('observaciones_rsi', 0)
+
+    def avanzar(self, cierre):
+        """Incorpora una vela cerrada y devuelve (ema50, ema200, macd, macd_signal, rsi)."""
+        ema50 = self.emas[50].actualizar(cierre)
+        ema200 = self.emas[200].actualizar(cierre)
+        rapida = self.emas[12].actualizar(cierre)
+        lenta = self.emas[26].actualizar(cierre)
+        macd = rapida - lenta
+        macd_signal = self.senal.actualizar(macd) if not math.isnan(macd) else NAN
+
+        rsi = NAN
+        if self.ultimo_cierre is not None:
+            cambio = cierre - self.ultimo_cierre
+            factor = 1 - 1 / self.LONGITUD_RSI
+            self.num_subidas = max(cambio, 0.0) + factor * self.num_subidas
+            self.num_bajadas = -min(cambio, 0.0) + factor * self.num_bajadas
+            self.denominador = 1.0 + factor * self.denominador
+            self.observaciones_rsi += 1
+            total = self.num_subidas + self.num_bajadas
+            if self.observaciones_rsi >= self.LONGITUD_RSI and total > 0:
+                rsi = 100 * self.num_subidas / total
+        self.ultimo_cierre = cierre
+
+        return ema50, ema200, macd, macd_signal, rsi
+
+    def previsualizar(self, cierre):
+        """Valores para una vela aún abierta, sin modificar el estado."""
+        return EstadoIndicadores(self.a_dict()).avanzar(cierre)
+
+    def a_dict(self):
+        return {
+            'emas': {str(k): v.a_dict() for k, v in self.emas.items()},
+            'senal': self.senal.a_dict(),
+            'ultimo_cierre': self.ultimo_cierre,
+            'num_subidas': self.num_subidas,
+            'num_bajadas': self.num_bajadas,
+            'denominador': self.denominador,
+            'observaciones_rsi': self.observaciones_rsi
+        }
+
+    def a_json(self):
+        return json.dumps(self.a_dict())
+
+    @classmethod
+    def desde_json(cls, texto):
+        return cls(json.loads(texto))
+
+
+def _a_ms(timestamps):
+    return timestamps.values.astype('datetime64[ms]').astype(np.int64)
+
+def actualizar_indicadores(df, almacen=None, symbol=None, timeframe=None):
+    """Añade ema50, ema200, macd, macd_signal y rsi a `df`.
+
+    Con almacén se reutiliza el estado guardado: las velas ya procesadas se
+    leen de disco y solo las nuevas avanzan el estado. La última fila se
+    considera abierta y se calcula sin guardarla. Si el estado no encaja con
+    las velas de `df` (primera vez o hueco), se reconstruye desde el principio.
+    """
+    n = len(df)
+    tiempos = _a_ms(df['timestamp'])
+    cierres = df['close'].values.astype(float)
+    valores = np.full((n, len(COLUMNAS_INDICADORES)), np.nan)
+
+    estado = None
+    inicio = 0
+    if almacen is not None:
+        guardado = almacen.leer_estado_indicadores(symbol, timeframe)
+        if guardado is not None:
+            ts_estado, texto = guardado
+            posicion = np.searchsorted(tiempos, ts_estado)
+            if posicion < n - 1 and tiempos[posicion] == ts_estado:
+                filas = almacen.leer_indicadores(symbol, timeframe, tiempos[0], ts_estado)
+                # Solo sirve si tenemos los valores de todas las velas anteriores
+                if len(filas) == posicion + 1:
+                    estado = EstadoIndicadores.desde_json(texto)
+                    valores[:posicion + 1] = np.array([f[1:] for f in filas], dtype=float)
+                    inicio = posicion + 1
+    if estado is None:
+        estado = EstadoIndicadores()
+
+    nuevas = []
+    for i in range(inicio, n - 1):
+        valores[i] = estado.avanzar(cierres[i])
+        nuevas.append((tiempos[i], *valores[i]))
+    if n:
+        valores[n - 1] = estado.previsualizar(cierres[n - 1])
+
+    if almacen is not None and nuevas:
+        almacen.guardar_indicadores(symbol, timeframe, tiempos[n - 2], estado.a_json(), nuevas)
+
+    for j, columna in enumerate(COLUMNAS_INDICADORES):
+        df[columna] = valores[:, j]
+    return df
+
+
+# === CÁLCULO POR LOTES ===
+def _ema_lote(valores, length):
+    """EMA de cada fila de un array 2-D; los NaN son velas inexistentes y no avanzan la media."""
+    alpha = 2 / (length + 1)
+    n_filas, n = valores.shape
+    salida = np.full((n_filas, n), np.nan)
+    velas = np.zeros(n_filas, dtype=np.int64)
+    suma = np.zeros(n_filas)
+    valor = np.full(n_filas, np.nan)
+    for t in range(n):
+        x = valores[:, t]
+        hay = ~np.isnan(x)
+        velas += hay
+        acumula = hay & (velas < length)
+        suma[acumula] += x[acumula]
+        semilla = hay & (velas == length)
+        valor[semilla] = (suma[semilla] + x[semilla]) / length
+        sigue = hay & (velas > length)
+        valor[sigue] = (1 - alpha) * valor[sigue] + alpha * x[sigue]
+        salida[hay & (velas >= length), t] = valor[hay & (velas >= length)]
+    return salida
+
+def _rsi_lote(cierres, length=EstadoIndicadores.LONGITUD_RSI):
+    n_filas, n = cierres.shape
+    salida = np.full((n_filas, n), np.nan)
+    factor = 1 - 1 / length
+    ultimo = np.full(n_filas, np.nan)
+    subidas = np.zeros(n_filas)
+    bajadas = np.zeros(n_filas)
+    observaciones = np.zeros(n_filas, dtype=np.int64)
+    for t in range(n):
+        x = cierres[:, t]
+        hay = ~np.isnan(x)
+        avanza = hay & ~np.isnan(ultimo)
+        cambio = x[avanza] - ultimo[avanza]
+        subidas[avanza] = np.maximum(cambio, 0.0) + factor * subidas[avanza]
+        bajadas[avanza] = -np.minimum(cambio, 0.0) + factor * bajadas[avanza]
+        observaciones += avanza
+        total = subidas + bajadas
+        listo = avanza & (observaciones >= length) & (total > 0)
+        salida[listo, t] = 100 * subidas[listo] / total[listo]
+        ultimo[hay] = x[hay]
+    return salida
+
+def calcular_indicadores_lote(cierres):
+    """Los mismos indicadores que EstadoIndicadores para muchas series a la vez.
+
+    `cierres` es 2-D (una fila por símbolo) con NaN donde el par no tiene vela.
+    Se avanza vela a vela pero cada paso opera sobre todos los símbolos juntos.
+    Devuelve {columna: array 2-D} con las columnas de COLUMNAS_INDICADORES.
+    """
+    cierres = np.atleast_2d(np.asarray(cierres, dtype=float))
+    macd = _ema_lote(cierres, 12) - _ema_lote(cierres, 26)
+    return {
+        'ema50': _ema_lote(cierres, 50),
+        'ema200': _ema_lote(cierres, 200),
+        'macd': macd,
+        'macd_signal': _ema_lote(macd, 9),
+        'rsi': _rsi_lote(cierres)
+    }
@@ -0,0 +1,253 @@
+# metricas.py
+# Contadores e histogramas de latencia por etapa del análisis, con exportación en formato Prometheus.
+# Desactivadas (por defecto) medir() devuelve siempre el mismo objeto vacío y contar()/observar()
+# salen tras comprobar un booleano, así que la instrumentación puede quedarse en el código.
+
+import bisect
+import functools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIJO = "criptobot"
+PUERTO_POR_DEFECTO = 9108
+LIMITES_HISTOGRAMA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_activas = False
+_lock = threading.Lock()
+_contadores = {}   # (nombre, etiquetas) -> valor
+_histogramas = {}  # (nombre, etiquetas) -> {'cubetas': [...], 'suma': s, 'cuenta': n}
+_fuentes = {}      # nombre -> función sin argumentos que devuelve {clave: número}
+_servidor = None
+
+
+# === ACTIVACIÓN ===
+def activar(activas=True):
+    global _activas
+    _activas = bool(activas)
+
+def activas():
+    return _activas
+
+def limpiar():
+    with _lock:
+        _contadores.clear()
+        _histogramas.clear()
+
+
+# === REGISTRO ===
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted(etiquetas.items()))
+
+def contar(nombre, valor=1, **etiquetas):
+    if not _activas:
+        return
+    clave = _clave(nombre, etiquetas)
+    with _lock:
+        _contadores[clave] = _contadores.get(clave, 0) + valor
+
+def observar(nombre, segundos, **etiquetas):
+    if not _activas:
+        return
+    clave = _clave(nombre, etiquetas)
+    with _lock:
+        histograma = _histogramas.get(clave)
+        if histograma is None:
+            histograma = _histogramas[clave] = {'cubetas': [0] * len(LIMITES_HISTOGRAMA), 'suma': 0.0, 'cuenta': 0}
+        posicion = bisect.bisect_left(LIMITES_HISTOGRAMA, segundos)
+        if posicion < len(LIMITES_HISTOGRAMA):
+            histograma['cubetas'][posicion] += 1
+        histograma['suma'] += segundos
+        histograma['cuenta'] += 1
+
+def extraer():
+    """Contadores e histogramas registrados hasta ahora, y vacía el registro.
+
+    Para los procesos del escaneo: lo que miden no llega solo al proceso
+    principal, así que lo devuelven con cada bloque y este lo suma con fusionar().
+    """
+    with _lock:
+        datos = {'contadores': dict(_contadores), 'histogramas': dict(_histogramas)}
+        _contadores.clear()
+        _histogramas.clear()
+    return datos
+
+def fusionar(datos):
+    """Suma al registro lo que devolvió extraer() en otro proceso."""
+    if not _activas or not datos:
+        return
+    with _lock:
+        for clave, valor in datos['contadores'].items():
+            _contadores[clave] = _contadores.get(clave, 0) + valor
+        for clave, externo in datos['histogramas'].items():
+            histograma = _histogramas.get(clave)
+            if histograma is None:
+                _histogramas[clave] = dict(externo, cubetas=list(externo['cubetas']))
+                continue
+            histograma['cubetas'] = [a + b for a, b in zip(histograma['cubetas'], externo['cubetas'])]
+            histograma['suma'] += externo['suma']
+            histograma['cuenta'] += externo['cuenta']
+
+def registrar_fuente(nombre, funcion):
+    """Valores que ya cuenta otro módulo (cola de Telegram, caché...), exportados como gauges."""
+    _fuentes[nombre] = funcion
+
+
+# === CRONÓMETROS ===
+class _Cronometro:
+    __slots__ = ('etapa', 'inicio')
+
+    def __init__(self, etapa):
+        self.etapa = etapa
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        observar('etapa_segundos', time.perf_counter() - self.inicio, etapa=self.etapa)
+        if tipo is not None:
+            contar('etapa_errores_total', etapa=self.etapa)
+        return False
+
+
+class _SinMedir:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        return False
+
+
+_SIN_MEDIR = _SinMedir()
+
+def medir(etapa):
+    """`with metricas.medir("indicadores"):` cronometra el bloque si las métricas están activas."""
+    if not _activas:
+        return _SIN_MEDIR
+    return _Cronometro(etapa)
+
+def cronometrado(etapa):
+    """Decorador equivalente a envolver toda la función en medir(etapa)."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activas:
+                return funcion(*args, **kwargs)
+            with _Cronometro(etapa):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+# === EXPORTACIÓN ===
+def _etiquetas_texto(etiquetas, extra=()):
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}"
+
+def exportar_prometheus():
+    """Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)."""
+    with _lock:
+        contadores = dict(_contadores)
+        histogramas = {clave: dict(h, cubetas=list(h['cubetas'])) for clave, h in _histogramas.items()}
+
+    lineas = []
+    for nombre in sorted({n for n, _ in contadores}):
+        lineas.append(f"# TYPE {PREFIJO}_{nombre} counter")
+        for (n, etiquetas), valor in sorted(contadores.items()):
+            if n == nombre:
+                lineas.append(f"{PREFIJO}_{nombre}{_etiquetas_texto(etiquetas)} {valor}")
+
+    for nombre in sorted({n for n, _ in histogramas}):
+        lineas.append(f"# TYPE {PREFIJO}_{nombre} histogram")
+        for (n, etiquetas), histograma in sorted(histogramas.items()):
+            if n != nombre:
+                continue
+            acumulado = 0
+            for limite, cantidad in zip(LIMITES_HISTOGRAMA, histograma['cubetas']):
+                acumulado += cantidad
+                lineas.append(f"{PREFIJO}_{nombre}_bucket{_etiquetas_texto(etiquetas, [('le', limite)])} {acumulado}")
+            lineas.append(f"{PREFIJO}_{nombre}_bucket{_etiquetas_texto(etiquetas, [('le', '+Inf')])} {histograma['cuenta']}")
+            lineas.append(f"{PREFIJO}_{nombre}_sum{_etiquetas_texto(etiquetas)} {histograma['suma']}")
+            lineas.append(f"{PREFIJO}_{nombre}_count{_etiquetas_texto(etiquetas)} {histograma['cuenta']}")
+
+    for fuente, funcion in sorted(_fuentes.items()):
+        try:
+            valores = funcion()
+        except Exception as e:
+            print(f"Error leyendo métricas de {fuente}: {e}")
+            continue
+        for clave, valor in sorted(valores.items()):
+            lineas.append(f"# TYPE {PREFIJO}_{fuente}_{clave} gauge")
+            lineas.append(f"{PREFIJO}_{fuente}_{clave} {valor}")
+    return "\n".join(lineas) + "\n"
+
+def _cuantil(cubetas, cuenta, q):
+    """Cuantil aproximado por interpolación lineal dentro de la cubeta, como histogram_quantile."""
+    objetivo = q * cuenta
+    acumulado = 0
+    for i, cantidad in enumerate(cubetas):
+        if cantidad and acumulado + cantidad >= objetivo:
+            inferior = LIMITES_HISTOGRAMA[i - 1] if i else 0.0
+            return inferior + (LIMITES_HISTOGRAMA[i] - inferior) * (objetivo - acumulado) / cantidad
+        acumulado += cantidad
+    return LIMITES_HISTOGRAMA[-1]
+
+def resumen_etapas():
+    """Una fila por etapa para el dashboard: llamadas, errores, total y latencias en ms."""
+    with _lock:
+        histogramas = {
+            dict(etiquetas).get('etapa'): dict(h, cubetas=list(h['cubetas']))
+            for (nombre, etiquetas), h in _histogramas.items() if nombre == 'etapa_segundos'
+        }
+        errores = {
+            dict(etiquetas).get('etapa'): valor
+            for (nombre, etiquetas), valor in _contadores.items() if nombre == 'etapa_errores_total'
+        }
+    filas = []
+    for etapa, h in sorted(histogramas.items(), key=lambda item: -item[1]['suma']):
+        filas.append({
+            'etapa': etapa,
+            'llamadas': h['cuenta'],
+            'errores': errores.get(etapa, 0),
+            'total_s': round(h['suma'], 3),
+            'media_ms': round(h['suma'] / h['cuenta'] * 1000, 2) if h['cuenta'] else 0.0,
+            'p50_ms': round(_cuantil(h['cubetas'], h['cuenta'], 0.5) * 1000, 2),
+            'p95_ms': round(_cuantil(h['cubetas'], h['cuenta'], 0.95) * 1000, 2)
+        })
+    return filas
+
+
+# === SERVIDOR HTTP ===
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = exportar_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+def iniciar_servidor(puerto=PUERTO_POR_DEFECTO, host="127.0.0.1"):
+    """Sirve /metrics en un hilo de fondo; solo arranca una vez por proceso."""
+    global _servidor
+    if _servidor is not None:
+        return _servidor
+    try:
+        _servidor = ThreadingHTTPServer((host, puerto), _ManejadorMetricas)
+    except OSError as e:
+        print(f"No se pudo abrir el puerto de métricas {puerto}: {e}")
+        return None
+    _servidor.daemon_threads = True
+    threading.Thread(target=_servidor.serve_forever, daemon=True).start()
+    return _servidor
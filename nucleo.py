@@ -0,0 +1,860 @@
+# nucleo.py
+# Núcleo del bot sin interfaz: exchange, datos, análisis, alertas y scheduler.
+# Lo usan tanto el dashboard (bot.py) como el worker sin Streamlit (worker.py).
+
+import ccxt
+import pandas as pd
+import json
+import os
+from datetime import datetime, timedelta
+import analisis
+import escaner
+import descarga_async
+import almacen_velas
+import indicadores
+import historial
+import envio_telegram
+import panel
+import cache_analisis
+import metricas
+import cierres_vela
+import vuelo_unico
+import filtro_liquidez
+import control_tasa
+import remuestreo
+import relleno_historico
+import escaner_procesos
+from patrones_vela import calcular_patrones
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.util import obj_to_ref
+from concurrent.futures.process import BrokenProcessPool
+import pytz
+import threading
+import time
+
+# === CONFIGURACIÓN DE TELEGRAM ===
+TELEGRAM_TOKEN = os.environ.get("TGT")
+TELEGRAM_CHAT_ID = os.environ.get("TGID")
+
+# === HISTORIAL DE ALERTAS ===
+# Alertas más antiguas que esto se borran en la compactación diaria
+HISTORIAL_DIAS = 180
+
+# El historial, la cola de Telegram y el almacén de velas se crean al primer uso y no al importar:
+# los procesos del escaneo (escaner_procesos) importan nucleo y no deben abrir los SQLite del principal
+historial_alertas = None
+cola_telegram = None
+almacen = None
+lock_recursos = threading.Lock()
+
+def obtener_historial_alertas():
+    global historial_alertas
+    with lock_recursos:
+        if historial_alertas is None:
+            historial_alertas = historial.HistorialAlertas()
+        return historial_alertas
+
+def alerta_ya_enviada(par, tipo, timestamp):
+    clave = f"{par}_{tipo}_{timestamp}"
+    return clave in obtener_historial_alertas()
+
+def registrar_alerta(par, tipo, timestamp):
+    clave = f"{par}_{tipo}_{timestamp}"
+    obtener_historial_alertas().registrar(clave)
+
+# Alertas en cola y aún sin confirmar: la clave se reserva al encolar para que dos escaneos
+# seguidos no manden la misma alerta antes de que la primera llegue a Telegram
+alertas_reservadas = set()
+lock_alertas = threading.Lock()
+
+def reservar_alerta(par, tipo, timestamp):
+    """True si la alerta no se ha enviado ni está en cola; en ese caso queda reservada."""
+    clave = f"{par}_{tipo}_{timestamp}"
+    with lock_alertas:
+        if clave in alertas_reservadas or alerta_ya_enviada(par, tipo, timestamp):
+            return False
+        alertas_reservadas.add(clave)
+        return True
+
+def liberar_alerta(par, tipo, timestamp):
+    with lock_alertas:
+        alertas_reservadas.discard(f"{par}_{tipo}_{timestamp}")
+
+def compactar_historial():
+    eliminadas = obtener_historial_alertas().compactar(HISTORIAL_DIAS)
+    print(f"Historial compactado: {eliminadas} alertas eliminadas")
+
+# === CONFIGURACIÓN DE RECENCIA POR MONEDA ===
+CONFIG_FILE = "config_suelos.json"
+if os.path.exists(CONFIG_FILE):
+    with open(CONFIG_FILE, "r") as f:
+        config_suelos = json.load(f)
+else:
+    config_suelos = {}
+
+def guardar_config():
+    with open(CONFIG_FILE, "w") as f:
+        json.dump(config_suelos, f, indent=2)
+
+def get_recencia_config(par):
+    if par in config_suelos:
+        return config_suelos[par].get("recencia_velas", 2), config_suelos[par].get("recencia_dias", 0)
+    else:
+        return 2, 0
+
+def set_recencia_config(par, recencia_velas, recencia_dias):
+    config_suelos[par] = {"recencia_velas": recencia_velas, "recencia_dias": recencia_dias}
+    guardar_config()
+
+# === CONFIGURACIÓN DE AUTOANÁLISIS ===
+AUTO_CONFIG_FILE = "config_auto.json"
+
+def cargar_auto_config():
+    ejemplo = {
+        "BTC/USDT": {
+            "1d": 3,
+            "1w": 1,
+            "1M": {"por_semana": 5},
+            "1y": {"por_mes": 2}
+        },
+        "ETH/USDT": {
+            "1d": 2,
+            "1w": 1
+        }
+    }
+    if os.path.exists(AUTO_CONFIG_FILE):
+        with open(AUTO_CONFIG_FILE, "r") as f:
+            return json.load(f)
+    else:
+        with open(AUTO_CONFIG_FILE, "w") as f:
+            json.dump(ejemplo, f, indent=2)
+        return ejemplo
+
+def guardar_auto_config(config_auto):
+    with open(AUTO_CONFIG_FILE, "w") as f:
+        json.dump(config_auto, f, indent=2)
+
+# === FUNCIONES DE ALERTA Y ANÁLISIS ===
+def obtener_cola_telegram():
+    global cola_telegram
+    with lock_recursos:
+        if cola_telegram is None:
+            cola_telegram = envio_telegram.ColaTelegram(
+                TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, url_base=os.environ.get("TELEGRAM_API_URL", envio_telegram.URL_API)
+            )
+        return cola_telegram
+
+@metricas.cronometrado('send_telegram_alert')
+def send_telegram_alert(message, symbol, timestamp, tipo, esperar=False):
+    """Encola la alerta; se registra en el historial cuando Telegram confirma la entrega.
+
+    Con `esperar=True` bloquea hasta el resultado real del envío.
+    """
+    if not reservar_alerta(symbol, tipo, timestamp):
+        metricas.contar('alertas_total', estado='duplicada')
+        return False
+    metricas.contar('alertas_total', estado='encolada')
+    futuro = obtener_cola_telegram().encolar(message, al_entregar=lambda: registrar_alerta(symbol, tipo, timestamp))
+    # Entregada ya está en el historial; si falló, se libera para que otro escaneo la reintente
+    futuro.add_done_callback(lambda _: liberar_alerta(symbol, tipo, timestamp))
+    if esperar:
+        return futuro.result()
+    return True
+
+# === PATRONES DE VELA ===
+PATRONES_VELA = {
+    'hammer': ('🔨 Martillo', 'Patrón de reversión alcista'),
+    'engulfing': ('🟢 Envolvente', 'Patrón de reversión'),
+    'doji': ('✴️ Doji', 'Indecisión del mercado'),
+    'morning_star': ('🌅 Estrella Matutina', 'Reversión alcista'),
+    'evening_star': ('🌇 Estrella Vespertina', 'Reversión bajista'),
+    'harami': ('🕯️ Harami', 'Patrón de reversión'),
+    'shooting_star': ('🌠 Estrella Fugaz', 'Reversión bajista')
+}
+
+def obtener_patrones_vela(df):
+    ultimo = df.iloc[-1]
+    return patrones_desde_valores({patron: ultimo[patron] for patron in PATRONES_VELA if patron in df.columns})
+
+def patrones_desde_valores(valores):
+    """Lista de patrones activos a partir de {patron: valor en la última vela}."""
+    patrones_encontrados = []
+    for patron, (emoji_nombre, descripcion) in PATRONES_VELA.items():
+        if patron in valores and valores[patron] != 0:
+            patrones_encontrados.append({
+                'patron': patron,
+                'nombre': emoji_nombre,
+                'descripcion': descripcion,
+                'valor': valores[patron]
+            })
+
+    return patrones_encontrados
+
+def generar_alertas(precio, doble, triple, fiabilidad_doble, fiabilidad_triple, cambio_tendencia, patrones_vela_actuales):
+    """Alertas de un par a partir de sus señales; las comparten analizar_simbolo y escanear_panel."""
+    alertas = []
+    if doble:
+        alertas.append({
+            'tipo': 'DOBLE SUELO',
+            'emoji': '🔵',
+            'precio': precio,
+            'fiabilidad': fiabilidad_doble,
+            'patrones_vela': patrones_vela_actuales
+        })
+
+    if triple:
+        alertas.append({
+            'tipo': 'TRIPLE SUELO',
+            'emoji': '🟣',
+            'precio': precio,
+            'fiabilidad': fiabilidad_triple,
+            'patrones_vela': patrones_vela_actuales
+        })
+
+    if cambio_tendencia:
+        alertas.append({
+            'tipo': 'CAMBIO DE TENDENCIA ALCISTA',
+            'emoji': '🚀',
+            'precio': precio,
+            'fiabilidad': 75,
+            'patrones_vela': patrones_vela_actuales
+        })
+
+    return alertas
+
+# === SCHEDULER ===
+JOBS_DB = "jobs.db"
+
+def crear_scheduler(ruta=JOBS_DB):
+    """Scheduler con los trabajos persistidos en SQLite, para no perder las próximas ejecuciones al reiniciar.
+
+    coalesce junta en una sola las ejecuciones perdidas con el proceso parado y
+    misfire_grace_time=None las lanza por tarde que sea, así un reinicio ni
+    salta ni repite ejecuciones.
+    """
+    opciones = {'coalesce': True, 'misfire_grace_time': None, 'max_instances': 1}
+    try:
+        from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+        almacenes = {'default': SQLAlchemyJobStore(url=f"sqlite:///{ruta}")}
+    except ImportError:
+        print("SQLAlchemy no está instalado: los trabajos del scheduler solo se guardan en memoria")
+        almacenes = {}
+    return BackgroundScheduler(timezone=pytz.utc, jobstores=almacenes, job_defaults=opciones)
+
+scheduler = crear_scheduler()
+scheduler_started = False
+scheduler_cedido = False  # el dashboard pausó su scheduler porque las tareas las lleva worker.py
+
+# Dashboard y worker comparten jobs.db: solo uno de los dos debe programar y ejecutar las tareas.
+# worker.py renueva este fichero cada minuto y, mientras el latido sea reciente, el dashboard no programa.
+LATIDO_WORKER_FILE = "worker.latido"
+VIGENCIA_LATIDO = 180  # segundos
+
+def marcar_latido_worker():
+    with open(LATIDO_WORKER_FILE, "w") as f:
+        f.write(str(os.getpid()))
+
+def quitar_latido_worker():
+    try:
+        os.remove(LATIDO_WORKER_FILE)
+    except OSError:
+        pass
+
+def ceder_scheduler():
+    """Pausa el scheduler local (sin pararlo) para que las tareas de jobs.db las ejecute el worker.
+
+    programar_tareas_auto lo reanuda cuando el latido del worker caduca.
+    """
+    global scheduler_cedido
+    with lock_programacion:
+        if scheduler_started and not scheduler_cedido:
+            scheduler.pause()
+            scheduler_cedido = True
+            print("worker.py en marcha: el scheduler local queda en pausa")
+
+def worker_activo():
+    """True si worker.py ha dado señales de vida en los últimos VIGENCIA_LATIDO segundos."""
+    try:
+        return time.time() - os.path.getmtime(LATIDO_WORKER_FILE) < VIGENCIA_LATIDO
+    except OSError:
+        return False
+lock_programacion = threading.Lock()
+
+def minutos_por_ejecucion(timeframe, freq):
+    if timeframe == "1d":
+        return 1440 // freq  # 1440 minutos = 24 horas
+    if timeframe == "1w":
+        return 10080 // freq  # 10080 minutos = 7 días
+    return None
+
+def config_programacion(config_avanzada=None):
+    """(alinear_a_cierres, retraso_segundos) según la sección `programacion` de la configuración."""
+    if config_avanzada is None:
+        config_avanzada = analisis.config_avanzada_actual()
+    programacion = config_avanzada.get("programacion", {})
+    alinear = programacion.get("modo", "intervalo") == "cierre_vela"
+    return alinear, int(programacion.get("retraso_segundos", cierres_vela.RETRASO_POR_DEFECTO))
+
+def analizar_cierre_vela(timeframe, lista_symbols):
+    """Tarea del modo alineado: todos los pares de un timeframe en un único escaneo tras el cierre."""
+    try:
+        alertas_resumen, total_analizados, reporte = escanear_panel(lista_symbols, timeframe)
+        print(f"Cierre de vela {timeframe}: {escaner.formatear_reporte(reporte)}")
+
+        if alertas_resumen:
+            enviar_resumen_telegram(alertas_resumen, timeframe, f"CIERRE-{timeframe}")
+
+    except Exception as e:
+        print(f"Error en análisis de cierre {timeframe}: {e}")
+
+def tareas_deseadas(symbols):
+    """{id: (función, trigger, args)} que deberían estar programados según config_auto.json."""
+    cfg = cargar_auto_config()
+    alinear, retraso = config_programacion()
+    tareas = {}
+
+    # Modo alineado: un trabajo por timeframe con todos sus pares, justo después de cada cierre.
+    # La frecuencia configurada deja de aplicarse: la vela solo cambia de verdad al cerrar.
+    pares_por_cierre = {}
+
+    for symbol, tf_cfg in cfg.items():
+        if symbol not in symbols:
+            continue
+
+        for tf, valor in tf_cfg.items():
+            if alinear and tf in cierres_vela.TIMEFRAMES_ALINEADOS:
+                pares_por_cierre.setdefault(tf, []).append(symbol)
+                continue
+            try:
+                if tf in ["1d", "1w"]:
+                    minutos = minutos_por_ejecucion(tf, int(valor))
+                    if minutos:
+                        tareas[f"auto_{symbol}_{tf}"] = (analizar_simbolo_auto, IntervalTrigger(minutes=minutos), [symbol, tf])
+                else:
+                    # Para mensual y anual
+                    if isinstance(valor, dict):
+                        unidad, veces = list(valor.items())[0]
+                        if tf == "1M":
+                            if unidad == "por_dia":
+                                trigger = CronTrigger(hour=f"*/{24//veces}")
+                            elif unidad == "por_semana":
+                                dias_semana = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"][:veces]
+                                trigger = CronTrigger(day_of_week=",".join(dias_semana), hour="8")
+                            elif unidad == "por_2semanas":
+                                trigger = CronTrigger(day="1,15", hour="8")
+                            elif unidad == "por_3semanas":
+                                trigger = CronTrigger(day="1,10,20", hour="8")
+                            elif unidad == "por_mes":
+                                trigger = CronTrigger(day="1", hour="8")
+                            else:
+                                trigger = CronTrigger(day="1", hour="8")
+                        elif tf == "1y":
+                            # Para anual, ejecutar X veces al mes
+                            dias_mes = list(range(1, 32, 32//veces))[:veces]
+                            trigger = CronTrigger(day=",".join(map(str, dias_mes)), hour="8")
+                        else:
+                            continue
+
+                        tareas[f"auto_{symbol}_{tf}"] = (analizar_simbolo_auto, trigger, [symbol, tf])
+            except Exception as e:
+                print(f"Error programando {symbol} {tf}: {e}")
+
+    for tf, pares in pares_por_cierre.items():
+        tareas[f"cierre_{tf}"] = (analizar_cierre_vela, cierres_vela.DisparadorCierreVela(tf, retraso), [tf, sorted(pares)])
+
+    # Análisis masivo diario: tras el cierre de la vela diaria o, sin alinear, a las 08:00 UTC
+    tareas["analisis_masivo_diario"] = (
+        analisis_masivo_diario,
+        cierres_vela.DisparadorCierreVela("1d", retraso) if alinear else CronTrigger(hour=8, minute=0),
+        []
+    )
+
+    # Limpieza diaria del historial de alertas
+    tareas["compactar_historial"] = (compactar_historial, CronTrigger(hour=3, minute=0), [])
+
+    # Relleno del historial de velas, después de la limpieza
+    if relleno_historico.config_relleno(analisis.config_avanzada_actual())["activo"]:
+        tareas["relleno_historico"] = (rellenar_historico, CronTrigger(hour=4, minute=0), [])
+    return tareas
+
+def programar_tareas_auto(symbols):
+    """Reconcilia los trabajos del scheduler con la configuración en vez de rehacerlos todos.
+
+    Solo se añaden, reprograman o quitan los que difieren; el resto conserva su
+    próxima ejecución, también tras reiniciar gracias al almacén en SQLite.
+    Devuelve el número de trabajos añadidos, modificados y eliminados.
+    """
+    global scheduler_started, scheduler_cedido
+    with lock_programacion:
+        if not scheduler_started:
+            # En pausa: las ejecuciones atrasadas del almacén esperan a que la configuración esté al día
+            scheduler.start(paused=True)
+            scheduler_started = True
+
+        deseadas = tareas_deseadas(symbols)
+        actuales = {job.id: job for job in scheduler.get_jobs()}
+        cambios = {'añadidas': 0, 'modificadas': 0, 'eliminadas': 0}
+
+        for id_tarea in actuales.keys() - deseadas.keys():
+            scheduler.remove_job(id_tarea)
+            cambios['eliminadas'] += 1
+
+        for id_tarea, (funcion, trigger, args) in deseadas.items():
+            job = actuales.get(id_tarea)
+            try:
+                if job is None:
+                    scheduler.add_job(funcion, trigger=trigger, args=args, id=id_tarea)
+                    cambios['añadidas'] += 1
+                    continue
+                # Los triggers no se comparan por igualdad; su texto recoge todos sus parámetros
+                distinto = False
+                if str(job.trigger) != str(trigger):
+                    scheduler.reschedule_job(id_tarea, trigger=trigger)
+                    distinto = True
+                if job.func_ref != obj_to_ref(funcion) or list(job.args) != list(args):
+                    scheduler.modify_job(id_tarea, func=funcion, args=args)
+                    distinto = True
+                cambios['modificadas'] += distinto
+            except Exception as e:
+                print(f"Error programando {id_tarea}: {e}")
+
+        scheduler.resume()
+        scheduler_cedido = False
+    if any(cambios.values()):
+        print(f"Scheduler reconciliado: {cambios['añadidas']} añadidas, {cambios['modificadas']} modificadas, "
+              f"{cambios['eliminadas']} eliminadas")
+    return cambios
+
+
+# === EXCHANGE Y SÍMBOLOS ===
+# El ritmo lo marca el limitador global, no el de cada instancia de ccxt
+exchange = ccxt.poloniex({'enableRateLimit': False})
+
+def crear_limitador(config_avanzada=None):
+    """Limitador adaptativo hasta el rateLimit de ccxt y `max_descargas_simultaneas` peticiones en vuelo."""
+    if config_avanzada is None:
+        config_avanzada = analisis.config_avanzada_actual()
+    return control_tasa.LimitadorAdaptativo(
+        tasa_maxima=1000 / exchange.rateLimit if exchange.rateLimit else control_tasa.TASA_SIN_LIMITE,
+        concurrencia_maxima=config_avanzada.get("rendimiento", {}).get("max_descargas_simultaneas", 20)
+    )
+
+# Un único limitador para todas las llamadas al exchange (dashboard, scheduler y escaneos)
+limitador = crear_limitador()
+
+def obtener_almacen():
+    """Velas persistidas en disco, compartidas por el dashboard y el scheduler."""
+    global almacen
+    with lock_recursos:
+        if almacen is None:
+            almacen = almacen_velas.AlmacenVelas()
+        return almacen
+
+symbols = []
+
+def cargar_simbolos():
+    global symbols
+    with limitador.turno(control_tasa.INTERACTIVA):
+        markets = exchange.load_markets()
+    symbols = list(markets.keys())
+    return symbols
+
+# === FUNCIONES DE ANÁLISIS ===
+def get_ohlcv_data(symbol, timeframe, prioridad=control_tasa.PROGRAMADA):
+    config_avanzada = analisis.config_avanzada_actual()
+    config_remuestreo = remuestreo.config_remuestreo(config_avanzada)
+    # Se descargan como mucho 250 velas nuevas, pero se leen de disco todas las que pide el análisis
+    lectura = relleno_historico.config_relleno(config_avanzada)["velas_analisis"]
+
+    try:
+        # Si otro hilo o un escaneo masivo ya está descargando esa serie, actualizar_velas espera
+        # a esa petición (vuelo único) y luego lee de disco
+        with metricas.medir('fetch_ohlcv'):
+            return almacen_velas.actualizar_velas(
+                exchange, obtener_almacen(), symbol, timeframe, limit=250,
+                config_remuestreo=config_remuestreo, turno=lambda: limitador.turno(prioridad), lectura=lectura
+            )
+    except Exception as e:
+        metricas.contar('descargas_fallidas_total', timeframe=timeframe)
+        print(f"Error obteniendo datos para {symbol}: {e}")
+        return None
+
+def analizar_simbolo_auto(symbol, timeframe):
+    """Función para análisis automático desde el scheduler"""
+    try:
+        alertas_resumen = {}
+        resultado = analizar_simbolo_cacheado(symbol, timeframe, alertas_resumen)
+
+        if alertas_resumen:
+            enviar_resumen_telegram(alertas_resumen, timeframe, f"AUTO-{timeframe}")
+
+    except Exception as e:
+        print(f"Error en análisis automático de {symbol} {timeframe}: {e}")
+
+def escanear_simbolos(lista_symbols, timeframe, progreso=None, config_avanzada=None, prioridad=control_tasa.FONDO):
+    """Descarga en bloque las velas de todos los pares y luego los analiza en paralelo"""
+    if config_avanzada is None:
+        config_avanzada = analisis.config_avanzada_actual()
+    datos = descarga_async.descargar_ohlcv_masivo(
+        [(symbol, timeframe) for symbol in lista_symbols],
+        max_en_vuelo=config_avanzada.get("rendimiento", {}).get("max_descargas_simultaneas", 20),
+        almacen=obtener_almacen(),
+        limitador=limitador,
+        prioridad=prioridad,
+        config_remuestreo=remuestreo.config_remuestreo(config_avanzada),
+        lectura=relleno_historico.config_relleno(config_avanzada)["velas_analisis"]
+    )
+
+    procesos = escaner.procesos_configurados(config_avanzada)
+    if procesos:
+        try:
+            return escaner_procesos.escanear_en_procesos(
+                {symbol: datos.get((symbol, timeframe)) for symbol in lista_symbols},
+                timeframe, config_avanzada, procesos, progreso=progreso
+            )
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            escaner_procesos.cerrar_pool()
+            print(f"Pool de procesos no disponible ({e}), análisis con hilos")
+
+    def analizar_descargado(symbol, tf, alertas_resumen):
+        df = datos.get((symbol, tf))
+        if df is None:
+            return None
+        return analizar_simbolo(symbol, tf, alertas_resumen, df=df, config_avanzada=config_avanzada)
+
+    return escaner.escanear_pares(
+        lista_symbols, timeframe, analizar_descargado,
+        max_hilos=escaner.hilos_configurados(config_avanzada),
+        progreso=progreso
+    )
+
+# Pares que fallaron o devolvieron pocas velas; la caducidad sale de filtro_liquidez.horas_cache_negativa
+cache_negativa = filtro_liquidez.CacheNegativa()
+
+def preseleccionar_pares(lista_symbols, timeframe, config_avanzada=None):
+    """Pares que merece la pena descargar según una sola llamada a fetch_tickers y la caché negativa."""
+    if config_avanzada is None:
+        config_avanzada = analisis.config_avanzada_actual()
+    config = filtro_liquidez.config_filtro(config_avanzada)
+    if not config["activo"]:
+        return list(lista_symbols)
+    cache_negativa.segundos = config["horas_cache_negativa"] * 3600
+
+    tickers = None
+    try:
+        with metricas.medir('fetch_tickers'), limitador.turno(control_tasa.FONDO):
+            tickers = exchange.fetch_tickers()
+    except Exception as e:
+        print(f"Error obteniendo tickers, solo se aplica la caché negativa: {e}")
+
+    supervivientes, descartes = filtro_liquidez.preseleccionar(lista_symbols, timeframe, tickers, cache_negativa, config)
+    for motivo, cantidad in descartes.items():
+        metricas.contar('pares_descartados_total', cantidad, motivo=motivo)
+    print(filtro_liquidez.formatear_descartes(len(lista_symbols), supervivientes, descartes))
+    return supervivientes
+
+def escanear_panel(lista_symbols, timeframe, config_avanzada=None):
+    """Como escanear_simbolos, pero analiza todos los pares juntos sobre un panel de mercado.
+
+    En vez de un DataFrame y una cadena de llamadas por par, las velas
+    descargadas se apilan en un PanelMercado y las señales salen de unas
+    pocas operaciones vectorizadas. Devuelve (alertas_resumen, total_analizados, reporte).
+    """
+    if config_avanzada is None:
+        config_avanzada = analisis.config_avanzada_actual()
+    inicio = time.perf_counter()
+    datos = descarga_async.descargar_ohlcv_masivo(
+        [(symbol, timeframe) for symbol in lista_symbols],
+        max_en_vuelo=config_avanzada.get("rendimiento", {}).get("max_descargas_simultaneas", 20),
+        almacen=obtener_almacen(),
+        limitador=limitador,
+        config_remuestreo=remuestreo.config_remuestreo(config_avanzada),
+        lectura=relleno_historico.config_relleno(config_avanzada)["velas_analisis"]
+    )
+    segundos_descarga = time.perf_counter() - inicio
+    metricas.observar('etapa_segundos', segundos_descarga, etapa='descarga_masiva')
+
+    # Los pares que fallan o no tienen velas suficientes se saltan en los próximos escaneos
+    for (symbol, tf), df in datos.items():
+        if df is None:
+            cache_negativa.marcar(symbol, tf, "error")
+        elif len(df) < panel.MIN_VELAS:
+            cache_negativa.marcar(symbol, tf, "pocas_velas")
+
+    inicio = time.perf_counter()
+    mercado = panel.PanelMercado.desde_dataframes({symbol: df for (symbol, _), df in datos.items()}, timeframe)
+    resultado = panel.analizar_panel(mercado, config_avanzada)
+
+    alertas_resumen = {}
+    for fila, symbol in enumerate(mercado.symbols):
+        if not resultado['analizado'][fila]:
+            continue
+        patrones_vela_actuales = patrones_desde_valores(
+            {patron: valores[fila] for patron, valores in resultado['patrones'].items()}
+        )
+        alertas = generar_alertas(
+            resultado['precio'][fila],
+            bool(resultado['doble'][fila]),
+            bool(resultado['triple'][fila]),
+            analisis.nivel_fiabilidad(resultado['fiabilidad_doble'][fila]),
+            analisis.nivel_fiabilidad(resultado['fiabilidad_triple'][fila]),
+            bool(resultado['cruce_ema'][fila] and resultado['macd_alcista'][fila] and resultado['patron_reversion'][fila]),
+            patrones_vela_actuales
+        )
+        if alertas:
+            alertas_resumen[symbol] = alertas
+    segundos_calculo = time.perf_counter() - inicio
+    for fase, segundos in resultado['segundos'].items():
+        metricas.observar('etapa_segundos', segundos, etapa=f'panel_{fase}')
+    metricas.contar('pares_analizados_total', int(resultado['analizado'].sum()), timeframe=timeframe)
+
+    pares = len(lista_symbols)
+    duracion = segundos_descarga + segundos_calculo
+    reporte = {
+        'pares': pares,
+        'hilos': 1,
+        'duracion': duracion,
+        'pares_por_segundo': pares / duracion if duracion > 0 else 0.0,
+        'descarga': segundos_descarga,
+        'calculo': segundos_calculo,
+        'fases': resultado['segundos']
+    }
+    return alertas_resumen, int(resultado['analizado'].sum()), reporte
+
+@metricas.cronometrado('analisis_masivo_diario')
+def analisis_masivo_diario():
+    """Análisis masivo diario de todas las monedas"""
+    try:
+        alertas_resumen, total_analizados, reporte = escanear_panel(preseleccionar_pares(symbols, "1d"), "1d")
+        print(f"Análisis masivo diario: {escaner.formatear_reporte(reporte)}")
+
+        if alertas_resumen:
+            mensaje_extra = f"\n📊 Total analizados: {total_analizados} pares"
+            enviar_resumen_telegram(alertas_resumen, "1d", "MASIVO-DIARIO", mensaje_extra)
+
+    except Exception as e:
+        print(f"Error en análisis masivo diario: {e}")
+
+@metricas.cronometrado('relleno_historico')
+def rellenar_historico(lista_symbols=None, config_avanzada=None):
+    """Amplía hacia atrás y tapa huecos en las series base del almacén (relleno_historico)."""
+    if config_avanzada is None:
+        config_avanzada = analisis.config_avanzada_actual()
+    config = relleno_historico.config_relleno(config_avanzada)
+    if lista_symbols is None:
+        if config["todos_los_pares"]:
+            lista_symbols = preseleccionar_pares(symbols, "1d", config_avanzada)
+        else:
+            lista_symbols = [symbol for symbol in cargar_auto_config() if symbol in symbols]
+    pares = [(symbol, tf) for symbol in lista_symbols for tf in config["timeframes"]]
+    try:
+        resumenes = relleno_historico.rellenar_masivo(
+            pares, obtener_almacen(), config, limitador=limitador,
+            max_en_vuelo=config_avanzada.get("rendimiento", {}).get("max_descargas_simultaneas", 20)
+        )
+    except Exception as e:
+        print(f"Error rellenando el historial: {e}")
+        return {}
+    metricas.contar('velas_rellenadas_total', sum(r['velas'] for r in resumenes.values()))
+    print(relleno_historico.formatear_resumen(resumenes))
+    return resumenes
+
+@metricas.cronometrado('analizar_simbolo')
+def analizar_simbolo(symbol, timeframe, alertas_resumen, df=None, config_avanzada=None, persistir=True):
+    """Analiza un par sin efectos de interfaz; sin `config_avanzada` usa la guardada en disco.
+
+    Con persistir=False los indicadores se calculan sin leer ni guardar su
+    estado en el almacén (procesos de escaner_procesos).
+    """
+    try:
+        if df is None:
+            df = get_ohlcv_data(symbol, timeframe)
+        if df is None or len(df) < 20:
+            metricas.contar('analisis_total', resultado='sin_datos')
+            return None
+
+        # Indicadores básicos, incrementales sobre el estado guardado en el almacén.
+        # Van antes de las mejoras para que divergencias y fiabilidad vean el RSI y el MACD.
+        with metricas.medir('indicadores'):
+            df = indicadores.actualizar_indicadores(df, obtener_almacen() if persistir else None, symbol, timeframe)
+
+        # Aplicar mejoras (indicadores, patrones, suelos y puntaje)
+        mejoras = None
+        try:
+            if config_avanzada is None:
+                config_avanzada = analisis.config_avanzada_actual()
+            mejoras = analisis.calcular_mejoras(df, config_avanzada)
+            if mejoras:
+                df = mejoras['df']
+                patrones_suelo = mejoras['patrones_suelo']
+                patrones_vela = mejoras['patrones_vela']
+                fiabilidad_doble_suelo = mejoras.get('fiabilidad_doble_suelo', 0)
+                fiabilidad_triple_suelo = mejoras.get('fiabilidad_triple_suelo', 0)
+            else:
+                patrones_suelo = {}
+                patrones_vela = {}
+                fiabilidad_doble_suelo = 0
+                fiabilidad_triple_suelo = 0
+        except Exception as e:
+            print(f"Error aplicando mejoras: {e}")
+            patrones_suelo = {}
+            patrones_vela = {}
+            fiabilidad_doble_suelo = 0
+            fiabilidad_triple_suelo = 0
+
+        # Patrones de vela básicos (normalmente ya calculados por las mejoras)
+        faltantes = [p for p in ('hammer', 'engulfing') if p not in df.columns]
+        if faltantes:
+            with metricas.medir('patrones_vela_basicos'):
+                valores = calcular_patrones(
+                    df['open'].values, df['high'].values, df['low'].values, df['close'].values, patrones=faltantes
+                )
+                for patron, serie in valores.items():
+                    df[patron] = serie
+
+        with metricas.medir('senales'):
+            ultimo = df.iloc[-1]
+            penultimo = df.iloc[-2] if len(df) > 1 else ultimo
+
+            # Análisis de señales
+            cruce_ema = (penultimo['ema50'] < penultimo['ema200']) and (ultimo['ema50'] > ultimo['ema200'])
+            macd_alcista = (ultimo['macd'] > ultimo['macd_signal'])
+            patron_reversion = (ultimo['hammer'] != 0) or (ultimo['engulfing'] == 100)
+
+            # Obtener patrones de vela actuales
+            patrones_vela_actuales = obtener_patrones_vela(df)
+
+            # Generar alertas
+            alertas = generar_alertas(
+                ultimo['close'],
+                patrones_suelo.get('doble', False),
+                patrones_suelo.get('triple', False),
+                fiabilidad_doble_suelo,
+                fiabilidad_triple_suelo,
+                cruce_ema and macd_alcista and patron_reversion,
+                patrones_vela_actuales
+            )
+        if alertas:
+            alertas_resumen[symbol] = alertas
+        metricas.contar('analisis_total', resultado='ok')
+
+        return {
+            'symbol': symbol,
+            'precio': ultimo['close'],
+            'cruce_ema': cruce_ema,
+            'macd_alcista': macd_alcista,
+            'patron_reversion': patron_reversion,
+            'doble_suelo': patrones_suelo.get('doble', False),
+            'triple_suelo': patrones_suelo.get('triple', False),
+            'patrones_vela': patrones_vela_actuales,
+            'fiabilidad_doble_suelo': fiabilidad_doble_suelo,
+            'fiabilidad_triple_suelo': fiabilidad_triple_suelo,
+            'divergencias': mejoras.get('divergencias', {}) if mejoras else {},
+            'puntaje_total': mejoras.get('puntaje_total', 0) if mejoras else 0,
+            'mejoras': mejoras,
+            'df': df
+        }
+
+    except Exception as e:
+        metricas.contar('analisis_total', resultado='error')
+        print(f"Error analizando {symbol}: {e}")
+        return None
+
+# Resultados del autoanálisis: 1w y 1M se analizan varias veces al día con la misma vela cerrada
+CAPACIDAD_CACHE_RESULTADOS = 256
+resultados_cacheados = cache_analisis.CacheResultados(CAPACIDAD_CACHE_RESULTADOS)
+
+def analizar_simbolo_cacheado(symbol, timeframe, alertas_resumen, df=None, config_avanzada=None):
+    """analizar_simbolo con memoización.
+
+    La huella es (par, timeframe, última vela cerrada, número de velas y hash
+    de config_avanzada + config_suelos del par). Mientras no cambie se
+    devuelve el resultado anterior y se repiten sus alertas, sin recalcular
+    indicadores ni patrones aunque la vela abierta se haya movido; solo el
+    precio se toma del último cierre.
+    """
+    if df is None:
+        # Una sola descarga: el mismo df sirve para la huella y para analizar_simbolo
+        df = get_ohlcv_data(symbol, timeframe)
+        if df is None:
+            metricas.contar('analisis_total', resultado='sin_datos')
+            return None
+    velas = cache_analisis.huella_velas(df)
+    if velas is None:
+        return analizar_simbolo(symbol, timeframe, alertas_resumen, df=df, config_avanzada=config_avanzada)
+    if config_avanzada is None:
+        config_avanzada = analisis.config_avanzada_actual()
+
+    clave = (symbol, timeframe) + velas + (
+        cache_analisis.huella_config(config_avanzada, config_suelos.get(symbol)),
+    )
+    guardado = resultados_cacheados.obtener(clave)
+    if guardado is None:
+        alertas_locales = {}
+        resultado = analizar_simbolo(symbol, timeframe, alertas_locales, df=df, config_avanzada=config_avanzada)
+        guardado = (resultado, alertas_locales.get(symbol))
+        resultados_cacheados.guardar(clave, guardado)
+        resultado, alertas = guardado
+    else:
+        # Las señales son las de la vela cerrada, pero el precio es el de la vela abierta actual
+        resultado, alertas = guardado
+        precio = df['close'].iloc[-1]
+        if resultado is not None:
+            resultado = dict(resultado, precio=precio)
+        if alertas:
+            alertas = [dict(alerta, precio=precio) for alerta in alertas]
+
+    if alertas:
+        alertas_resumen[symbol] = list(alertas)
+    return resultado
+
+# === MÉTRICAS ===
+# La cola de Telegram y la caché ya llevan sus contadores; se exportan junto a los de las etapas
+metricas.registrar_fuente('telegram', lambda: dict(obtener_cola_telegram().metricas, pendientes=obtener_cola_telegram().pendientes()))
+metricas.registrar_fuente('cache_resultados', lambda: dict(resultados_cacheados.metricas, entradas=len(resultados_cacheados)))
+metricas.registrar_fuente('cache_negativa', lambda: dict(cache_negativa.metricas, entradas=len(cache_negativa)))
+metricas.registrar_fuente('limitador', lambda: limitador.estado())
+metricas.registrar_fuente('descargas', lambda: dict(vuelo_unico.descargas.metricas, en_vuelo=vuelo_unico.descargas.en_vuelo()))
+
+def iniciar_metricas(config_avanzada=None):
+    """Activa la instrumentación y el endpoint /metrics si la sección `metricas` lo pide."""
+    if config_avanzada is None:
+        config_avanzada = analisis.config_avanzada_actual()
+    config_metricas = config_avanzada.get("metricas", {})
+    metricas.activar(config_metricas.get("activas", False))
+    if metricas.activas() and config_metricas.get("exportar_http", True):
+        metricas.iniciar_servidor(int(config_metricas.get("puerto", metricas.PUERTO_POR_DEFECTO)))
+    return metricas.activas()
+
+def enviar_resumen_telegram(alertas_resumen, timeframe, tipo_analisis="MANUAL", mensaje_extra=""):
+    if not alertas_resumen:
+        return
+
+    mensaje = f"🔍 RESUMEN DE ANÁLISIS {tipo_analisis}\n"
+    mensaje += f"⏰ Timeframe: {timeframe}\n"
+    mensaje += f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} UTC\n"
+    mensaje += f"🎯 Señales encontradas: {len(alertas_resumen)}\n\n"
+
+    for symbol, alertas in alertas_resumen.items():
+        for alerta in alertas:
+            mensaje += f"{alerta['emoji']} **{symbol}**\n"
+            mensaje += f"   📊 {alerta['tipo']}\n"
+            mensaje += f"   💰 Precio: {alerta['precio']:.8f}\n"
+
+            if 'fiabilidad' in alerta and isinstance(alerta['fiabilidad'], (int, float)) and alerta['fiabilidad'] > 0:
+                mensaje += f"   🎯 Fiabilidad: {alerta['fiabilidad']}%\n"
+
+            if alerta.get('patrones_vela'):
+                patrones_txt = " | ".join([p['nombre'] for p in alerta['patrones_vela']])
+                mensaje += f"   🕯️ Velas: {patrones_txt}\n"
+
+            mensaje += "\n"
+
+    if mensaje_extra:
+        mensaje += mensaje_extra
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    send_telegram_alert(mensaje, f"RESUMEN_{tipo_analisis}", timestamp, "analisis_resumen")
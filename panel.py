@@ -0,0 +1,177 @@
+# panel.py
+# Panel de mercado: todos los pares × tiempo × OHLCV en un único array alineado por fecha,
+# con máscara de validez para los pares que empezaron a cotizar (o dejaron de hacerlo) en
+# fechas distintas. analizar_panel calcula indicadores, patrones, suelos, divergencias y
+# puntaje de todo el mercado en unas pocas llamadas vectorizadas.
+
+import time
+import numpy as np
+import analisis
+import indicadores
+import patrones_vela
+
+CAMPOS = ['open', 'high', 'low', 'close', 'volume']
+MIN_VELAS = 20  # igual que analizar_simbolo: con menos velas el par no se analiza
+
+
+class PanelMercado:
+    """Velas de muchos pares en `datos[par, vela, campo]` con NaN donde el par no tiene vela."""
+
+    def __init__(self, symbols, timeframe, tiempos, datos, valido):
+        self.symbols = list(symbols)
+        self.timeframe = timeframe
+        self.tiempos = tiempos  # int64 en ms, común a todos los pares
+        self.datos = datos
+        self.valido = valido
+
+    @classmethod
+    def desde_dataframes(cls, dataframes, timeframe):
+        """Construye el panel a partir de {symbol: DataFrame OHLCV} (los None se ignoran)."""
+        symbols = [symbol for symbol, df in dataframes.items() if df is not None and len(df)]
+        tiempos_par = [
+            dataframes[symbol]['timestamp'].values.astype('datetime64[ms]').astype(np.int64) for symbol in symbols
+        ]
+        tiempos = np.unique(np.concatenate(tiempos_par)) if tiempos_par else np.zeros(0, dtype=np.int64)
+
+        datos = np.full((len(symbols), len(tiempos), len(CAMPOS)), np.nan)
+        valido = np.zeros((len(symbols), len(tiempos)), dtype=bool)
+        for fila, symbol in enumerate(symbols):
+            columnas = np.searchsorted(tiempos, tiempos_par[fila])
+            # Columna a columna: df[CAMPOS].to_numpy() cuesta el triple con cientos de pares
+            for k, campo in enumerate(CAMPOS):
+                datos[fila, columnas, k] = dataframes[symbol][campo].values
+            valido[fila, columnas] = True
+        return cls(symbols, timeframe, tiempos, datos, valido)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def campo(self, nombre):
+        return self.datos[:, :, CAMPOS.index(nombre)]
+
+    def velas_por_par(self):
+        return self.valido.sum(axis=1)
+
+    def alinear_derecha(self):
+        """Velas de cada par juntas al final de su fila (la última columna es su última vela).
+
+        Así las ventanas "últimas N velas" de cada par caen en las mismas
+        columnas aunque un par tenga huecos o esté desactualizado. Devuelve
+        (datos, valido) con el ancho del par con más velas.
+        """
+        orden = self._orden_derecha()
+        datos = np.take_along_axis(self.datos, orden[:, :, None], axis=1)
+        valido = np.take_along_axis(self.valido, orden, axis=1)
+        return datos, valido
+
+    def tiempos_alineados(self):
+        """Timestamp (ms) de cada celda de alinear_derecha(); -1 en los huecos."""
+        tiempos = np.where(self.valido, self.tiempos[None, :], -1)
+        return np.take_along_axis(tiempos, self._orden_derecha(), axis=1)
+
+    def _orden_derecha(self):
+        # argsort estable de la máscara: primero los huecos y luego las velas en su orden
+        orden = np.argsort(self.valido, axis=1, kind='stable')
+        ancho = int(self.velas_por_par().max()) if len(self) else 0
+        return orden[:, orden.shape[1] - ancho:]
+
+
+def analizar_panel(panel, config):
+    """Las señales de analizar_simbolo para todos los pares del panel a la vez.
+
+    Devuelve un dict de arrays con una posición por par: 'analizado' (tiene al
+    menos MIN_VELAS velas), 'precio', 'cruce_ema', 'macd_alcista',
+    'patron_reversion', 'doble', 'triple', 'fiabilidad_doble',
+    'fiabilidad_triple' (0 a 1), 'divergencia_rsi', 'divergencia_macd'
+    (1 alcista, -1 bajista, 0 nada), 'puntaje', 'patrones' ({patron: valor en
+    la última vela}) y 'segundos' (tiempo de CPU de cada fase).
+    """
+    segundos = {}
+    inicio = time.perf_counter()
+    datos, valido = panel.alinear_derecha()
+    apertura, alto, bajo, cierre, volumen = (datos[:, :, k] for k in range(len(CAMPOS)))
+    analizado = valido.sum(axis=1) >= MIN_VELAS
+    segundos['alinear'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    valores = indicadores.calcular_indicadores_lote(cierre)
+    segundos['indicadores'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    opcionales = patrones_vela.patrones_habilitados(config)
+    patrones = patrones_vela.calcular_patrones(
+        apertura, alto, bajo, cierre,
+        patrones=['hammer', 'engulfing'] + opcionales,
+        ultimas=config.get("rendimiento", {}).get("velas_patrones")
+    )
+    ultimos_patrones = {patron: serie[:, -1] for patron, serie in patrones.items()}
+    segundos['patrones'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    filtros = config["filtros"]
+    ventana = analisis.ventana_suelos(config)
+    suelos = analisis.detectar_suelos_lote(
+        cierre[:, -ventana:], filtros["tolerancia_patrones"], filtros["min_velas_patron"],
+        volumen[:, -ventana:], filtros["volumen_minimo"]
+    )
+    segundos['suelos'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    divergencia_rsi = analisis.detectar_divergencias_lote(cierre, valores['rsi'])['actual']
+    divergencia_macd = analisis.detectar_divergencias_lote(cierre, valores['macd'])['actual']
+    segundos['divergencias'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    ema50, ema200 = valores['ema50'], valores['ema200']
+    with np.errstate(invalid='ignore'):
+        cruce_ema = (ema50[:, -2] < ema200[:, -2]) & (ema50[:, -1] > ema200[:, -1])
+        macd_alcista = valores['macd'][:, -1] > valores['macd_signal'][:, -1]
+        patron_reversion = (ultimos_patrones['hammer'] != 0) | (ultimos_patrones['engulfing'] == 100)
+
+        # Volumen frente a la media de las últimas 10 velas (validar_con_volumen / evaluar_fiabilidad_senal)
+        vol_promedio = volumen[:, -10:].mean(axis=1)
+        volumen_elevado = volumen[:, -1] >= vol_promedio * analisis.multiplicador_volumen(config)
+        volumen_fuerte = volumen[:, -1] > vol_promedio * 1.5
+        sobreventa = valores['rsi'][:, -1] < 30
+
+    # Solo cuentan los patrones opcionales activados, igual que en calcular_mejoras
+    confirmaciones = sum(
+        (ultimos_patrones[p] != 0).astype(int) for p in analisis.PATRONES_CONFIRMACION if p in opcionales
+    )
+    fiabilidades = {}
+    for tipo, base in (('doble', 0.6), ('triple', 0.7)):
+        fiabilidad = np.full(len(panel), base)
+        fiabilidad = np.where(volumen_fuerte, fiabilidad + 0.1, fiabilidad)
+        fiabilidad = np.where(sobreventa, fiabilidad + 0.1, fiabilidad)
+        for p in analisis.PATRONES_CONFIRMACION:
+            if p in opcionales:
+                fiabilidad = np.where(ultimos_patrones[p] != 0, fiabilidad + 0.05, fiabilidad)
+        fiabilidades[tipo] = np.clip(fiabilidad, 0, 1)
+
+    pesos = analisis.pesos_puntaje(config)
+    puntaje = (
+        suelos['doble'] * pesos['doble']
+        + suelos['triple'] * pesos['triple']
+        + (divergencia_rsi == 1) * pesos['divergencia_rsi']
+        + (divergencia_macd == 1) * pesos['divergencia_macd']
+        + volumen_elevado * pesos['volumen']
+        + confirmaciones * pesos['patron_vela']
+    )
+    segundos['senales'] = time.perf_counter() - inicio
+
+    return {
+        'analizado': analizado,
+        'precio': cierre[:, -1],
+        'cruce_ema': cruce_ema,
+        'macd_alcista': macd_alcista,
+        'patron_reversion': patron_reversion,
+        'doble': suelos['doble'],
+        'triple': suelos['triple'],
+        'fiabilidad_doble': fiabilidades['doble'],
+        'fiabilidad_triple': fiabilidades['triple'],
+        'divergencia_rsi': divergencia_rsi,
+        'divergencia_macd': divergencia_macd,
+        'puntaje': np.minimum(puntaje, 100),
+        'patrones': ultimos_patrones,
+        'segundos': segundos
+    }
@@ -0,0 +1,185 @@
+# patrones_vela.py
+# Motor de patrones de vela en una sola pasada, con las reglas y umbrales por defecto de TA-Lib.
+# Los valores siguen la convención de ta.cdl_pattern: 100 alcista, -100 bajista, ±80 sin confirmar, 0 nada.
+
+import time
+import numpy as np
+
+# Nombre de columna -> nombre en TA-Lib / pandas_ta
+PATRONES_DISPONIBLES = {
+    'doji': 'doji',
+    'hammer': 'hammer',
+    'engulfing': 'engulfing',
+    'morning_star': 'morningstar',
+    'evening_star': 'eveningstar',
+    'harami': 'harami',
+    'shooting_star': 'shootingstar'
+}
+
+# Velas anteriores que necesita el patrón más largo (estrellas: 3 velas + promedio de 10)
+VELAS_PREVIAS = 12
+PENETRACION_ESTRELLAS = 0.3
+
+
+def _promedio_previo(valores, periodo):
+    """Media de las `periodo` velas anteriores a cada vela (sin incluirla), NaN si no hay suficientes."""
+    n = valores.shape[-1]
+    acumulado = np.cumsum(np.nan_to_num(valores), axis=-1)
+    acumulado = np.concatenate([np.zeros(valores.shape[:-1] + (1,)), acumulado], axis=-1)
+    promedio = np.full(valores.shape, np.nan)
+    if n > periodo:
+        promedio[..., periodo:] = (acumulado[..., periodo:n] - acumulado[..., :n - periodo]) / periodo
+    return promedio
+
+def _desplazar(valores, k):
+    """valores[i - k] alineado en la posición i (NaN al principio)."""
+    desplazado = np.full(valores.shape, np.nan)
+    if k < valores.shape[-1]:
+        desplazado[..., k:] = valores[..., :valores.shape[-1] - k]
+    return desplazado
+
+
+def calcular_patrones(apertura, alto, bajo, cierre, patrones=None, ultimas=None):
+    """Evalúa todos los `patrones` pedidos sobre los mismos arrays de cuerpo, mechas y rango.
+
+    Los arrays pueden ser 1-D o 2-D (una fila por símbolo, tiempo en el último
+    eje). Con `ultimas` solo se calculan esas velas finales (más las previas
+    que necesitan los promedios) y el resto queda a 0. Devuelve {patron: array}.
+    """
+    patrones = list(PATRONES_DISPONIBLES) if patrones is None else list(patrones)
+    apertura, alto, bajo, cierre = (np.asarray(x, dtype=float) for x in (apertura, alto, bajo, cierre))
+    n = cierre.shape[-1]
+    desde = 0
+    if ultimas is not None and n > ultimas + VELAS_PREVIAS:
+        desde = n - ultimas - VELAS_PREVIAS
+        apertura, alto, bajo, cierre = (x[..., desde:] for x in (apertura, alto, bajo, cierre))
+
+    # Geometría de cada vela, calculada una sola vez
+    cuerpo = np.abs(cierre - apertura)
+    rango = alto - bajo
+    cuerpo_max = np.maximum(apertura, cierre)
+    cuerpo_min = np.minimum(apertura, cierre)
+    mecha_sup = alto - cuerpo_max
+    mecha_inf = cuerpo_min - bajo
+    color = np.where(cierre >= apertura, 1, -1)
+
+    # Promedios de referencia (CandleSettings por defecto de TA-Lib)
+    cuerpo_prom = _promedio_previo(cuerpo, 10)
+    rango_prom10 = _promedio_previo(rango, 10)
+    rango_prom5 = _promedio_previo(rango, 5)
+
+    resultados = {}
+    with np.errstate(invalid='ignore'):
+        if 'doji' in patrones:
+            resultados['doji'] = np.where(cuerpo <= 0.1 * rango_prom10, 100.0, 0.0)
+
+        if 'hammer' in patrones or 'shooting_star' in patrones:
+            cuerpo_corto = cuerpo < cuerpo_prom
+            mecha_muy_corta_sup = mecha_sup < 0.1 * rango_prom10
+            mecha_muy_corta_inf = mecha_inf < 0.1 * rango_prom10
+            if 'hammer' in patrones:
+                # Cuerpo en o cerca del mínimo de la vela anterior
+                cerca_minimo = cuerpo_min <= _desplazar(bajo, 1) + 0.2 * _desplazar(rango_prom5, 1)
+                resultados['hammer'] = np.where(
+                    cuerpo_corto & (mecha_inf > cuerpo) & mecha_muy_corta_sup & cerca_minimo, 100.0, 0.0
+                )
+            if 'shooting_star' in patrones:
+                hueco_alcista = cuerpo_min > _desplazar(cuerpo_max, 1)
+                resultados['shooting_star'] = np.where(
+                    cuerpo_corto & (mecha_sup > cuerpo) & mecha_muy_corta_inf & hueco_alcista, -100.0, 0.0
+                )
+
+        if 'engulfing' in patrones:
+            apertura_1 = _desplazar(apertura, 1)
+            cierre_1 = _desplazar(cierre, 1)
+            color_1 = _desplazar(color.astype(float), 1)
+            blanca_envuelve = (color == 1) & (color_1 == -1) & (
+                ((cierre >= apertura_1) & (apertura < cierre_1)) | ((cierre > apertura_1) & (apertura <= cierre_1))
+            )
+            negra_envuelve = (color == -1) & (color_1 == 1) & (
+                ((apertura >= cierre_1) & (cierre < apertura_1)) | ((apertura > cierre_1) & (cierre <= apertura_1))
+            )
+            # TA-Lib solo da ±100 si ni la apertura ni el cierre coinciden con el cuerpo anterior
+            fuerza = np.where((apertura != cierre_1) & (cierre != apertura_1), 100.0, 80.0)
+            resultados['engulfing'] = np.where(blanca_envuelve | negra_envuelve, color * fuerza, 0.0)
+
+        if 'harami' in patrones:
+            larga_1 = _desplazar(cuerpo, 1) > _desplazar(cuerpo_prom, 1)
+            corta = cuerpo <= cuerpo_prom
+            max_1 = _desplazar(cuerpo_max, 1)
+            min_1 = _desplazar(cuerpo_min, 1)
+            color_1 = _desplazar(color.astype(float), 1)
+            dentro = (cuerpo_max < max_1) & (cuerpo_min > min_1)
+            dentro_justo = (cuerpo_max <= max_1) & (cuerpo_min >= min_1)
+            base = larga_1 & corta
+            resultados['harami'] = np.where(
+                base & dentro, -color_1 * 100.0, np.where(base & dentro_justo, -color_1 * 80.0, 0.0)
+            )
+
+        if 'morning_star' in patrones or 'evening_star' in patrones:
+            cuerpo_2 = _desplazar(cuerpo, 2)
+            larga_2 = cuerpo_2 > _desplazar(cuerpo_prom, 2)
+            corta_1 = _desplazar(cuerpo, 1) <= _desplazar(cuerpo_prom, 1)
+            tercera_no_corta = cuerpo > cuerpo_prom
+            color_2 = _desplazar(color.astype(float), 2)
+            cierre_2 = _desplazar(cierre, 2)
+            if 'morning_star' in patrones:
+                hueco_bajista = _desplazar(cuerpo_max, 1) < _desplazar(cuerpo_min, 2)
+                resultados['morning_star'] = np.where(
+                    larga_2 & (color_2 == -1) & corta_1 & hueco_bajista & tercera_no_corta & (color == 1)
+                    & (cierre > cierre_2 + cuerpo_2 * PENETRACION_ESTRELLAS), 100.0, 0.0
+                )
+            if 'evening_star' in patrones:
+                hueco_alcista = _desplazar(cuerpo_min, 1) > _desplazar(cuerpo_max, 2)
+                resultados['evening_star'] = np.where(
+                    larga_2 & (color_2 == 1) & corta_1 & hueco_alcista & tercera_no_corta & (color == -1)
+                    & (cierre < cierre_2 - cuerpo_2 * PENETRACION_ESTRELLAS), -100.0, 0.0
+                )
+
+    if desde:
+        for patron, valores in resultados.items():
+            completo = np.zeros(valores.shape[:-1] + (n,))
+            completo[..., desde:] = valores
+            # Las velas previas solo servían de contexto para los promedios
+            completo[..., :n - ultimas] = 0.0
+            resultados[patron] = completo
+    return {patron: resultados[patron] for patron in patrones if patron in resultados}
+
+def patrones_habilitados(config):
+    """Patrones opcionales activados en config["patrones_vela"]."""
+    return [patron for patron, activo in config.get("patrones_vela", {}).items() if activo and patron in PATRONES_DISPONIBLES]
+
+
+# === MEDICIÓN ===
+def medir_tiempos(tamanos=(250, 5000), repeticiones=20):
+    """Compara el motor con siete llamadas a ta.cdl_pattern (si pandas_ta está instalado)."""
+    import pandas as pd
+    from exchange_falso import generar_velas
+    resultados = {}
+    for tamano in tamanos:
+        df = pd.DataFrame(generar_velas("BTC/USDT", "1d", tamano), columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        fila = {}
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            calcular_patrones(df['open'].values, df['high'].values, df['low'].values, df['close'].values)
+        fila['motor_ms'] = (time.perf_counter() - inicio) / repeticiones * 1000
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            calcular_patrones(df['open'].values, df['high'].values, df['low'].values, df['close'].values, ultimas=1)
+        fila['motor_ultima_vela_ms'] = (time.perf_counter() - inicio) / repeticiones * 1000
+        try:
+            import pandas_ta as ta
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                for nombre in PATRONES_DISPONIBLES.values():
+                    ta.cdl_pattern(df['open'], df['high'], df['low'], df['close'], name=nombre)
+            fila['pandas_ta_ms'] = (time.perf_counter() - inicio) / repeticiones * 1000
+        except ImportError:
+            fila['pandas_ta_ms'] = None
+        resultados[tamano] = fila
+    return resultados
+
+
+if __name__ == "__main__":
+    for tamano, fila in medir_tiempos().items():
+        print(tamano, fila)
@@ -0,0 +1,172 @@
+# relleno_historico.py
+# Relleno del historial de velas en el almacén: pagina hacia atrás con since= en oleadas de páginas
+# paralelas bajo el limitador global, tapa los huecos y se reanuda tras una interrupción porque el
+# progreso son las propias velas guardadas. Así el análisis lee de disco todo el historial que
+# necesite (EMA200 bien calentada, 1w y 1M remuestreados con cientos de velas) sin más peticiones.
+
+import argparse
+import asyncio
+import time
+import control_tasa
+import descarga_async
+from almacen_velas import DURACION_TIMEFRAME_MS
+
+RELLENO_POR_DEFECTO = {
+    "activo": True,
+    "timeframes": ["4h", "1d"],  # series base de remuestreo (4h para 12h; 1d para 3d, 1w, 1M y 1y)
+    "dias_historia": 4000,       # hasta dónde ir hacia atrás
+    "paginas_en_paralelo": 4,    # páginas por oleada y par
+    "velas_analisis": 500,       # velas que lee de disco get_ohlcv_data
+    "todos_los_pares": False     # False: solo los pares de config_auto.json
+}
+LIMITE_PAGINA = 500  # velas por petición (el máximo de Poloniex)
+FACTOR_HUECO = 1.5   # separación entre velas, en duraciones, a partir de la cual hay un hueco
+
+
+def config_relleno(config_avanzada):
+    return {**RELLENO_POR_DEFECTO, **config_avanzada.get("relleno_historico", {})}
+
+def tramos(desde, hasta, duracion, limite=LIMITE_PAGINA):
+    """Páginas [inicio, fin) de como mucho `limite` velas que cubren [desde, hasta), de la más reciente a la más antigua."""
+    paginas = []
+    fin = hasta
+    while fin > desde:
+        inicio = max(desde, fin - limite * duracion)
+        paginas.append((inicio, fin))
+        fin = inicio
+    return paginas
+
+
+# === DESCARGA POR PÁGINAS ===
+async def _rellenar_tramo(exchange, semaforo, almacen, symbol, timeframe, inicio, fin, limitador, prioridad):
+    """Descarga una página y guarda las velas que caen en [inicio, fin); devuelve cuántas eran."""
+    ohlcv = await descarga_async.pedir_ohlcv(
+        exchange, semaforo, symbol, timeframe, since=int(inicio), limit=LIMITE_PAGINA,
+        limitador=limitador, prioridad=prioridad
+    )
+    ohlcv = [vela for vela in ohlcv if inicio <= vela[0] < fin]
+    almacen.guardar(symbol, timeframe, ohlcv)
+    return len(ohlcv)
+
+async def _oleada(exchange, semaforo, almacen, symbol, timeframe, paginas, limitador, prioridad):
+    resultados = await asyncio.gather(*[
+        _rellenar_tramo(exchange, semaforo, almacen, symbol, timeframe, inicio, fin, limitador, prioridad)
+        for inicio, fin in paginas
+    ], return_exceptions=True)
+    for resultado in resultados:
+        if isinstance(resultado, BaseException):
+            raise resultado
+    return resultados
+
+async def _velas_anteriores(exchange, semaforo, almacen, symbol, timeframe, desde, hasta, limitador, prioridad):
+    """Pide las velas desde `desde` sin acotar la página y guarda las anteriores a `hasta`; devuelve cuántas eran.
+
+    El exchange devuelve la primera vela que tenga a partir de `desde`, así
+    que si no llega ninguna antes de `hasta` es que no hay historia más antigua.
+    """
+    ohlcv = await descarga_async.pedir_ohlcv(
+        exchange, semaforo, symbol, timeframe, since=int(desde), limit=LIMITE_PAGINA,
+        limitador=limitador, prioridad=prioridad
+    )
+    ohlcv = [vela for vela in ohlcv if vela[0] < hasta]
+    almacen.guardar(symbol, timeframe, ohlcv)
+    return len(ohlcv)
+
+async def rellenar_par(exchange, semaforo, almacen, symbol, timeframe, config, limitador=None, prioridad=control_tasa.FONDO):
+    """Tapa los huecos y amplía hacia atrás la serie (symbol, timeframe) hasta `dias_historia`.
+
+    Las páginas hacia atrás van en oleadas de `paginas_en_paralelo`. Si la más
+    antigua de una oleada llega vacía se confirma con una petición desde el
+    inicio de la historia buscada: solo si tampoco hay velas anteriores el par
+    no cotizaba antes y se marca como completo; si las hay, la página vacía
+    era un hueco del exchange y se sigue hacia atrás. Un hueco que el exchange devuelve vacío se recuerda para
+    no volver a pedirlo. Devuelve {'velas', 'huecos', 'completo', 'error'}.
+    """
+    duracion = DURACION_TIMEFRAME_MS[timeframe]
+    resumen = {'velas': 0, 'huecos': 0, 'completo': False, 'error': None}
+    try:
+        for anterior, siguiente in almacen.huecos(symbol, timeframe, duracion * FACTOR_HUECO):
+            nuevas = await _oleada(exchange, semaforo, almacen, symbol, timeframe,
+                                   tramos(anterior + duracion, siguiente, duracion), limitador, prioridad)
+            resumen['velas'] += sum(nuevas)
+            resumen['huecos'] += 1
+            if not sum(nuevas):
+                almacen.marcar_hueco_vacio(symbol, timeframe, anterior, siguiente)
+
+        resumen['completo'] = almacen.historia_completa(symbol, timeframe)
+        if resumen['completo']:
+            return resumen
+        primero = almacen.primer_timestamp(symbol, timeframe)
+        if primero is None:
+            ohlcv = await descarga_async.pedir_ohlcv(exchange, semaforo, symbol, timeframe, limit=LIMITE_PAGINA,
+                                                    limitador=limitador, prioridad=prioridad)
+            almacen.guardar(symbol, timeframe, ohlcv)
+            resumen['velas'] += len(ohlcv)
+            primero = almacen.primer_timestamp(symbol, timeframe)
+            if primero is None:
+                return resumen
+
+        objetivo = int(time.time() * 1000) - config["dias_historia"] * 86400000
+        pendientes = tramos(objetivo, primero, duracion)
+        paralelo = max(1, int(config["paginas_en_paralelo"]))
+        while pendientes:
+            paginas, pendientes = pendientes[:paralelo], pendientes[paralelo:]
+            nuevas = await _oleada(exchange, semaforo, almacen, symbol, timeframe, paginas, limitador, prioridad)
+            resumen['velas'] += sum(nuevas)
+            if not nuevas[-1]:
+                # Las velas que aparezcan las vuelven a traer (y contar) las páginas pendientes
+                anteriores = await _velas_anteriores(exchange, semaforo, almacen, symbol, timeframe, objetivo,
+                                                     paginas[-1][1], limitador, prioridad)
+                if not anteriores:
+                    almacen.marcar_historia_completa(symbol, timeframe)
+                    resumen['completo'] = True
+                    break
+    except Exception as e:
+        # Lo ya guardado se conserva: la próxima ejecución sigue desde ahí y tapa los huecos que queden
+        print(f"Error rellenando el historial de {symbol} {timeframe}: {e}")
+        resumen['error'] = str(e)
+    return resumen
+
+async def rellenar(pares, almacen, config, exchange=None, limitador=None, prioridad=control_tasa.FONDO, max_en_vuelo=20):
+    """Rellena todos los pares (symbol, timeframe) a la vez; devuelve {par: resumen}."""
+    propio = exchange is None
+    if propio:
+        exchange = descarga_async.crear_exchange_async(limitar=limitador is None)
+    semaforo = asyncio.Semaphore(max(1, int(max_en_vuelo)))
+    try:
+        resumenes = await asyncio.gather(*[
+            rellenar_par(exchange, semaforo, almacen, symbol, timeframe, config, limitador, prioridad)
+            for symbol, timeframe in pares
+        ])
+    finally:
+        if propio:
+            await exchange.close()
+    return dict(zip(pares, resumenes))
+
+def rellenar_masivo(pares, almacen, config, exchange=None, limitador=None, prioridad=control_tasa.FONDO, max_en_vuelo=20):
+    """Versión síncrona de rellenar para el scheduler y la línea de comandos."""
+    return asyncio.run(rellenar(list(pares), almacen, config, exchange=exchange, limitador=limitador,
+                                prioridad=prioridad, max_en_vuelo=max_en_vuelo))
+
+def formatear_resumen(resumenes):
+    velas = sum(r['velas'] for r in resumenes.values())
+    huecos = sum(r['huecos'] for r in resumenes.values())
+    completos = sum(r['completo'] for r in resumenes.values())
+    errores = sum(r['error'] is not None for r in resumenes.values())
+    return (f"📚 Historial: {velas} velas nuevas en {len(resumenes)} series | {huecos} huecos revisados | "
+            f"{completos} completas | {errores} con error")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rellena hacia atrás el historial de velas del almacén")
+    parser.add_argument("simbolos", nargs="*", help="pares a rellenar (por defecto los de config_auto.json)")
+    parser.add_argument("--dias", type=int, help="días de historia (por defecto relleno_historico.dias_historia)")
+    args = parser.parse_args()
+
+    import analisis
+    import nucleo
+    config_avanzada = analisis.config_avanzada_actual()
+    if args.dias:
+        config_avanzada = {**config_avanzada, "relleno_historico": {**config_relleno(config_avanzada), "dias_historia": args.dias}}
+    nucleo.cargar_simbolos()
+    nucleo.rellenar_historico(args.simbolos or None, config_avanzada)
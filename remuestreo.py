@@ -0,0 +1,94 @@
+# remuestreo.py
+# Timeframes superiores construidos en local a partir de una serie base guardada (12h desde 4h;
+# 3d, 1w, 1M y 1y desde 1d), con agregación OHLCV y fronteras UTC iguales a las de cierres_vela.
+# Así solo se descarga la serie base y 1y, que Poloniex no ofrece, deja de ser un caso aparte.
+
+import numpy as np
+
+REMUESTREO_POR_DEFECTO = {
+    "activo": True,
+    "bases": {"12h": "4h", "3d": "1d", "1w": "1d", "1M": "1d", "1y": "1d"},
+    "velas_minimas": 200  # las que calienta la EMA200; con menos se pide el timeframe nativo, si lo hay
+}
+LIMITE_BASE = 500  # velas de la serie base por petición (el máximo de Poloniex)
+
+_HORA_MS = 3600000
+_DIA_MS = 24 * _HORA_MS
+_PRIMER_LUNES_MS = 4 * _DIA_MS  # 1970-01-05, las velas semanales abren el lunes
+_DURACION_MAXIMA_MS = {
+    '1h': _HORA_MS,
+    '4h': 4 * _HORA_MS,
+    '12h': 12 * _HORA_MS,
+    '1d': _DIA_MS,
+    '3d': 3 * _DIA_MS,
+    '1w': 7 * _DIA_MS,
+    '1M': 31 * _DIA_MS,
+    '1y': 366 * _DIA_MS
+}
+
+
+def config_remuestreo(config_avanzada):
+    return {**REMUESTREO_POR_DEFECTO, **config_avanzada.get("remuestreo", {})}
+
+def base_de(timeframe, config):
+    """Timeframe base del que se construye `timeframe`, o None si se descarga tal cual."""
+    if not config or not config["activo"]:
+        return None
+    return config["bases"].get(timeframe)
+
+def admite_nativo(exchange, timeframe):
+    """El exchange sirve `timeframe` directamente (si no declara sus timeframes, se supone que sí)."""
+    timeframes = getattr(exchange, 'timeframes', None)
+    return not timeframes or timeframe in timeframes
+
+def suficientes(cantidad, limit, config):
+    """La serie remuestreada sustituye a la nativa solo si tiene al menos sus `limit` velas y `velas_minimas`.
+
+    Sin historial rellenado la serie base son LIMITE_BASE velas, que dan
+    series de 12h, 3d o 1w más cortas que las 250 nativas y sin EMA200.
+    """
+    return cantidad >= max(limit, config["velas_minimas"])
+
+def velas_base_necesarias(timeframe, base, limit):
+    """Velas base que cubren con holgura las últimas `limit` velas de `timeframe`."""
+    por_vela = -(-_DURACION_MAXIMA_MS[timeframe] // _DURACION_MAXIMA_MS[base])
+    return (limit + 1) * por_vela
+
+
+# === AGREGACIÓN ===
+def inicio_periodo(timeframe, timestamps):
+    """Apertura UTC (ms) de la vela de `timeframe` que contiene cada timestamp, vectorizado."""
+    tiempos = np.asarray(timestamps, dtype=np.int64)
+    if timeframe in ('1M', '1y'):
+        unidad = 'M' if timeframe == '1M' else 'Y'
+        return tiempos.astype('datetime64[ms]').astype(f'datetime64[{unidad}]').astype('datetime64[ms]').astype(np.int64)
+    origen = _PRIMER_LUNES_MS if timeframe == '1w' else 0
+    duracion = _DURACION_MAXIMA_MS[timeframe]
+    return origen + (tiempos - origen) // duracion * duracion
+
+def remuestrear(ohlcv, timeframe):
+    """Agrupa velas base ordenadas ([ms, o, h, l, c, v]) en velas de `timeframe`.
+
+    Apertura de la primera, máximo de los altos, mínimo de los bajos, cierre
+    de la última y suma de volúmenes. La primera vela se descarta si la serie
+    base empieza a mitad de periodo; la última puede seguir abierta, igual que
+    la que devolvería el exchange.
+    """
+    if not ohlcv:
+        return []
+    datos = np.asarray(ohlcv, dtype=float)
+    tiempos = datos[:, 0].astype(np.int64)
+    inicios = inicio_periodo(timeframe, tiempos)
+    primeros = np.concatenate([[0], np.flatnonzero(np.diff(inicios)) + 1])
+    ultimos = np.concatenate([primeros[1:] - 1, [len(datos) - 1]])
+    velas = np.column_stack([
+        inicios[primeros],
+        datos[primeros, 1],
+        np.maximum.reduceat(datos[:, 2], primeros),
+        np.minimum.reduceat(datos[:, 3], primeros),
+        datos[ultimos, 4],
+        np.add.reduceat(datos[:, 5], primeros)
+    ])
+    if tiempos[0] != inicios[0]:
+        velas = velas[1:]
+    return [[int(fila[0]), *fila[1:]] for fila in velas.tolist()]
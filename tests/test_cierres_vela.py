@@ -0,0 +1,51 @@
+# DisparadorCierreVela se guarda con pickle en jobs.db: al recargarlo debe disparar igual
+
+import pickle
+from datetime import datetime, timezone
+
+import pytest
+
+import cierres_vela
+
+AHORA = datetime(2024, 2, 28, 23, 59, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("timeframe", cierres_vela.TIMEFRAMES_ALINEADOS)
+def test_pickle_conserva_los_disparos(timeframe):
+    disparador = cierres_vela.DisparadorCierreVela(timeframe, retraso=90)
+    recargado = pickle.loads(pickle.dumps(disparador))
+
+    assert recargado.timeframe == timeframe
+    assert recargado.retraso == disparador.retraso
+    primero = disparador.get_next_fire_time(None, AHORA)
+    assert recargado.get_next_fire_time(None, AHORA) == primero
+    assert recargado.get_next_fire_time(primero, primero) == disparador.get_next_fire_time(primero, primero)
+
+
+def test_sobrevive_al_almacen_de_trabajos(tmp_path):
+    pytest.importorskip("sqlalchemy")
+    from apscheduler.job import Job
+    from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    url = f"sqlite:///{tmp_path / 'jobs.db'}"
+    disparador = cierres_vela.DisparadorCierreVela("1w", retraso=60)
+    scheduler = BackgroundScheduler(timezone=timezone.utc)
+    siguiente = disparador.get_next_fire_time(None, AHORA)
+
+    almacen = SQLAlchemyJobStore(url=url)
+    almacen.start(scheduler, "default")
+    almacen.add_job(Job(scheduler, id="cierre_1w", func="cierres_vela:proximo_cierre", args=["1w", AHORA], kwargs={},
+                        trigger=disparador, executor="default", misfire_grace_time=None, coalesce=True,
+                        max_instances=1, next_run_time=siguiente, name="cierre_1w"))
+    almacen.shutdown()
+
+    # Otro proceso (dashboard o worker) abre el mismo fichero
+    otro = SQLAlchemyJobStore(url=url)
+    otro.start(scheduler, "default")
+    trabajo = otro.lookup_job("cierre_1w")
+    otro.shutdown()
+
+    assert isinstance(trabajo.trigger, cierres_vela.DisparadorCierreVela)
+    assert trabajo.next_run_time == siguiente
+    assert trabajo.trigger.get_next_fire_time(siguiente, siguiente) == disparador.get_next_fire_time(siguiente, siguiente)
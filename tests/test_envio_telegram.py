@@ -0,0 +1,55 @@
+# Envío troceado de ColaTelegram: un mensaje que falla a medias se corta ahí y se reenvía entero
+
+import envio_telegram
+
+
+class _Respuesta:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def json(self):
+        return {}
+
+
+class _SesionFalsa:
+    """Acepta los envíos salvo los números de llamada de `fallos` (401, sin reintentos)."""
+
+    def __init__(self, fallos=()):
+        self.fallos = set(fallos)
+        self.textos = []
+        self.llamadas = 0
+
+    def post(self, url, data=None, timeout=None):
+        self.llamadas += 1
+        if self.llamadas in self.fallos:
+            return _Respuesta(401)
+        self.textos.append(data["text"])
+        return _Respuesta(200)
+
+
+def _cola(sesion):
+    cola = envio_telegram.ColaTelegram("token", "chat", intervalo=0, espera_base=0)
+    cola.sesion = sesion
+    return cola
+
+
+def test_fallo_a_medias_se_reenvia_entero():
+    mensaje = "".join(f"linea {i:04d}\n" for i in range(1000))  # 3 partes
+    partes = envio_telegram.dividir_mensaje(mensaje)
+    assert len(partes) == 3
+    sesion = _SesionFalsa(fallos={2})
+    cola = _cola(sesion)
+    entregados = []
+
+    assert cola.encolar(mensaje, al_entregar=lambda: entregados.append(1)).result(timeout=5) is False
+    assert sesion.textos == partes[:1] and entregados == []
+    assert cola.encolar(mensaje, al_entregar=lambda: entregados.append(1)).result(timeout=5) is True
+    assert sesion.textos == partes[:1] + partes and entregados == [1]
+
+
+def test_mensaje_completo():
+    sesion = _SesionFalsa()
+    cola = _cola(sesion)
+    entregados = []
+    assert cola.encolar("hola", al_entregar=lambda: entregados.append(1)).result(timeout=5) is True
+    assert sesion.textos == ["hola"] and entregados == [1]
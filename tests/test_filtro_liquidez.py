@@ -0,0 +1,36 @@
+# El volumen mínimo está en USDT: los pares cotizados en BTC, ETH o TRX se convierten con sus tickers
+
+import filtro_liquidez
+
+
+def _ticker(last, quote_volume=None):
+    return {'last': last, 'quoteVolume': quote_volume, 'bid': last * 0.999, 'ask': last}
+
+
+TICKERS = {
+    'BTC/USDT': _ticker(60000.0, 10_000_000),
+    'ETH/USDT': _ticker(3000.0, 5_000_000),
+    'USDT/TRY': _ticker(32.0, 3_200_000),  # 3,2 M TRY ≈ 100 000 USDT
+    'ETH/BTC': _ticker(0.05, 5.0),          # 5 BTC ≈ 300 000 USDT
+    'DOGE/BTC': _ticker(0.000002, 0.1),     # 0,1 BTC ≈ 6 000 USDT
+    'LINK/ETH': _ticker(0.005, 40.0),       # 40 ETH ≈ 120 000 USDT
+    'BTC/TRY': _ticker(1920000.0, 320000),  # 320 000 TRY ≈ 10 000 USDT
+    'SUN/TRX': _ticker(0.1, 10.0),          # TRX sin par con USDT: el volumen no se comprueba
+}
+
+
+def test_cambios_a_referencia():
+    cambios = filtro_liquidez.cambios_a_referencia(TICKERS)
+    assert cambios['USDT'] == 1.0
+    assert cambios['BTC'] == 60000.0
+    assert cambios['TRY'] == 1 / 32.0
+    assert 'TRX' not in cambios
+
+
+def test_volumen_en_usdt_para_cualquier_cotizacion():
+    config = filtro_liquidez.config_filtro({})
+    supervivientes, descartes = filtro_liquidez.preseleccionar(
+        list(TICKERS), "1d", TICKERS, filtro_liquidez.CacheNegativa(), config
+    )
+    assert supervivientes == ['BTC/USDT', 'ETH/USDT', 'USDT/TRY', 'ETH/BTC', 'LINK/ETH', 'SUN/TRX']
+    assert descartes == {'volumen': 2}
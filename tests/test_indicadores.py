@@ -0,0 +1,114 @@
+# EMA/MACD/RSI incrementales (EstadoIndicadores y actualizar_indicadores con estado persistido)
+# frente al cálculo por lotes y a una referencia con las fórmulas de pandas_ta
+
+import numpy as np
+import pandas as pd
+import pytest
+import indicadores
+from almacen_velas import AlmacenVelas
+from indicadores import COLUMNAS_INDICADORES
+
+
+def _cierres(n=400, semilla=7):
+    rng = np.random.default_rng(semilla)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+
+def _df(cierres):
+    tiempos = pd.to_datetime(1600000000000 + np.arange(len(cierres), dtype=np.int64) * 86400000, unit='ms')
+    return pd.DataFrame({'timestamp': tiempos, 'close': cierres})
+
+def _ema_referencia(serie, length):
+    """ta.ema: semilla SMA de las primeras `length` velas válidas y luego ewm(adjust=False)."""
+    valida = serie.first_valid_index()
+    if valida is None or len(serie) - valida < length:
+        return pd.Series(np.nan, index=serie.index)
+    semilla = valida + length - 1
+    datos = serie.copy()
+    datos.iloc[:semilla] = np.nan
+    datos.iloc[semilla] = serie.iloc[valida:semilla + 1].mean()
+    return datos.ewm(span=length, adjust=False).mean()
+
+def _referencia(cierres):
+    serie = pd.Series(cierres)
+    macd = _ema_referencia(serie, 12) - _ema_referencia(serie, 26)
+    cambio = serie.diff()
+    subidas = cambio.clip(lower=0).ewm(alpha=1 / 14, adjust=True, min_periods=14).mean()
+    bajadas = (-cambio.clip(upper=0)).ewm(alpha=1 / 14, adjust=True, min_periods=14).mean()
+    return {
+        'ema50': _ema_referencia(serie, 50).values,
+        'ema200': _ema_referencia(serie, 200).values,
+        'macd': macd.values,
+        'macd_signal': _ema_referencia(macd, 9).values,
+        'rsi': (100 * subidas / (subidas + bajadas)).values
+    }
+
+def _secuencial(cierres):
+    estado = indicadores.EstadoIndicadores()
+    return np.array([estado.avanzar(c) for c in cierres])
+
+
+def test_estado_igual_que_lote():
+    cierres = _cierres()
+    lote = indicadores.calcular_indicadores_lote(cierres)
+    secuencial = _secuencial(cierres)
+    for j, columna in enumerate(COLUMNAS_INDICADORES):
+        np.testing.assert_allclose(secuencial[:, j], lote[columna][0], rtol=1e-10, equal_nan=True)
+
+def test_lote_igual_que_referencia():
+    cierres = _cierres()
+    lote = indicadores.calcular_indicadores_lote(cierres)
+    referencia = _referencia(cierres)
+    for columna in COLUMNAS_INDICADORES:
+        np.testing.assert_allclose(lote[columna][0], referencia[columna], rtol=1e-8, equal_nan=True)
+
+def test_estado_sobrevive_a_json():
+    cierres = _cierres()
+    estado = indicadores.EstadoIndicadores()
+    for c in cierres[:250]:
+        estado.avanzar(c)
+    restaurado = indicadores.EstadoIndicadores.desde_json(estado.a_json())
+    np.testing.assert_allclose(
+        [restaurado.avanzar(c) for c in cierres[250:]], [estado.avanzar(c) for c in cierres[250:]], equal_nan=True
+    )
+
+def test_incremental_tras_reiniciar_desde_estado_guardado(tmp_path):
+    cierres = _cierres()
+    ruta = str(tmp_path / "velas.db")
+    lote = indicadores.calcular_indicadores_lote(cierres)
+
+    # Primera pasada: 300 velas, la última abierta; luego el proceso "se reinicia"
+    indicadores.actualizar_indicadores(_df(cierres[:300]), AlmacenVelas(ruta), "BTC/USDT", "1d")
+    almacen = AlmacenVelas(ruta)
+    ts_estado, _ = almacen.leer_estado_indicadores("BTC/USDT", "1d")
+    assert ts_estado == _df(cierres[:300])['timestamp'].values.astype('datetime64[ms]').astype(np.int64)[298]
+
+    df = indicadores.actualizar_indicadores(_df(cierres), almacen, "BTC/USDT", "1d")
+    for columna in COLUMNAS_INDICADORES:
+        np.testing.assert_allclose(df[columna].values, lote[columna][0], rtol=1e-10, equal_nan=True)
+
+def test_reconstruye_si_el_estado_no_encaja(tmp_path):
+    cierres = _cierres()
+    almacen = AlmacenVelas(str(tmp_path / "velas.db"))
+    indicadores.actualizar_indicadores(_df(cierres), almacen, "BTC/USDT", "1d")
+    # Ventana que ya no contiene la vela del estado: se recalcula desde su primera vela
+    ventana = _df(cierres[:200])
+    df = indicadores.actualizar_indicadores(ventana, almacen, "BTC/USDT", "1d")
+    lote = indicadores.calcular_indicadores_lote(cierres[:200])
+    for columna in COLUMNAS_INDICADORES:
+        np.testing.assert_allclose(df[columna].values, lote[columna][0], rtol=1e-10, equal_nan=True)
+
+def test_igual_que_pandas_ta():
+    ta = pytest.importorskip("pandas_ta")
+    cierres = _cierres()
+    serie = pd.Series(cierres)
+    lote = indicadores.calcular_indicadores_lote(cierres)
+    macd = ta.macd(serie, fast=12, slow=26, signal=9)
+    referencias = {
+        'ema50': ta.ema(serie, length=50),
+        'ema200': ta.ema(serie, length=200),
+        'macd': macd.iloc[:, 0],
+        'macd_signal': macd.iloc[:, 2],
+        'rsi': ta.rsi(serie, length=14)
+    }
+    for columna, referencia in referencias.items():
+        np.testing.assert_allclose(lote[columna][0], referencia.values, rtol=1e-6, equal_nan=True)
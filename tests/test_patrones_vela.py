@@ -0,0 +1,43 @@
+# Regresiones de patrones_vela frente a TA-Lib (CDLENGULFING) en los casos de precios iguales
+
+import numpy as np
+import pytest
+import patrones_vela
+
+# (apertura previa, cierre previo, apertura, cierre, valor esperado de TA-Lib)
+CASOS_ENGULFING = [
+    (10.0, 9.0, 8.5, 11.0, 100.0),    # envuelve sin tocar el cuerpo anterior
+    (10.0, 9.0, 9.0, 11.0, 80.0),     # abre en el cierre anterior
+    (10.0, 9.0, 8.5, 10.0, 80.0),     # cierra en la apertura anterior
+    (10.0, 9.0, 9.0, 10.0, 0.0),      # mismo cuerpo: no envuelve
+    (9.0, 10.0, 10.5, 8.0, -100.0),
+    (9.0, 10.0, 10.0, 8.0, -80.0),    # abre en el cierre anterior
+    (9.0, 10.0, 10.5, 9.0, -80.0),    # cierra en la apertura anterior
+]
+
+
+def _velas(apertura_1, cierre_1, apertura, cierre):
+    apertura = np.array([apertura_1, apertura])
+    cierre = np.array([cierre_1, cierre])
+    return apertura, np.maximum(apertura, cierre) + 0.5, np.minimum(apertura, cierre) - 0.5, cierre
+
+
+@pytest.mark.parametrize("apertura_1, cierre_1, apertura, cierre, esperado", CASOS_ENGULFING)
+def test_engulfing_precios_iguales(apertura_1, cierre_1, apertura, cierre, esperado):
+    resultado = patrones_vela.calcular_patrones(*_velas(apertura_1, cierre_1, apertura, cierre), patrones=['engulfing'])
+    assert resultado['engulfing'][-1] == esperado
+
+
+def test_engulfing_igual_que_pandas_ta():
+    ta = pytest.importorskip("pandas_ta")
+    pd = pytest.importorskip("pandas")
+    filas = []
+    for apertura_1, cierre_1, apertura, cierre, _ in CASOS_ENGULFING:
+        filas.extend(zip(*_velas(apertura_1, cierre_1, apertura, cierre)))
+    df = pd.DataFrame(filas, columns=['open', 'high', 'low', 'close'])
+    referencia = ta.cdl_pattern(df['open'], df['high'], df['low'], df['close'], name='engulfing')
+    if referencia is None:
+        pytest.skip("pandas_ta sin TA-Lib")
+    propio = patrones_vela.calcular_patrones(df['open'], df['high'], df['low'], df['close'], patrones=['engulfing'])
+    # Solo las velas que cierran cada pareja; la primera de cada una depende de la anterior
+    np.testing.assert_array_equal(propio['engulfing'][1::2], referencia.iloc[1::2, 0].values)
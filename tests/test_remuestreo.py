@@ -0,0 +1,35 @@
+# Sin historial rellenado el remuestreo no debe dar menos velas que el timeframe nativo
+
+import pytest
+
+import almacen_velas
+import exchange_falso
+import remuestreo
+from almacen_velas import AlmacenVelas
+
+
+@pytest.fixture
+def almacen(tmp_path):
+    return AlmacenVelas(tmp_path / "velas.db")
+
+
+@pytest.mark.parametrize("timeframe", ["12h", "3d", "1w"])
+def test_sin_relleno_se_pide_el_nativo(almacen, timeframe):
+    exchange = exchange_falso.ExchangeFalso(["BTC/USDT"], velas=5000)
+    config = remuestreo.config_remuestreo({})
+
+    df = almacen_velas.actualizar_velas(exchange, almacen, "BTC/USDT", timeframe, config_remuestreo=config)
+
+    assert len(df) == 250
+
+
+def test_con_relleno_se_remuestrea(almacen):
+    exchange = exchange_falso.ExchangeFalso(["BTC/USDT"], velas=5000)
+    almacen.guardar("BTC/USDT", "1d", exchange_falso.generar_velas("BTC/USDT", "1d", 4000))
+
+    df = almacen_velas.actualizar_velas(
+        exchange, almacen, "BTC/USDT", "1w", config_remuestreo=remuestreo.config_remuestreo({}), lectura=500
+    )
+
+    assert len(df) == 500
+    assert exchange.llamadas == 1  # solo la actualización de la serie base
@@ -0,0 +1,65 @@
+# velas_compartidas.py
+# Velas de muchos pares en un único bloque de multiprocessing.shared_memory: los procesos del pool
+# leen sus pares directamente del bloque en vez de recibir DataFrames serializados con pickle.
+
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from descarga_async import COLUMNAS_OHLCV
+
+
+class VelasCompartidas:
+    """Matriz float64 (velas, timestamp + OHLCV) con los pares uno detrás de otro.
+
+    `indice` = {symbol: (inicio, fin)} indica las filas de cada par. A los
+    procesos solo viaja descriptor(): el nombre del bloque y las filas de sus
+    pares. Solo quien crea el bloque lo libera, con cerrar() o al salir del with.
+    """
+
+    def __init__(self, dataframes):
+        symbols = [symbol for symbol, df in dataframes.items() if df is not None and len(df)]
+        self.filas = sum(len(dataframes[symbol]) for symbol in symbols)
+        self._memoria = shared_memory.SharedMemory(create=True, size=max(1, self.filas * len(COLUMNAS_OHLCV) * 8))
+        matriz = np.ndarray((self.filas, len(COLUMNAS_OHLCV)), dtype=np.float64, buffer=self._memoria.buf)
+        self.indice = {}
+        inicio = 0
+        for symbol in symbols:
+            df = dataframes[symbol]
+            fin = inicio + len(df)
+            # Los timestamps en ms caben exactos en un float64
+            matriz[inicio:fin, 0] = df['timestamp'].values.astype('datetime64[ms]').astype(np.int64)
+            for k, columna in enumerate(COLUMNAS_OHLCV[1:], 1):
+                matriz[inicio:fin, k] = df[columna].values
+            self.indice[symbol] = (inicio, fin)
+            inicio = fin
+
+    def descriptor(self, symbols=None):
+        """(nombre, filas, {symbol: (inicio, fin)}) de `symbols` (o de todos), para pasar a un proceso."""
+        indice = self.indice if symbols is None else {symbol: self.indice[symbol] for symbol in symbols}
+        return self._memoria.name, self.filas, indice
+
+    def cerrar(self):
+        self._memoria.close()
+        self._memoria.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+# === LECTURA DESDE LOS PROCESOS ===
+def abrir(descriptor):
+    """(memoria, matriz) del bloque; antes de memoria.close() hay que soltar la matriz."""
+    nombre, filas, _ = descriptor
+    # Los procesos del pool comparten el resource_tracker del padre, que es quien hace unlink
+    memoria = shared_memory.SharedMemory(name=nombre)
+    return memoria, np.ndarray((filas, len(COLUMNAS_OHLCV)), dtype=np.float64, buffer=memoria.buf)
+
+def dataframe(matriz, inicio, fin):
+    """Las filas [inicio, fin) como el DataFrame de ohlcv_a_dataframe; copia, el bloque no se toca."""
+    bloque = matriz[inicio:fin]
+    df = pd.DataFrame({columna: bloque[:, k].copy() for k, columna in enumerate(COLUMNAS_OHLCV)})
+    df['timestamp'] = pd.to_datetime(df['timestamp'].astype(np.int64), unit='ms')
+    return df
@@ -0,0 +1,79 @@
+# vuelo_unico.py
+# Agrupación de peticiones concurrentes ("single-flight"): si varios hilos o corrutinas piden la
+# misma clave a la vez, solo el primero llama al exchange y los demás esperan y reciben su resultado.
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class VueloUnico:
+    """Una petición en vuelo por clave, compartida entre hilos y bucles asyncio.
+
+    `copiar` se aplica al resultado que reciben los que esperan, para que no
+    compartan un objeto mutable (p. ej. un DataFrame) con quien lo descargó.
+    """
+
+    def __init__(self, copiar=None):
+        self.copiar = copiar
+        self._lock = threading.Lock()
+        self._en_vuelo = {}
+        self.metricas = {'llamadas': 0, 'al_exchange': 0, 'ahorradas': 0}
+
+    def _reservar(self, clave):
+        """(futuro, es_lider): el primero con una clave libre se encarga de la petición."""
+        with self._lock:
+            self.metricas['llamadas'] += 1
+            futuro = self._en_vuelo.get(clave)
+            if futuro is not None:
+                self.metricas['ahorradas'] += 1
+                return futuro, False
+            futuro = self._en_vuelo[clave] = Future()
+            self.metricas['al_exchange'] += 1
+            return futuro, True
+
+    def _terminar(self, clave, futuro, resultado=None, error=None):
+        with self._lock:
+            del self._en_vuelo[clave]
+        if error is not None:
+            futuro.set_exception(error)
+        else:
+            futuro.set_result(resultado)
+
+    def _compartido(self, resultado):
+        if self.copiar is None or resultado is None:
+            return resultado
+        return self.copiar(resultado)
+
+    def ejecutar(self, clave, funcion, *args, **kwargs):
+        """Llama a `funcion(*args, **kwargs)` o espera a la llamada en curso con la misma clave."""
+        futuro, lider = self._reservar(clave)
+        if not lider:
+            return self._compartido(futuro.result())
+        try:
+            resultado = funcion(*args, **kwargs)
+        except BaseException as e:
+            self._terminar(clave, futuro, error=e)
+            raise
+        self._terminar(clave, futuro, resultado)
+        return resultado
+
+    async def ejecutar_async(self, clave, crear_corrutina):
+        """Versión asíncrona: `crear_corrutina()` solo se llama si no hay otra petición en vuelo."""
+        futuro, lider = self._reservar(clave)
+        if not lider:
+            return self._compartido(await asyncio.wrap_future(futuro))
+        try:
+            resultado = await crear_corrutina()
+        except BaseException as e:
+            self._terminar(clave, futuro, error=e)
+            raise
+        self._terminar(clave, futuro, resultado)
+        return resultado
+
+    def en_vuelo(self):
+        return len(self._en_vuelo)
+
+
+# Descargas OHLCV de todo el proceso: dashboard, scheduler y escaneos masivos comparten esta instancia
+descargas = VueloUnico(copiar=lambda df: df.copy())
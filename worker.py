@@ -0,0 +1,69 @@
+# worker.py
+# Ejecuta el autoanálisis y el análisis masivo diario sin Streamlit.
+# Uso: python worker.py [--masivo-ahora]
+# Mientras el worker está en marcha renueva worker.latido y el dashboard no programa las mismas tareas.
+
+import os
+import sys
+import threading
+import time
+import analisis
+import nucleo
+
+INTERVALO_REVISION = 60  # segundos entre comprobaciones de config_auto.json y config_avanzada.json
+INTERVALO_LATIDO = 60    # muy por debajo de nucleo.VIGENCIA_LATIDO
+
+
+def fecha_modificacion(ruta):
+    return os.path.getmtime(ruta) if os.path.exists(ruta) else None
+
+def fechas_configuracion():
+    # config_auto.json dice qué pares y con qué frecuencia; config_avanzada.json, el modo de programación
+    return fecha_modificacion(nucleo.AUTO_CONFIG_FILE), fecha_modificacion(analisis.CONFIG_AVANZADA_FILE)
+
+def latir(parar):
+    # En su propio hilo: un --masivo-ahora o una reprogramación larga no deben dejar caducar el latido,
+    # o el dashboard volvería a programar las mismas tareas
+    while not parar.wait(INTERVALO_LATIDO):
+        nucleo.marcar_latido_worker()
+
+def main():
+    try:
+        symbols = nucleo.cargar_simbolos()
+    except Exception as e:
+        print(f"Error cargando símbolos: {e}")
+        return 1
+    print(f"Worker iniciado con {len(symbols)} pares")
+    if nucleo.iniciar_metricas():
+        print("Métricas activas en /metrics")
+
+    nucleo.marcar_latido_worker()
+    parar_latido = threading.Event()
+    threading.Thread(target=latir, args=(parar_latido,), daemon=True).start()
+
+    try:
+        nucleo.programar_tareas_auto(symbols)
+        ultima_modificacion = fechas_configuracion()
+
+        if "--masivo-ahora" in sys.argv:
+            nucleo.analisis_masivo_diario()
+
+        while True:
+            time.sleep(INTERVALO_REVISION)
+            # El dashboard guarda las dos configuraciones; reprogramamos cuando cambia alguna
+            modificacion = fechas_configuracion()
+            if modificacion != ultima_modificacion:
+                ultima_modificacion = modificacion
+                print("La configuración cambió, reprogramando tareas")
+                nucleo.programar_tareas_auto(symbols)
+    except KeyboardInterrupt:
+        if nucleo.scheduler.running:
+            nucleo.scheduler.shutdown(wait=False)
+    finally:
+        parar_latido.set()
+        nucleo.quitar_latido_worker()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())